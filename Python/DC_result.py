@@ -1,91 +1,91 @@
 import os
 import re
+from typing import Dict, Optional
 
 # 修改路徑成主資料夾
 base_path = r"./DC"
 
-# 初始化結果儲存
-cell_area_result = {}
-total_area_result = {}
-slack_met_result = {}
-slack_violated_result = {}
-
 # 正規表示式
 cell_area_pattern = re.compile(r"Total cell area\s*:\s*([0-9.]+)")
 total_area_pattern = re.compile(r"Total area\s*:\s*([0-9.]+)")
 slack_met_pattern = re.compile(r"slack \(MET\)\s+([0-9.-]+)")
 slack_violated_pattern = re.compile(r"slack \(VIOLATED\)\s+([0-9.-]+)")
 
-# 逐一檢查子資料夾
-for folder in os.listdir(base_path):
-    folder_path = os.path.join(base_path, folder)
-    if os.path.isdir(folder_path):
-        # 檢查 area.log
-        area_log_path = os.path.join(folder_path, "area.log")
-        cell_area = "none"
-        total_area = "none"
-        
-        if os.path.exists(area_log_path):
-            with open(area_log_path, "r", encoding="utf-8") as f:
-                content = f.read()
-                cell_match = cell_area_pattern.search(content)
-                total_match = total_area_pattern.search(content)
-
-                if cell_match:
-                    cell_area = cell_match.group(1)
-                if total_match:
-                    total_area = total_match.group(1)
-
-        cell_area_result[folder] = cell_area
-        total_area_result[folder] = total_area
-
-        # 檢查 timing.log
-        timing_log_path = os.path.join(folder_path, "timing.log")
-        slack_met = "none"
-        slack_violated = "none"
-        
-        if os.path.exists(timing_log_path):
-            with open(timing_log_path, "r", encoding="utf-8") as f:
-                content = f.read()
-                slack_met_match = slack_met_pattern.search(content)
-                slack_violated_match = slack_violated_pattern.search(content)
-
-                if slack_met_match:
-                    slack_met = slack_met_match.group(1)
-                if slack_violated_match:
-                    slack_violated = slack_violated_match.group(1)
-
-        slack_met_result[folder] = slack_met
-        slack_violated_result[folder] = slack_violated
-
-# 輸出結果
-print("DC 合成結果分析")
-print("=" * 80)
-
-print(f"{'Folder':<25} {'Total Cell Area':<15} {'Total Area':<15} {'Slack (MET)':<15} {'Slack (VIOLATED)':<15}")
-print("-" * 80)
-
-# 儲存有violation的模組名稱
-violated_modules = []
-
-for folder in sorted(cell_area_result.keys()):
-    slack_violated_val = slack_violated_result[folder]
-    print(f"{folder:<25} {cell_area_result[folder]:<15} {total_area_result[folder]:<15} {slack_met_result[folder]:<15} {slack_violated_val:<15}")
-    
-    # 檢查是否有timing violation (不是 "none" 且不是空字串)
-    if slack_violated_val != "none" and slack_violated_val != "":
-        violated_modules.append(folder)
-
-# 最後印出有violation的模組
-print("\n" + "=" * 50)
-if violated_modules:
-    print("有 Timing Violation 的模組:")
-    print("-" * 30)
-    for module in violated_modules:
-        violation_value = slack_violated_result[module]
-        print(f"  {module}: {violation_value}")
-else:
-    print("所有模組皆無 Timing Violation")
+
+def _search_log(path: str, patterns: Dict[str, re.Pattern]) -> Dict[str, str]:
+    """讀取 log 並回傳每個 pattern 的第一個匹配值 (找不到為 "none")"""
+    values = {name: "none" for name in patterns}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+        for name, pattern in patterns.items():
+            match = pattern.search(content)
+            if match:
+                values[name] = match.group(1)
+    return values
+
+
+def parse_dc_folder(folder_path: str) -> Dict[str, str]:
+    """
+    解析單一模組資料夾的 area.log 與 timing.log
+
+    Returns:
+        {"cell_area", "total_area", "slack_met", "slack_violated"}, 數值為字串或 "none"
+    """
+    result = _search_log(os.path.join(folder_path, "area.log"),
+                         {"cell_area": cell_area_pattern, "total_area": total_area_pattern})
+    result.update(_search_log(os.path.join(folder_path, "timing.log"),
+                              {"slack_met": slack_met_pattern, "slack_violated": slack_violated_pattern}))
+    return result
+
+
+def collect_dc_results(base_path: str = base_path) -> Dict[str, Dict[str, str]]:
+    """逐一檢查子資料夾, 回傳 {folder: parse_dc_folder 結果}"""
+    results = {}
+    for folder in os.listdir(base_path):
+        folder_path = os.path.join(base_path, folder)
+        if os.path.isdir(folder_path):
+            results[folder] = parse_dc_folder(folder_path)
+    return results
+
+
+def to_float(value: str) -> Optional[float]:
+    """把 "none" 轉成 None, 其他轉成 float"""
+    return None if value in ("none", "") else float(value)
+
+
+def violated_modules(results: Dict[str, Dict[str, str]]) -> Dict[str, str]:
+    """有 timing violation 的模組 (slack_violated 不是 "none" 且不是空字串)"""
+    return {folder: r["slack_violated"] for folder, r in sorted(results.items())
+            if r["slack_violated"] not in ("none", "")}
+
+
+def print_dc_results(results: Dict[str, Dict[str, str]]):
+    # 輸出結果
+    print("DC 合成結果分析")
+    print("=" * 80)
+
+    print(f"{'Folder':<25} {'Total Cell Area':<15} {'Total Area':<15} {'Slack (MET)':<15} {'Slack (VIOLATED)':<15}")
+    print("-" * 80)
+
+    for folder in sorted(results.keys()):
+        r = results[folder]
+        print(f"{folder:<25} {r['cell_area']:<15} {r['total_area']:<15} {r['slack_met']:<15} {r['slack_violated']:<15}")
+
+    # 最後印出有violation的模組
+    violations = violated_modules(results)
+    print("\n" + "=" * 50)
+    if violations:
+        print("有 Timing Violation 的模組:")
+        print("-" * 30)
+        for module, violation_value in violations.items():
+            print(f"  {module}: {violation_value}")
+    else:
+        print("所有模組皆無 Timing Violation")
+
+
+if __name__ == "__main__":
+    print_dc_results(collect_dc_results(base_path))
 # import os
 # import re
 
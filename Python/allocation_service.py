@@ -0,0 +1,379 @@
+"""
+STRAIT Allocation Service
+Resident asyncio daemon answering Algorithm 2 allocation requests over a Unix socket
+
+Deployment tooling connects to a long-running process instead of starting
+Python, importing NumPy and rebuilding the chip index for every model load:
+  • per-chip ChipFaultIndex objects stay in memory in an LRU cache; chips are
+    registered with their fault map or loaded on demand from a fault-map file
+    (fault_map_format.FaultMapFile, chip id = record index)
+  • requests that arrive together are grouped per chip and evaluated with one
+    vectorized allocate() call; the flush runs as soon as the event loop has
+    read every ready request, so batching adds no waiting time
+  • bit masks travel packed (fault_map_format dense layout) and mappings come
+    back as uint16 arrays
+
+Wire format (little-endian), every message is a u32 length followed by the payload:
+    request   u8 opcode, u32 request id, u64 chip id, u16 array size, body
+              REGISTER body: packed fault map; ALLOCATE body: packed zero mask
+    response  u8 status, u32 request id, body
+              ALLOCATE body: u8 success, u16 unrecovered count, u16 mapping[N]
+              (physical row per weight row), u16 unrecovered physical rows
+              STATS body: JSON
+"""
+
+import asyncio
+import json
+import os
+import socket
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from chip_fault_index import ChipFaultIndex
+
+# ==================== CONFIGURATION ====================
+SOCKET_PATH = "/tmp/strait_allocation.sock"
+CACHE_SIZE = 64                 # resident chip indexes
+MAX_BATCH = 64                  # tiles per allocate() call
+
+OP_REGISTER = 1
+OP_ALLOCATE = 2
+OP_STATS = 3
+
+STATUS_OK = 0
+STATUS_UNKNOWN_CHIP = 1
+STATUS_BAD_REQUEST = 2
+STATUS_ERROR = 3                # allocation raised inside the service
+
+_LENGTH = struct.Struct("<I")
+_REQUEST = struct.Struct("<BIQH")
+_RESPONSE = struct.Struct("<BI")
+_ALLOCATION = struct.Struct("<BH")
+
+
+def pack_mask(mask: np.ndarray) -> bytes:
+    """N x N boolean mask as little-bit-order bytes (bit i*N + j is element (i, j))"""
+    return np.packbits(np.asarray(mask, dtype=bool).ravel(), bitorder="little").tobytes()
+
+
+def unpack_mask(data: bytes, array_size: int) -> np.ndarray:
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8), count=array_size * array_size, bitorder="little")
+    return bits.astype(bool).reshape(array_size, array_size)
+
+
+class AllocationService:
+    def __init__(self, socket_path: str = SOCKET_PATH, cache_size: int = CACHE_SIZE,
+                 max_batch: int = MAX_BATCH, fault_map_file: Optional[str] = None):
+        """
+        Args:
+            socket_path: Unix socket to listen on
+            cache_size: Maximum number of resident chip indexes (LRU eviction)
+            max_batch: Maximum tiles per vectorized allocation
+            fault_map_file: Optional fault-map file to load unregistered chips from
+        """
+        self.socket_path = socket_path
+        self.cache_size = cache_size
+        self.max_batch = max_batch
+        self.fault_maps = None
+        if fault_map_file is not None:
+            from fault_map_format import FaultMapFile
+            self.fault_maps = FaultMapFile(fault_map_file)
+
+        self._registered: Dict[int, np.ndarray] = {}
+        self._indexes: "OrderedDict[int, ChipFaultIndex]" = OrderedDict()
+        self._pending: Dict[int, List[Tuple[int, np.ndarray, asyncio.StreamWriter]]] = {}
+        self._flush_scheduled = False
+        self.stats = {"requests": 0, "batches": 0, "index_builds": 0, "evictions": 0, "errors": 0}
+
+    def register(self, chip_id: int, fault_map: np.ndarray):
+        """Add or replace the fault map of a chip"""
+        self._registered[chip_id] = np.asarray(fault_map, dtype=bool)
+        self._indexes.pop(chip_id, None)
+
+    def index(self, chip_id: int) -> Optional[ChipFaultIndex]:
+        """Resident index of a chip, building it on a cache miss"""
+        if chip_id in self._indexes:
+            self._indexes.move_to_end(chip_id)
+            return self._indexes[chip_id]
+        if chip_id in self._registered:
+            fault_map = self._registered[chip_id]
+        elif self.fault_maps is not None and 0 <= chip_id < len(self.fault_maps):
+            fault_map = self.fault_maps[chip_id]
+        else:
+            return None
+
+        index = ChipFaultIndex.from_fault_map(fault_map)
+        self.stats["index_builds"] += 1
+        self._indexes[chip_id] = index
+        if len(self._indexes) > self.cache_size:
+            self._indexes.popitem(last=False)
+            self.stats["evictions"] += 1
+        return index
+
+    @staticmethod
+    def _send(writer: asyncio.StreamWriter, status: int, request_id: int, body: bytes = b""):
+        payload = _RESPONSE.pack(status, request_id) + body
+        writer.write(_LENGTH.pack(len(payload)) + payload)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                length, = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+                payload = await reader.readexactly(length)
+                self._dispatch(payload, writer)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    def _dispatch(self, payload: bytes, writer: asyncio.StreamWriter):
+        if len(payload) < _REQUEST.size:
+            self._send(writer, STATUS_BAD_REQUEST, 0)
+            return
+        opcode, request_id, chip_id, array_size = _REQUEST.unpack_from(payload)
+        body = payload[_REQUEST.size:]
+        mask_bytes = -(-array_size * array_size // 8)
+
+        if opcode == OP_STATS:
+            stats = {**self.stats, "resident": len(self._indexes), "registered": len(self._registered)}
+            self._send(writer, STATUS_OK, request_id, json.dumps(stats).encode())
+        elif opcode == OP_REGISTER and len(body) == mask_bytes:
+            self.register(chip_id, unpack_mask(body, array_size))
+            self._send(writer, STATUS_OK, request_id)
+        elif opcode == OP_ALLOCATE and len(body) == mask_bytes:
+            self.stats["requests"] += 1
+            self._pending.setdefault(chip_id, []).append((request_id, unpack_mask(body, array_size), writer))
+            if not self._flush_scheduled:
+                self._flush_scheduled = True
+                asyncio.get_running_loop().call_soon(self._flush)
+        else:
+            self._send(writer, STATUS_BAD_REQUEST, request_id)
+
+    def _flush(self):
+        """
+        Evaluate every pending request, one allocate() call per chip and batch
+
+        Runs from call_soon, where an exception would only reach the loop's handler and
+        leave the clients waiting: a failing chip or batch is answered with STATUS_ERROR.
+        """
+        self._flush_scheduled = False
+        pending, self._pending = self._pending, {}
+        for chip_id, requests in pending.items():
+            try:
+                index = self.index(chip_id)
+            except Exception:
+                self._send_error(requests)
+                continue
+            if index is None or any(mask.shape[0] != index.array_size for _, mask, _ in requests):
+                status = STATUS_UNKNOWN_CHIP if index is None else STATUS_BAD_REQUEST
+                for request_id, _, writer in requests:
+                    self._send(writer, status, request_id)
+                continue
+            for start in range(0, len(requests), self.max_batch):
+                batch = requests[start:start + self.max_batch]
+                try:
+                    success, mapping, unrecovered = index.allocate(np.stack([mask for _, mask, _ in batch]))
+                    bodies = [_ALLOCATION.pack(bool(success[i]), len(unrecovered[i]))
+                              + mapping[i].astype("<u2").tobytes() + unrecovered[i].astype("<u2").tobytes()
+                              for i in range(len(batch))]
+                except Exception:
+                    self._send_error(batch)
+                    continue
+                self.stats["batches"] += 1
+                for (request_id, _, writer), body in zip(batch, bodies):
+                    self._send(writer, STATUS_OK, request_id, body)
+
+    def _send_error(self, requests: List[Tuple[int, np.ndarray, asyncio.StreamWriter]]):
+        self.stats["errors"] += 1
+        for request_id, _, writer in requests:
+            self._send(writer, STATUS_ERROR, request_id)
+
+    async def serve(self, ready: Optional[threading.Event] = None):
+        """Listen until cancelled; a leftover socket file is only removed if nothing answers on it"""
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                if os.path.exists(self.socket_path):
+                    os.unlink(self.socket_path)
+            else:
+                raise RuntimeError(f"{self.socket_path} is in use by a running allocation service")
+            finally:
+                probe.close()
+        server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        if ready is not None:
+            ready.set()
+        async with server:
+            await server.serve_forever()
+
+
+class AllocationClient:
+    def __init__(self, socket_path: str = SOCKET_PATH):
+        """Blocking client for AllocationService"""
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(socket_path)
+        self._next_id = 0
+
+    def _send(self, opcode: int, chip_id: int, array_size: int, body: bytes = b"") -> int:
+        self._next_id = (self._next_id + 1) & 0xFFFFFFFF
+        payload = _REQUEST.pack(opcode, self._next_id, chip_id, array_size) + body
+        self._sock.sendall(_LENGTH.pack(len(payload)) + payload)
+        return self._next_id
+
+    def _recv_exact(self, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            chunk = self._sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("allocation service closed the connection")
+            data += chunk
+        return bytes(data)
+
+    def _receive(self) -> Tuple[int, int, bytes]:
+        length, = _LENGTH.unpack(self._recv_exact(_LENGTH.size))
+        payload = self._recv_exact(length)
+        status, request_id = _RESPONSE.unpack_from(payload)
+        return status, request_id, payload[_RESPONSE.size:]
+
+    @staticmethod
+    def _check(status: int, chip_id: int):
+        if status == STATUS_UNKNOWN_CHIP:
+            raise KeyError(f"chip {chip_id} is not registered")
+        if status == STATUS_ERROR:
+            raise RuntimeError(f"allocation for chip {chip_id} failed inside the service")
+        if status != STATUS_OK:
+            raise ValueError(f"request for chip {chip_id} rejected (status {status})")
+
+    @staticmethod
+    def _decode_allocation(body: bytes, array_size: int) -> Tuple[bool, np.ndarray, np.ndarray]:
+        success, count = _ALLOCATION.unpack_from(body)
+        values = np.frombuffer(body, dtype="<u2", offset=_ALLOCATION.size)
+        return bool(success), values[:array_size].astype(np.int64), values[array_size:array_size + count].astype(np.int64)
+
+    def register(self, chip_id: int, fault_map: np.ndarray):
+        self._send(OP_REGISTER, chip_id, fault_map.shape[0], pack_mask(fault_map))
+        status, _, _ = self._receive()
+        self._check(status, chip_id)
+
+    def allocate(self, chip_id: int, zero_mask: np.ndarray) -> Tuple[bool, np.ndarray, np.ndarray]:
+        """
+        Returns:
+            Tuple of (success, mapping (N,) physical row per weight row, unrecovered physical rows)
+        """
+        return self.allocate_many(chip_id, zero_mask[None])[0]
+
+    def allocate_many(self, chip_id: int, zero_masks: np.ndarray) -> List[Tuple[bool, np.ndarray, np.ndarray]]:
+        """
+        Pipeline several tiles so the service can evaluate them in one batch
+
+        Every reply is read before a failed status is raised, so the connection stays in sync.
+        """
+        n = zero_masks.shape[-1]
+        order = {self._send(OP_ALLOCATE, chip_id, n, pack_mask(mask)): i for i, mask in enumerate(zero_masks)}
+        results = [None] * len(order)
+        failed = None
+        for _ in range(len(order)):
+            status, request_id, body = self._receive()
+            if status != STATUS_OK:
+                failed = status if failed is None else failed
+                continue
+            results[order[request_id]] = self._decode_allocation(body, n)
+        if failed is not None:
+            self._check(failed, chip_id)
+        return results
+
+    def stats(self) -> Dict:
+        self._send(OP_STATS, 0, 0)
+        _, _, body = self._receive()
+        return json.loads(body)
+
+    def close(self):
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def start_in_thread(service: AllocationService) -> threading.Thread:
+    """Run the service on its own event loop in a daemon thread"""
+    ready = threading.Event()
+    thread = threading.Thread(target=lambda: asyncio.run(service.serve(ready)), daemon=True)
+    thread.start()
+    ready.wait()
+    return thread
+
+
+def _demo_client(socket_path: str, chip_id: int, array_size: int, tiles: int, seed: int) -> np.ndarray:
+    """Request latencies of one demo client process"""
+    masks = np.random.default_rng(seed).random((tiles, array_size, array_size)) < 0.5
+    latencies = np.zeros(tiles)
+    with AllocationClient(socket_path) as client:
+        for i, mask in enumerate(masks):
+            start = time.perf_counter()
+            client.allocate(chip_id, mask)
+            latencies[i] = time.perf_counter() - start
+    return latencies
+
+
+# ==================== MAIN EXECUTION ====================
+
+if __name__ == "__main__":
+    import argparse
+    import multiprocessing
+    from coupled_sweep import draw_faults
+    from fault_map_format import fault_lists_to_map
+
+    parser = argparse.ArgumentParser(description="STRAIT allocation service")
+    parser.add_argument("--serve", action="store_true", help="run the daemon instead of the demo")
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    parser.add_argument("--fault-maps", default=None, help="fault-map file for on-demand chips")
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE)
+    args = parser.parse_args()
+
+    if args.serve:
+        asyncio.run(AllocationService(args.socket, args.cache_size, fault_map_file=args.fault_maps).serve())
+        raise SystemExit
+
+    print("STRAIT Allocation Service")
+    print("=" * 60)
+    n, clients, tiles = 256, 8, 200
+    rng = np.random.default_rng(42)
+    fault_map = fault_lists_to_map(*draw_faults(rng, n, int(n * n * 0.1 / 100)), n)
+    masks = rng.random((tiles, n, n)) < 0.5
+
+    service = AllocationService(args.socket)
+    start_in_thread(service)
+    with AllocationClient(args.socket) as client:
+        client.register(7, fault_map)
+        client.allocate(7, masks[0])
+        start = time.perf_counter()
+        results = [client.allocate(7, mask) for mask in masks]
+        sequential = (time.perf_counter() - start) / tiles
+
+    reference = ChipFaultIndex.from_fault_map(fault_map).allocate(masks)
+    agree = all(r[0] == reference[0][i] and np.array_equal(r[1], reference[1][i]) for i, r in enumerate(results))
+    print(f"{n}x{n} tiles, one client: {sequential * 1e3:.3f} ms per request, matches local allocate: {agree}")
+
+    # clients run in their own processes, as deployment tools would
+    pool = multiprocessing.get_context("spawn").Pool(clients)
+    start = time.perf_counter()
+    latencies = np.concatenate(pool.starmap(_demo_client, [(args.socket, 7, n, tiles, seed)
+                                                           for seed in range(clients)]))
+    elapsed = time.perf_counter() - start
+    pool.close()
+    with AllocationClient(args.socket) as client:
+        stats = client.stats()
+    print(f"{clients} concurrent client processes: {clients * tiles / elapsed:.0f} requests/s, "
+          f"median latency {np.median(latencies) * 1e3:.3f} ms, "
+          f"{stats['requests'] / stats['batches']:.1f} requests per batch")
+    print(f"Service stats: {stats}")
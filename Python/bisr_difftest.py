@@ -0,0 +1,247 @@
+"""
+STRAIT BISR Differential Test
+Batched comparison of bisr_weight_allocation.v against the Python Algorithm 2
+
+Thousands of random (fault map, weight matrix) cases are packed into one
+$readmemh stimulus image, testbench/tb_bisr_difftest.v runs all of them in a
+single simulation and dumps one line per case, and the dump is diffed in bulk
+against ChipFaultIndex (which agrees with weight_allocation_algorithm):
+  • recovery_success against the Python success flag
+  • mapping_table_reg (physical row -> weight row) against the Python mapping
+  • faulty PE storage (pe_disable_out) against the injected fault map
+Mapping differences of unrecovered cases are reported separately: there both
+sides only promise that the allocation failed.
+
+Stimulus words (hex, one per line): word 0 is the case count, then per case the
+fault map (row i at bits [i*N +: N]) followed by the N weight rows (PE j at
+bits [j*WEIGHT_WIDTH +: WEIGHT_WIDTH]).
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from chip_fault_index import ChipFaultIndex
+from mapping_validator import invert_mapping
+
+# ==================== CONFIGURATION ====================
+SYSTOLIC_SIZE = 8
+WEIGHT_WIDTH = 8
+NUM_CASES = 4096
+SPARSITY_LEVELS = [0.1, 0.3, 0.5, 0.7, 0.9]
+FAULT_RATES = [1.0, 3.0, 5.0, 10.0, 20.0]    # percentage of faulty PEs
+
+RTL_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+TESTBENCH = "testbench/tb_bisr_difftest.v"
+RTL_SOURCES = ["bisr_weight_allocation.v", "faulty_pe_storage.v", "mapping_table.v", "row_weight_storage.v"]
+STIMULUS_FILE = "./results/bisr_difftest_stim.hex"
+DUMP_FILE = "./results/bisr_difftest_dump.txt"
+VERILATOR = ["verilator", "verilator-cli"]   # executable names (verilator-cli: the pip wheel)
+
+
+def generate_cases(num_cases: int = NUM_CASES, array_size: int = SYSTOLIC_SIZE,
+                   sparsity_levels: Sequence[float] = SPARSITY_LEVELS,
+                   fault_rates: Sequence[float] = FAULT_RATES,
+                   weight_width: int = WEIGHT_WIDTH,
+                   seed: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Random cases spread over the given sparsity levels and fault rates
+
+    Returns:
+        Tuple of (fault_maps (C, N, N) bool, weights (C, N, N) signed integers)
+    """
+    rng = np.random.default_rng(seed)
+    n = array_size
+    sparsity = rng.choice(sparsity_levels, size=num_cases)
+    num_faults = (n * n * rng.choice(fault_rates, size=num_cases) / 100).astype(np.int64)
+
+    # the first num_faults PEs of a random ordering are faulty
+    rank = np.argsort(rng.random((num_cases, n * n)), axis=1).argsort(axis=1)
+    fault_maps = (rank < num_faults[:, None]).reshape(num_cases, n, n)
+
+    q_max = (1 << (weight_width - 1)) - 1
+    zero = rng.random((num_cases, n, n)) < sparsity[:, None, None]
+    magnitude = rng.integers(1, q_max + 1, size=(num_cases, n, n))
+    sign = np.where(rng.random((num_cases, n, n)) < 0.5, -1, 1)
+    weights = np.where(zero, 0, sign * magnitude)
+    return fault_maps, weights
+
+
+def _hex_words(bits: np.ndarray, word_bits: int) -> List[str]:
+    """Format rows of LSB-first bits (W, B) as hex words of word_bits bits"""
+    padded = np.zeros((bits.shape[0], -(-word_bits // 8) * 8), dtype=np.uint8)
+    padded[:, :bits.shape[1]] = bits
+    packed = np.packbits(padded, axis=1, bitorder="little")[:, ::-1]
+    digits = -(-word_bits // 4)
+    return [row.tobytes().hex()[-digits:] for row in packed]
+
+
+def write_stimulus(path: str, fault_maps: np.ndarray, weights: np.ndarray,
+                   weight_width: int = WEIGHT_WIDTH) -> int:
+    """
+    Pack every case into one $readmemh image for tb_bisr_difftest.v
+
+    Returns:
+        Number of words written
+    """
+    num_cases, n, _ = fault_maps.shape
+    word_bits = max(n * n, n * weight_width)
+
+    fault_words = _hex_words(fault_maps.reshape(num_cases, n * n).astype(np.uint8), word_bits)
+    two_complement = weights.astype(np.int64) & ((1 << weight_width) - 1)
+    weight_bits = (two_complement[..., None] >> np.arange(weight_width)) & 1       # (C, N, N, W)
+    weight_words = _hex_words(weight_bits.reshape(num_cases * n, n * weight_width).astype(np.uint8),
+                              word_bits)
+
+    lines = [format(num_cases, "x")]
+    for c in range(num_cases):
+        lines.append(fault_words[c])
+        lines.extend(weight_words[c * n:(c + 1) * n])
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return len(lines)
+
+
+def reference(fault_maps: np.ndarray, weights: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Python Algorithm 2 result of every case
+
+    Returns:
+        {"success" (C,), "mapping_table" (C, N) weight row held by each physical row}
+    """
+    num_cases, n, _ = fault_maps.shape
+    success = np.zeros(num_cases, dtype=bool)
+    mapping = np.zeros((num_cases, n), dtype=np.int64)
+    zero_masks = weights == 0
+    for c in range(num_cases):
+        ok, mapped, _ = ChipFaultIndex.from_fault_map(fault_maps[c]).allocate(zero_masks[c])
+        success[c], mapping[c] = ok[0], mapped[0]
+    return {"success": success, "mapping_table": invert_mapping(mapping)}
+
+
+def parse_dump(path: str, array_size: int = SYSTOLIC_SIZE) -> Dict[str, np.ndarray]:
+    """
+    Read the per-case dump of tb_bisr_difftest.v
+
+    Unwritten mapping_table entries (x) are returned as -1.
+
+    Returns:
+        {"case", "done", "success", "mapping_table" (C, N), "pe_disable" (C, N, N)}
+    """
+    n = array_size
+    with open(path) as f:
+        rows = [line.split() for line in f if line.strip()]
+    table = np.array(rows, dtype=object).reshape(len(rows), 3 + 2 * n)
+
+    def to_int(value: str, base: int) -> int:
+        return -1 if any(ch in value.lower() for ch in "xz") else int(value, base)
+
+    ints = np.vectorize(to_int, otypes=[np.int64])
+    disable = ints(table[:, 3 + n:], 16)
+    return {
+        "case": ints(table[:, 0], 10),
+        "done": ints(table[:, 1], 2) == 1,
+        "success": ints(table[:, 2], 2) == 1,
+        "mapping_table": ints(table[:, 3:3 + n], 10),
+        "pe_disable": ((disable[:, :, None] >> np.arange(n)) & 1).astype(bool) & (disable[:, :, None] >= 0),
+    }
+
+
+def diff(expected: Dict[str, np.ndarray], fault_maps: np.ndarray, dut: Dict[str, np.ndarray]) -> Dict:
+    """
+    Compare the dumped RTL results with the reference
+
+    Returns:
+        Case indices of each kind of mismatch plus summary counts
+    """
+    num_cases = len(expected["success"])
+    if len(dut["case"]) != num_cases or np.any(dut["case"] != np.arange(num_cases)):
+        raise ValueError(f"Dump holds {len(dut['case'])} cases, expected {num_cases}")
+
+    mapping_diff = np.any(dut["mapping_table"] != expected["mapping_table"], axis=1)
+    recovered = expected["success"]
+    return {
+        "cases": num_cases,
+        "recovered": int(recovered.sum()),
+        "not_done": np.flatnonzero(~dut["done"]).tolist(),
+        "success_mismatch": np.flatnonzero(dut["success"] != recovered).tolist(),
+        "mapping_mismatch": np.flatnonzero(mapping_diff & recovered).tolist(),
+        "unrecovered_mapping_mismatch": np.flatnonzero(mapping_diff & ~recovered).tolist(),
+        "pe_disable_mismatch": np.flatnonzero(np.any(dut["pe_disable"] != fault_maps, axis=(1, 2))).tolist(),
+    }
+
+
+def run_simulation(stimulus_path: str, dump_path: str, num_cases: int,
+                   array_size: int = SYSTOLIC_SIZE, weight_width: int = WEIGHT_WIDTH,
+                   rtl_root: str = RTL_ROOT) -> float:
+    """
+    Compile and run tb_bisr_difftest.v once with Icarus Verilog, or Verilator if iverilog is missing
+
+    Verilator is 2-state: mapping_table entries the RTL never writes read back as
+    0 instead of x, which only affects the mappings of unrecovered cases.
+
+    Returns:
+        Wall-clock seconds spent in the simulator
+    """
+    sources = [os.path.join(rtl_root, TESTBENCH)] + [os.path.join(rtl_root, s) for s in RTL_SOURCES]
+    params = {"SYSTOLIC_SIZE": array_size, "WEIGHT_WIDTH": weight_width, "MAX_CASES": num_cases}
+    verilator = next((v for v in VERILATOR if shutil.which(v)), None)
+    if shutil.which("iverilog") and shutil.which("vvp"):
+        binary = os.path.splitext(dump_path)[0] + ".vvp"
+        subprocess.run(["iverilog", "-g2012", "-o", binary]
+                       + [a for k, v in params.items() for a in ("-P", f"tb_bisr_difftest.{k}={v}")]
+                       + sources, check=True)
+        command = ["vvp", "-n", binary]
+    elif verilator:
+        build_dir = os.path.splitext(dump_path)[0] + "_obj"
+        subprocess.run([verilator, "--binary", "--timing", "-Wno-fatal", "-Wno-lint", "-Wno-style",
+                        "--top-module", "tb_bisr_difftest", "-Mdir", build_dir, "-o", "tb_bisr_difftest"]
+                       + [f"-G{k}={v}" for k, v in params.items()] + sources,
+                       check=True, stdout=subprocess.DEVNULL)
+        command = [os.path.join(build_dir, "tb_bisr_difftest")]
+    else:
+        raise FileNotFoundError("neither iverilog/vvp nor verilator found; run tb_bisr_difftest.v with "
+                                "another simulator using +STIM= and +DUMP= and pass the dump to parse_dump")
+    start = time.perf_counter()
+    subprocess.run(command + [f"+STIM={os.path.abspath(stimulus_path)}", f"+DUMP={os.path.abspath(dump_path)}"],
+                   check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def print_diff(report: Dict):
+    print(f"Cases: {report['cases']}, recovered by Algorithm 2: {report['recovered']}")
+    for key in ["not_done", "success_mismatch", "mapping_mismatch",
+                "unrecovered_mapping_mismatch", "pe_disable_mismatch"]:
+        cases = report[key]
+        shown = ", ".join(map(str, cases[:10])) + (" ..." if len(cases) > 10 else "")
+        print(f"  • {key}: {len(cases)}" + (f" [{shown}]" if cases else ""))
+
+
+# ==================== MAIN EXECUTION ====================
+
+if __name__ == "__main__":
+    print("STRAIT BISR Differential Test")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(STIMULUS_FILE), exist_ok=True)
+    fault_maps, weights = generate_cases(seed=42)
+    words = write_stimulus(STIMULUS_FILE, fault_maps, weights)
+    expected = reference(fault_maps, weights)
+    print(f"{NUM_CASES} cases ({SYSTOLIC_SIZE}x{SYSTOLIC_SIZE}), {words} stimulus words, "
+          f"reference in {time.perf_counter() - start:.2f}s")
+
+    try:
+        sim_time = run_simulation(STIMULUS_FILE, DUMP_FILE, NUM_CASES)
+    except FileNotFoundError as e:
+        sys.exit(f"RTL NOT VERIFIED: {e}")
+    print(f"Single simulation run: {sim_time:.2f}s")
+    report = diff(expected, fault_maps, parse_dump(DUMP_FILE))
+    print_diff(report)
+    if any(report[key] for key in ["not_done", "success_mismatch", "mapping_mismatch", "pe_disable_mismatch"]):
+        sys.exit("RTL and Python Algorithm 2 disagree")
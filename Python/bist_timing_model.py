@@ -0,0 +1,267 @@
+"""
+STRAIT hybrid_bist Transaction-Level Timing Model
+Event-driven model of the MBIST -> SA -> TD flow for test-time estimation
+
+Instead of stepping every clock, each state handler computes from the FSM
+counters how many cycles the state is held and which state follows, so a run
+costs one step per state transition. Counter behaviour follows hybrid_bist.v:
+  • MBIST_CHECK loops until acc_wr_addr == SYSTOLIC_SIZE-1 on the last pattern
+  • SA_SHIFT holds one shift window per pattern (last cycle is the capture)
+  • TD_SHIFT -> TD_LAUNCH -> TD_CAPTURE repeats for every pattern and every
+    td_pe_counter position until pattern_counter == TD_TEST_PATTERN_DEPTH-1
+    and td_pe_counter == 3
+The shift window equals the scan-chain length (8 in the RTL, whose 3-bit
+shift_counter matches SYSTOLIC_SIZE = 8); splitting the chain into several
+parallel chains shortens the window accordingly.
+
+Note: in hybrid_bist.v TD_FINAL_SHIFT waits for shift_counter == 7 but only
+shift_out_counter advances in that state. The model assumes the intended
+shift_out_counter window.
+"""
+
+import itertools
+import math
+import time
+from typing import Dict, Iterable, List, Optional
+
+from results_store import ResultsStore
+
+# ==================== CONFIGURATION ====================
+SYSTOLIC_SIZE = 8
+SA_TEST_PATTERN_DEPTH = 12
+TD_TEST_PATTERN_DEPTH = 18
+MBIST_PATTERN_DEPTH = 8
+TD_PE_POSITIONS = 4         # td_pe_counter 0..3 (checkerboard PE groups)
+
+# Phase each state is booked under in the breakdown
+STATE_PHASE = {
+    "IDLE": "overhead",
+    "MBIST_START": "mbist", "MBIST_WRITE": "mbist", "MBIST_READ": "mbist",
+    "MBIST_CHECK": "mbist", "MBIST_FINAL_READ": "mbist", "MBIST_FINAL_CHECK": "mbist",
+    "LBIST_START": "sa", "SA_SHIFT": "sa", "SA_FINAL_SHIFT": "sa",
+    "TD_START": "td", "TD_SHIFT": "td", "TD_LAUNCH": "td", "TD_CAPTURE": "td", "TD_FINAL_SHIFT": "td",
+    "WEIGHT_ALLOCATION": "allocation", "WEIGHT_LOAD": "allocation",
+    "TEST_COMPLETE": "overhead",
+}
+
+
+class HybridBistTimingModel:
+    def __init__(self, systolic_size: int = SYSTOLIC_SIZE,
+                 sa_depth: int = SA_TEST_PATTERN_DEPTH,
+                 td_depth: int = TD_TEST_PATTERN_DEPTH,
+                 mbist_depth: int = MBIST_PATTERN_DEPTH,
+                 scan_chain_length: Optional[int] = None,
+                 scan_chains: int = 1):
+        """
+        Args:
+            systolic_size: SYSTOLIC_SIZE
+            sa_depth: SA_TEST_PATTERN_DEPTH
+            td_depth: TD_TEST_PATTERN_DEPTH
+            mbist_depth: MBIST_PATTERN_DEPTH
+            scan_chain_length: PEs per scan chain (defaults to systolic_size)
+            scan_chains: Number of parallel chains the column chain is split into
+        """
+        self.systolic_size = systolic_size
+        self.sa_depth = sa_depth
+        self.td_depth = td_depth
+        self.mbist_depth = mbist_depth
+        chain = scan_chain_length if scan_chain_length is not None else systolic_size
+        self.shift_window = max(2, math.ceil(chain / scan_chains))
+        self.addr_modulus = 1 << max(1, math.ceil(math.log2(systolic_size)))
+
+        self.handlers = {
+            "IDLE": self._idle,
+            "MBIST_START": self._mbist_start,
+            "MBIST_WRITE": self._mbist_write,
+            "MBIST_READ": self._mbist_read,
+            "MBIST_CHECK": self._mbist_check,
+            "MBIST_FINAL_READ": lambda: (1, "MBIST_FINAL_CHECK"),
+            "MBIST_FINAL_CHECK": lambda: (1, "TEST_COMPLETE"),
+            "LBIST_START": self._lbist_start,
+            "SA_SHIFT": self._sa_shift,
+            "SA_FINAL_SHIFT": self._sa_final_shift,
+            "TD_START": lambda: (1, "TD_SHIFT"),
+            "TD_SHIFT": self._td_shift,
+            "TD_LAUNCH": lambda: (1, "TD_CAPTURE"),
+            "TD_CAPTURE": self._td_capture,
+            "TD_FINAL_SHIFT": lambda: (self.shift_window, "TEST_COMPLETE"),
+            "WEIGHT_ALLOCATION": lambda: (self.systolic_size, "WEIGHT_LOAD"),
+            "WEIGHT_LOAD": lambda: (self.systolic_size - 1, None),
+            "TEST_COMPLETE": lambda: (1, None),
+        }
+
+    # ---------------- state handlers: return (cycles held, next state) ----------------
+
+    def _idle(self):
+        return 1, self._entry
+
+    def _mbist_start(self):
+        self.pattern_counter = 0
+        self.acc_wr_addr = 0
+        return 1, "MBIST_WRITE"
+
+    def _mbist_write(self):
+        self.acc_wr_addr = (self.acc_wr_addr + 1) % self.addr_modulus
+        return 1, "MBIST_READ"
+
+    def _mbist_read(self):
+        self.acc_wr_addr = (self.acc_wr_addr + 1) % self.addr_modulus
+        return 1, "MBIST_CHECK"
+
+    def _mbist_check(self):
+        # cycles until acc_wr_addr reaches SYSTOLIC_SIZE-1 on the current pattern,
+        # then a full address sweep for every remaining pattern
+        last_addr = self.systolic_size - 1
+        first = (last_addr - self.acc_wr_addr) % self.addr_modulus + 1
+        remaining_patterns = self.mbist_depth - 1 - self.pattern_counter
+        cycles = first + remaining_patterns * self.systolic_size
+        self.pattern_counter = self.mbist_depth
+        self.acc_wr_addr = 0
+        return cycles, "MBIST_FINAL_READ"
+
+    def _lbist_start(self):
+        self.pattern_counter = 0
+        self.td_pe_counter = 0
+        return 1, "SA_SHIFT"
+
+    def _sa_shift(self):
+        # one shift window per pattern; leaves after the window in which pattern_counter hits the depth
+        cycles = (self.sa_depth - self.pattern_counter) * self.shift_window
+        self.pattern_counter = self.sa_depth
+        return cycles, "SA_FINAL_SHIFT"
+
+    def _sa_final_shift(self):
+        self.pattern_counter = 0
+        return self.shift_window, "TD_START"
+
+    def _td_shift(self):
+        if self.td_pe_counter == TD_PE_POSITIONS - 1:
+            self.pattern_counter += 1
+            self.td_pe_counter = 0
+        else:
+            self.td_pe_counter += 1
+        return self.shift_window, "TD_LAUNCH"
+
+    def _td_capture(self):
+        if self.pattern_counter == self.td_depth - 1 and self.td_pe_counter == TD_PE_POSITIONS - 1:
+            return 1, "TD_FINAL_SHIFT"
+        return 1, "TD_SHIFT"
+
+    # ---------------- engine ----------------
+
+    def run(self, flow: str = "LBIST") -> Dict:
+        """
+        Run one test session from IDLE to TEST_COMPLETE
+
+        Args:
+            flow: "MBIST", "LBIST", "BIST" (MBIST then LBIST, as tb_STRAIT.v does)
+                  or "ALLOCATION" (normal-mode weight allocation + load)
+
+        Returns:
+            {"total_cycles", "phases": {phase: cycles}, "states": {state: cycles}, "events"}
+        """
+        if flow == "BIST":
+            mbist, lbist = self.run("MBIST"), self.run("LBIST")
+            return _merge_runs(mbist, lbist)
+
+        entries = {"MBIST": "MBIST_START", "LBIST": "LBIST_START", "ALLOCATION": "WEIGHT_ALLOCATION"}
+        self._entry = entries[flow]
+        self.pattern_counter = 0
+        self.td_pe_counter = 0
+        self.acc_wr_addr = 0
+
+        states: Dict[str, int] = {}
+        phases: Dict[str, int] = {}
+        events = 0
+        state = "IDLE"
+        while state is not None:
+            cycles, next_state = self.handlers[state]()
+            states[state] = states.get(state, 0) + cycles
+            phase = STATE_PHASE[state]
+            phases[phase] = phases.get(phase, 0) + cycles
+            events += 1
+            state = next_state
+        return {"total_cycles": sum(states.values()), "phases": phases, "states": states, "events": events}
+
+    def closed_form(self) -> Dict[str, int]:
+        """Closed-form MBIST/SA/TD cycle counts, used to cross-check the event engine"""
+        s, w = self.systolic_size, self.shift_window
+        mbist_check = ((s - 1 - 2) % self.addr_modulus + 1) + (self.mbist_depth - 1) * s
+        td_groups = TD_PE_POSITIONS * (self.td_depth - 1) + (TD_PE_POSITIONS - 1)
+        return {
+            "mbist": 3 + mbist_check + 2,
+            "sa": 1 + self.sa_depth * w + w,
+            "td": 1 + td_groups * (w + 2) + w,
+        }
+
+
+def _merge_runs(*runs: Dict) -> Dict:
+    merged = {"total_cycles": 0, "phases": {}, "states": {}, "events": 0}
+    for run in runs:
+        merged["total_cycles"] += run["total_cycles"]
+        merged["events"] += run["events"]
+        for field in ("phases", "states"):
+            for name, cycles in run[field].items():
+                merged[field][name] = merged[field].get(name, 0) + cycles
+    return merged
+
+
+def sweep(systolic_sizes: Iterable[int], sa_depths: Iterable[int] = (SA_TEST_PATTERN_DEPTH,),
+          td_depths: Iterable[int] = (TD_TEST_PATTERN_DEPTH,),
+          mbist_depths: Iterable[int] = (MBIST_PATTERN_DEPTH,),
+          scan_chains: Iterable[int] = (1,), flow: str = "BIST",
+          store: Optional[ResultsStore] = None) -> List[Dict]:
+    """
+    Evaluate the cartesian product of configurations
+
+    Returns:
+        One record per configuration with its total cycles and phase breakdown
+    """
+    records = []
+    for size, sa, td, mb, chains in itertools.product(systolic_sizes, sa_depths, td_depths,
+                                                       mbist_depths, scan_chains):
+        model = HybridBistTimingModel(size, sa, td, mb, scan_chains=chains)
+        result = model.run(flow)
+        config = {"systolic_size": size, "sa_depth": sa, "td_depth": td,
+                  "mbist_depth": mb, "scan_chains": chains, "flow": flow}
+        record = {**config, "total_cycles": result["total_cycles"], "phases": result["phases"]}
+        records.append(record)
+        if store is not None:
+            store.put("bist_test_time", config, record)
+    return records
+
+
+def print_breakdown(result: Dict, title: str):
+    total = result["total_cycles"]
+    print(title)
+    print("-" * 60)
+    for phase, cycles in result["phases"].items():
+        print(f"  {phase:<12} {cycles:>8} cycles ({cycles / total * 100:5.1f}%)")
+    print(f"  {'total':<12} {total:>8} cycles")
+
+
+# ==================== MAIN EXECUTION ====================
+
+if __name__ == "__main__":
+    print("STRAIT hybrid_bist Timing Model")
+    print("=" * 60)
+
+    model = HybridBistTimingModel()
+    result = model.run("BIST")
+    print_breakdown(result, f"Default configuration ({SYSTOLIC_SIZE}x{SYSTOLIC_SIZE}, "
+                            f"SA {SA_TEST_PATTERN_DEPTH}, TD {TD_TEST_PATTERN_DEPTH}, "
+                            f"MBIST {MBIST_PATTERN_DEPTH})")
+    print(f"  Closed form check: {model.closed_form()}")
+
+    start = time.perf_counter()
+    records = sweep(systolic_sizes=[8, 16, 32, 64, 128, 256, 512, 1024],
+                    sa_depths=range(4, 13), td_depths=range(6, 19, 2),
+                    scan_chains=[1, 2, 4, 8])
+    elapsed = time.perf_counter() - start
+    print(f"\nSwept {len(records)} configurations in {elapsed:.3f}s "
+          f"({len(records) / elapsed:,.0f} configs/s)")
+
+    print("\nTest time vs array size (default pattern depths, single scan chain):")
+    for size in [8, 16, 32, 64, 128, 256, 512, 1024]:
+        result = HybridBistTimingModel(systolic_size=size).run("BIST")
+        print(f"  {size:4d}x{size:<4d}: {result['total_cycles']:>8} cycles  {result['phases']}")
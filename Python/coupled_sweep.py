@@ -0,0 +1,212 @@
+"""
+STRAIT Coupled Sweep Engine
+Common-random-number sweeps that evaluate whole sweep axes from one draw per trial
+
+Only zero positions matter to Algorithm 2, so no float weights are generated.
+  • Sparsity: each trial draws one uniform matrix U, and the zero mask at
+    sparsity s is U < s. The masks of all sparsity levels are valid i.i.d. samples
+    and are nested (a zero at s stays a zero at every s' > s).
+  • Fault rate: each trial draws one random ordering of the N^2 PEs, and the
+    fault set at rate r is its first int(N^2 r / 100) entries, so fault maps are
+    nested across the fault-rate grid. The allocation state that does not depend
+    on the rate is computed once per trial: for every weight row and faulty row
+    the rank of the first fault that lands on a nonzero weight. A faulty row is
+    compatible with a weight row at F faults exactly when that rank is >= F, so
+    the compatibility of every fault level comes from one table and all
+    (sparsity, fault rate) cells of a trial run through one batched greedy pass.
+  • Array size: each trial draws per-PE uniforms U (zeros) and V (faults) for the
+    largest array only. A smaller n x n array uses the leading n x n sub-blocks,
+    which are themselves i.i.d. samples; its faults are the PEs with the smallest
+    V in that block, so the cost is about that of the largest size alone.
+Curves are smooth and monotone along the sparsity and fault-rate axes and
+correlated across array sizes.
+"""
+
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from chip_fault_index import ChipFaultIndex, greedy_recover
+
+# ==================== CONFIGURATION ====================
+ARRAY_SIZE = 256
+ITERATIONS = 500
+SPARSITY_RANGE = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9]
+FAULT_RATES = [0.03, 0.05, 0.07, 0.1]
+
+# Figure 15 grid
+ARRAY_SIZES = [16, 32, 64, 128, 256]
+FIG15_SPARSITY = 0.5
+FIG15_FAULT_RATES = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
+
+
+def draw_faults(rng: np.random.Generator, array_size: int,
+                num_faults: int) -> Tuple[List[int], List[List[int]]]:
+    """Uniform distinct fault positions, in the (f_row_add, faulty_position) format of inject_faults"""
+    flat = np.sort(rng.choice(array_size * array_size, size=num_faults, replace=False))
+    rows, cols = np.divmod(flat, array_size)
+    f_row_add, starts = np.unique(rows, return_index=True)
+    return f_row_add.tolist(), [c.tolist() for c in np.split(cols, starts[1:])]
+
+
+def draw_fault_order(rng: np.random.Generator, array_size: int, max_faults: int) -> np.ndarray:
+    """First max_faults entries of a random ordering of the N^2 PE indices"""
+    return rng.choice(array_size * array_size, size=max_faults, replace=False)
+
+
+def nested_fault_trial(zero_masks: np.ndarray, fault_order: np.ndarray,
+                       fault_counts: np.ndarray) -> np.ndarray:
+    """
+    Algorithm 2 outcome of every (zero mask, fault level) pair of one trial
+
+    Args:
+        zero_masks: (S, N, N) boolean zero masks
+        fault_order: Flat PE indices in fault order; level F uses the first F entries
+        fault_counts: (L,) number of faults of each level
+
+    Returns:
+        (S, L) boolean success matrix
+    """
+    num_masks, n, _ = zero_masks.shape
+    fault_counts = np.asarray(fault_counts)
+    if len(fault_order) == 0:
+        return np.ones((num_masks, len(fault_counts)), dtype=bool)
+
+    rows, cols = np.divmod(fault_order, n)
+    rank = np.arange(len(fault_order))
+    by_row = np.lexsort((rank, rows))
+    rows, cols, rank = rows[by_row], cols[by_row], rank[by_row]
+    f_row_add, starts, per_row = np.unique(rows, return_index=True, return_counts=True)
+    num_rows, width = len(f_row_add), int(per_row.max())
+
+    # (R, J) per-row fault columns and ranks, in rank order, padded with an unreachable rank
+    slot = np.arange(len(rows)) - np.repeat(starts, per_row)
+    row_idx = np.repeat(np.arange(num_rows), per_row)
+    never = len(fault_order)
+    col_table = np.zeros((num_rows, width), dtype=np.int64)
+    rank_table = np.full((num_rows, width), never, dtype=np.int64)
+    col_table[row_idx, slot] = cols
+    rank_table[row_idx, slot] = rank
+
+    # first fault rank that lands on a nonzero weight, (S, N, R)
+    nonzero = ~zero_masks[:, :, col_table]
+    first_conflict = np.where(nonzero, rank_table, never).min(axis=3)
+
+    # per level: active rows, fault counts and Algorithm 2 priority order (count desc, address asc)
+    level = fault_counts[:, None, None]
+    counts = (rank_table[None] < level).sum(axis=2)                  # (L, R)
+    active = rank_table[None, :, 0] < fault_counts[:, None]          # (L, R)
+    priority = np.argsort((width - counts) * num_rows + np.arange(num_rows), axis=1, kind="stable")
+
+    gathered = first_conflict[:, :, priority]                        # (S, N, L, R)
+    compat = gathered.transpose(0, 2, 1, 3) >= fault_counts[None, :, None, None]
+    active = np.take_along_axis(active, priority, axis=1)
+    recovered, _ = greedy_recover(compat.reshape(-1, n, num_rows),
+                                  np.broadcast_to(active, (num_masks,) + active.shape).reshape(-1, num_rows))
+    return recovered.all(axis=1).reshape(num_masks, len(fault_counts))
+
+
+def coupled_sweep(array_size: int = ARRAY_SIZE,
+                  sparsity_range: List[float] = SPARSITY_RANGE,
+                  fault_rates: List[float] = FAULT_RATES,
+                  iterations: int = ITERATIONS,
+                  seed: Optional[int] = None,
+                  nested_faults: bool = True) -> Dict[float, List[float]]:
+    """
+    Recovery rates (Algorithm 2) of a sparsity x fault-rate grid with coupled trials
+
+    Args:
+        nested_faults: Draw one fault ordering per trial for all fault rates
+                       (False: independent fault maps per fault rate)
+
+    Returns:
+        {sparsity: [recovery rate per fault rate]}, the format of run_experiments
+    """
+    rng = np.random.default_rng(seed)
+    thresholds = np.asarray(sparsity_range, dtype=np.float32)[:, None, None]
+    fault_counts = np.array([int(array_size * array_size * r / 100) for r in fault_rates])
+    successes = np.zeros((len(sparsity_range), len(fault_rates)))
+
+    for _ in range(iterations):
+        u = rng.random((array_size, array_size), dtype=np.float32)
+        masks = u[None] < thresholds                      # (S, N, N) nested zero masks
+        if nested_faults:
+            order = draw_fault_order(rng, array_size, int(fault_counts.max()))
+            successes += nested_fault_trial(masks, order, fault_counts)
+            continue
+        for j, num_faults in enumerate(fault_counts):
+            if num_faults == 0:
+                successes[:, j] += 1
+                continue
+            index = ChipFaultIndex(*draw_faults(rng, array_size, int(num_faults)), array_size)
+            success, _, _ = index.allocate(masks)
+            successes[:, j] += success
+
+    rates = successes / iterations * 100
+    return {s: rates[i].tolist() for i, s in enumerate(sparsity_range)}
+
+
+def coupled_size_sweep(array_sizes: List[int] = ARRAY_SIZES,
+                       sparsity_range: List[float] = [FIG15_SPARSITY],
+                       fault_rates: List[float] = FIG15_FAULT_RATES,
+                       iterations: int = ITERATIONS,
+                       seed: Optional[int] = None) -> Dict[int, Dict[float, List[float]]]:
+    """
+    Recovery rates for several array sizes from one largest-size draw per trial
+
+    Returns:
+        {array_size: {sparsity: [recovery rate per fault rate]}}
+    """
+    rng = np.random.default_rng(seed)
+    largest = max(array_sizes)
+    thresholds = np.asarray(sparsity_range, dtype=np.float32)[:, None, None]
+    fault_counts = {n: np.array([int(n * n * r / 100) for r in fault_rates]) for n in array_sizes}
+    successes = {n: np.zeros((len(sparsity_range), len(fault_rates))) for n in array_sizes}
+
+    for _ in range(iterations):
+        u = rng.random((largest, largest), dtype=np.float32)
+        v = rng.random((largest, largest))
+        for n in array_sizes:
+            masks = u[None, :n, :n] < thresholds
+            block = v[:n, :n].ravel()
+            max_faults = int(fault_counts[n].max())
+            smallest = np.argpartition(block, max_faults - 1)[:max_faults] if max_faults else \
+                np.zeros(0, dtype=np.int64)
+            order = smallest[np.argsort(block[smallest], kind="stable")]
+            successes[n] += nested_fault_trial(masks, order, fault_counts[n])
+
+    return {n: {s: (successes[n][i] / iterations * 100).tolist() for i, s in enumerate(sparsity_range)}
+            for n in array_sizes}
+
+
+def print_rates(results: Dict[float, List[float]]):
+    for sparsity, rates in results.items():
+        rate_strs = [f"{r:5.1f}%" for r in rates]
+        print(f"Sparsity {sparsity*100:2.0f}%: {rate_strs}")
+
+
+# ==================== MAIN EXECUTION ====================
+
+if __name__ == "__main__":
+    print("STRAIT Coupled Sweep Engine")
+    print("=" * 60)
+    print(f"Figure 13 grid: {ARRAY_SIZE}x{ARRAY_SIZE}, {len(SPARSITY_RANGE)} sparsity levels, "
+          f"{len(FAULT_RATES)} fault rates, {ITERATIONS} iterations")
+
+    for nested in (False, True):
+        start = time.perf_counter()
+        results = coupled_sweep(seed=42, nested_faults=nested)
+        elapsed = time.perf_counter() - start
+        print(f"\n{'Nested' if nested else 'Independent'} fault maps: {elapsed:.1f}s")
+        print_rates(results)
+
+    print(f"\nFigure 15 grid: sizes {ARRAY_SIZES}, sparsity {FIG15_SPARSITY}, "
+          f"{len(FIG15_FAULT_RATES)} fault rates, {ITERATIONS} iterations")
+    start = time.perf_counter()
+    by_size = coupled_size_sweep(seed=42)
+    elapsed = time.perf_counter() - start
+    for n, results in by_size.items():
+        rate_strs = [f"{r:5.1f}%" for r in results[FIG15_SPARSITY]]
+        print(f"Array {n:3d}x{n:3d}: {rate_strs}")
+    print(f"Size-coupled sweep: {elapsed:.1f}s")
@@ -0,0 +1,142 @@
+"""
+STRAIT Degraded-Mode Throughput Estimator
+Expected throughput with row bypass when Algorithm 2 cannot recover every faulty row
+
+In Systolic_array.v physical row p holds weight row m and receives activation m;
+partial sums flow down the columns, and a disabled PE passes partial_sum_in
+through. Bypassing an unrecovered faulty row (PE_disable on the whole row, the
+README "行旁路" strategy) therefore drops the contribution of the weight row placed
+there from every column, while the other N - u rows stay correct. The u dropped
+weight rows are recomputed in extra passes on the H healthy rows of the chip and
+added to the same outputs by the accumulator; the remaining rows of those passes
+hold zero weights, which fit any faulty row. Per trial:
+  • unrecovered rows u and effective utilization (N - u) / N
+  • extra tile passes ceil(u / H) (infinite when no healthy row is left)
+  • tile throughput 1 / (1 + extra passes) for one tile at a time, and packed
+    throughput H / (H + u) when the dropped rows of several input tiles of the
+    same output tile share recomputation passes
+Healthy rows are a conservative bound on the recomputation capacity: rows with
+faults could still take a dropped weight row that happens to avoid them.
+"""
+
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from chip_fault_index import recover_fault_batch
+
+# ==================== CONFIGURATION ====================
+ARRAY_SIZE = 256
+TRIALS = 500
+BATCH_SIZE = 128
+SPARSITY_RANGE = [0.1, 0.2, 0.3, 0.4, 0.5]
+FAULT_RATES = [0.05, 0.1, 0.5, 1.0, 2.0, 5.0]
+
+
+def degraded_metrics(unrecovered: np.ndarray, faulty_rows: np.ndarray, array_size: int) -> Dict[str, np.ndarray]:
+    """
+    Row-bypass throughput of trials with u unrecovered and F faulty rows
+
+    Returns:
+        Per-trial arrays: unrecovered, utilization, extra_passes, tile_throughput, packed_throughput
+    """
+    u = np.asarray(unrecovered, dtype=np.float64)
+    healthy = array_size - np.asarray(faulty_rows, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        extra = np.where(u == 0, 0.0, np.where(healthy > 0, np.ceil(u / healthy), np.inf))
+        packed = np.where(u == 0, 1.0, healthy / (healthy + u))
+    return {
+        "unrecovered": u,
+        "utilization": (array_size - u) / array_size,
+        "extra_passes": extra,
+        "tile_throughput": 1 / (1 + extra),
+        "packed_throughput": packed,
+    }
+
+
+def run_degraded_trials(array_size: int, sparsity_range: List[float], fault_rate: float,
+                        trials: int = TRIALS, batch_size: int = BATCH_SIZE,
+                        seed: Optional[int] = None) -> Dict[float, Dict[str, np.ndarray]]:
+    """
+    Per-trial degraded-mode metrics for one fault rate, vectorized across trials
+
+    Faults are inject_faults-style uniform distinct PEs; the sparsity levels share
+    one uniform draw per trial (nested zero masks).
+
+    Returns:
+        {sparsity: degraded_metrics of all trials}
+    """
+    rng = np.random.default_rng(seed)
+    n = array_size
+    num_faults = int(n * n * fault_rate / 100)
+    thresholds = np.asarray(sparsity_range, dtype=np.float32)
+    unrecovered = np.zeros((len(sparsity_range), trials), dtype=np.int64)
+    faulty_rows = np.zeros(trials, dtype=np.int64)
+
+    for start in range(0, trials, batch_size):
+        batch = min(batch_size, trials - start)
+        if num_faults:
+            flat = np.argpartition(rng.random((batch, n * n), dtype=np.float32), num_faults - 1,
+                                   axis=1)[:, :num_faults]
+        else:
+            flat = np.zeros((batch, 0), dtype=np.int64)
+        trial = np.repeat(np.arange(batch), flat.shape[1])
+        row, col = np.divmod(flat.ravel(), n)
+        uniform = rng.random((batch, n, n), dtype=np.float32)
+        for i, s in enumerate(thresholds):
+            u, f = recover_fault_batch(trial, row, col, uniform < s)
+            unrecovered[i, start:start + batch] = u
+            faulty_rows[start:start + batch] = f
+
+    return {s: degraded_metrics(unrecovered[i], faulty_rows, n) for i, s in enumerate(sparsity_range)}
+
+
+def throughput_curves(array_size: int = ARRAY_SIZE, sparsity_range: List[float] = SPARSITY_RANGE,
+                      fault_rates: List[float] = FAULT_RATES, trials: int = TRIALS,
+                      seed: Optional[int] = None) -> Dict[float, Dict[str, List[float]]]:
+    """
+    Expected-throughput curves over fault rate, one set per sparsity
+
+    Returns:
+        {sparsity: {"recovery_rate" (%), "mean_unrecovered", "utilization", "extra_passes",
+                    "tile_throughput", "packed_throughput"}}, each a list over fault_rates
+    """
+    curves = {s: {key: [] for key in ["recovery_rate", "mean_unrecovered", "utilization", "extra_passes",
+                                      "tile_throughput", "packed_throughput"]} for s in sparsity_range}
+    for j, fault_rate in enumerate(fault_rates):
+        per_sparsity = run_degraded_trials(array_size, sparsity_range, fault_rate, trials,
+                                           seed=None if seed is None else seed + j)
+        for s, m in per_sparsity.items():
+            curve = curves[s]
+            curve["recovery_rate"].append(float(np.mean(m["unrecovered"] == 0) * 100))
+            curve["mean_unrecovered"].append(float(m["unrecovered"].mean()))
+            curve["utilization"].append(float(m["utilization"].mean()))
+            curve["extra_passes"].append(float(m["extra_passes"].mean()))
+            curve["tile_throughput"].append(float(m["tile_throughput"].mean()))
+            curve["packed_throughput"].append(float(m["packed_throughput"].mean()))
+    return curves
+
+
+def print_curves(curves: Dict[float, Dict[str, List[float]]], fault_rates: List[float]):
+    print("fault rate:        " + "".join(f"{r:>9.2f}%" for r in fault_rates))
+    for s, c in curves.items():
+        print(f"Sparsity {s*100:2.0f}%")
+        print("  recovery rate    " + "".join(f"{v:>9.1f}%" for v in c["recovery_rate"]))
+        print("  unrecovered rows " + "".join(f"{v:>10.2f}" for v in c["mean_unrecovered"]))
+        print("  tile throughput  " + "".join(f"{v:>10.3f}" for v in c["tile_throughput"]))
+        print("  packed throughput" + "".join(f"{v:>10.3f}" for v in c["packed_throughput"]))
+
+
+# ==================== MAIN EXECUTION ====================
+
+if __name__ == "__main__":
+    print("STRAIT Degraded-Mode Throughput Estimator")
+    print("=" * 60)
+    print(f"{ARRAY_SIZE}x{ARRAY_SIZE} array, {TRIALS} trials per fault rate")
+
+    start = time.perf_counter()
+    curves = throughput_curves(seed=42)
+    elapsed = time.perf_counter() - start
+    print_curves(curves, FAULT_RATES)
+    print(f"\n{len(SPARSITY_RANGE) * len(FAULT_RATES) * TRIALS} trials in {elapsed:.1f}s")
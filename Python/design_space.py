@@ -0,0 +1,368 @@
+"""
+STRAIT Design-Space Exploration
+Pareto frontiers of area vs. repaired yield vs. BIST time over array size and rescue rows
+
+Joins three sources that so far were only read by hand:
+  • area per module from the DC reports (DC_result.py). Each module is
+    scaled from the synthesized SYSTOLIC_SIZE to the candidate array by what it
+    replicates (PEs, rows, columns or nothing, see MODULE_SCALING); rescue rows
+    add a row of PEs and per-row storage each. Modules with a timing violation are
+    reported next to the fronts (DesignSpace.violated); the reports hold one slack
+    per module at the synthesized size, so they do not separate configurations
+  • repaired yield: defects follow the negative binomial model of
+    yield_simulator.py over the die (logic area + STRAIT area). A defect outside
+    the PE array kills the die, array defects become faulty PEs. A die with f
+    faulty PEs survives when the U(f) faulty rows Algorithm 2 leaves unrecovered
+    (mean from recovery_estimator.py, taken as Poisson) fit in the R rescue rows,
+    each of which rescues one row as in figure_plot_new._rescue
+  • BIST time: cycles of the MBIST + LBIST flow from bist_timing_model.py with the
+    scan chain running through the N + R rows
+Recovery curves and BIST times are memoized in-process and cached in the results
+store (kinds "dse_recovery" and "dse_bist"); only missing points are evaluated,
+the recovery curves in a process pool. A few thousand configurations then take
+seconds, and later queries with other constraints only re-filter the table.
+"""
+
+import itertools
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from bist_timing_model import HybridBistTimingModel, MBIST_PATTERN_DEPTH
+from DC_result import collect_dc_results, to_float, violated_modules
+from recovery_estimator import estimate_batch
+from results_store import ResultsStore
+from yield_simulator import CLUSTER_ALPHA, DEFECT_DENSITY, LOGIC_AREA_MM2, PE_AREA_MM2
+
+# ==================== CONFIGURATION ====================
+DC_PATH = "./DC"
+DC_SYSTOLIC_SIZE = 8            # SYSTOLIC_SIZE the DC reports were synthesized with
+CLOCK_MHZ = 500.0
+SPARSITY = 0.0                  # workload the repaired yield is evaluated for: dense layers, the case
+                                # rescue rows must cover (at 0.5 Algorithm 2 alone recovers every die)
+YIELD_TAIL = 1e-6               # neglected probability mass of the fault-count distribution
+WORKERS = os.cpu_count() or 1
+
+# module -> what it replicates: "pe" (rows x N), "row", "column" or "fixed"
+MODULE_SCALING = {
+    "PE_STRAIT": "pe",
+    "faulty_pe_storage": "row", "row_weight_storage": "row", "mapping_table": "row",
+    "Diagnostic_loop_chains": "row",
+    "Accumulator": "column", "Accumulator_mem": "column", "Activation_buffer": "column",
+    "Activation_mem": "column", "Comparator": "column", "Weight_partialsum_buffer": "column",
+    "hybrid_bist": "fixed", "bisr_weight_allocation": "fixed", "Memory_data_generator": "fixed",
+    "eNVM": "fixed",
+}
+# used when there are no DC reports (um^2 at DC_SYSTOLIC_SIZE)
+DEFAULT_MODULE_AREA_UM2 = {"PE_STRAIT": PE_AREA_MM2 * 1e6 * DC_SYSTOLIC_SIZE ** 2}
+
+ARRAY_SIZES = [16, 32, 64, 128, 256, 512]
+RESCUE_ROWS = [0, 1, 2, 3, 4, 6, 8]
+SCAN_CHAINS = [1, 2, 4, 8]
+SA_DEPTHS = [4, 8, 12]
+TD_DEPTHS = [6, 12, 18]
+
+
+def _units(scaling: str, array_size: int, rows: int) -> int:
+    return {"pe": rows * array_size, "row": rows, "column": array_size, "fixed": 1}[scaling]
+
+
+def load_module_areas(dc_path: str = DC_PATH) -> Tuple[Dict[str, float], List[str], str]:
+    """
+    Per-module total area (um^2) at DC_SYSTOLIC_SIZE
+
+    Returns:
+        Tuple of ({module: area}, modules with timing violations, "dc" or "default")
+    """
+    if not os.path.isdir(dc_path):
+        return dict(DEFAULT_MODULE_AREA_UM2), [], "default"
+    results = collect_dc_results(dc_path)
+    areas = {}
+    for module in MODULE_SCALING:
+        if module in results and to_float(results[module]["total_area"]) is not None:
+            areas[module] = to_float(results[module]["total_area"])
+    violated = [m for m in violated_modules(results) if m in MODULE_SCALING]
+    return areas, violated, "dc"
+
+
+def negative_binomial_fault_pmf(array_mm2: float, logic_mm2: float,
+                                defect_density: float = DEFECT_DENSITY,
+                                alpha: float = CLUSTER_ALPHA) -> np.ndarray:
+    """
+    P(no defect in the logic area and f faulty PEs) for f = 0, 1, ... until the tail is below YIELD_TAIL
+
+    With die defect density Gamma(alpha, mean D0) and Poisson defects given the
+    density, P(0 logic, f array) = G(alpha+f)/(G(alpha) f!) b^alpha a^f / (b + l + a)^(alpha+f)
+    with b = alpha / D0 and a, l the array and logic areas.
+    """
+    d0 = defect_density / 100                                           # per mm^2
+    b, a, l = alpha / d0, array_mm2, logic_mm2
+    f_max = 16
+    while True:
+        f = np.arange(f_max)
+        log_p = (np.vectorize(math.lgamma)(alpha + f) - math.lgamma(alpha) - np.vectorize(math.lgamma)(f + 1)
+                 + alpha * math.log(b) + f * math.log(a) - (alpha + f) * math.log(b + l + a))
+        pmf = np.exp(log_p)
+        # tail of the unconditional array fault count: NB with mean D0 * a
+        tail = 1 - np.sum(np.exp(np.vectorize(math.lgamma)(alpha + f) - math.lgamma(alpha)
+                                 - np.vectorize(math.lgamma)(f + 1) + alpha * math.log(b / (b + a))
+                                 + f * math.log(a / (b + a))))
+        if tail < YIELD_TAIL:
+            return pmf
+        f_max *= 2
+
+
+def recovery_curve(array_size: int, sparsity: float, max_faults: int) -> np.ndarray:
+    """Expected unrecovered faulty rows U(f) for f = 0 .. max_faults - 1 faulty PEs"""
+    f = np.arange(max_faults)
+    u = estimate_batch(array_size, sparsity, f / (array_size * array_size) * 100)["expected_unrecovered"]
+    u = np.asarray(u, dtype=np.float64)
+    u[0] = 0.0
+    return u
+
+
+def poisson_cdf(mean: np.ndarray, k: int) -> np.ndarray:
+    """P(Poisson(mean) <= k)"""
+    term = np.exp(-mean)
+    total = term.copy()
+    for i in range(1, k + 1):
+        term = term * mean / i
+        total += term
+    return total
+
+
+def pareto_front(records: Sequence[Dict], minimize: Sequence[str] = ("area_mm2", "bist_us"),
+                 maximize: Sequence[str] = ("repaired_yield",)) -> List[Dict]:
+    """Records not dominated on the given objectives, in increasing order of the first objective"""
+    if not records:
+        return []
+    costs = np.array([[r[k] for k in minimize] + [-r[k] for k in maximize] for r in records], dtype=np.float64)
+    order = np.lexsort(costs.T[::-1])
+    front: List[int] = []
+    for i in order:
+        kept = costs[front]
+        if len(front) and np.any(np.all(kept <= costs[i], axis=1) & np.any(kept < costs[i], axis=1)):
+            continue
+        if len(front) and np.any(np.all(kept == costs[i], axis=1)):
+            continue
+        front.append(int(i))
+    return [records[i] for i in front]
+
+
+class DesignSpace:
+    def __init__(self, dc_path: str = DC_PATH, store: Optional[ResultsStore] = None,
+                 sparsity: float = SPARSITY, defect_density: float = DEFECT_DENSITY,
+                 alpha: float = CLUSTER_ALPHA, workers: int = WORKERS):
+        """
+        Args:
+            dc_path: Directory of DC module folders (area.log / timing.log)
+            store: Optional ResultsStore used as a persistent cache
+            sparsity: Weight sparsity the repaired yield is evaluated for
+        """
+        self.module_areas, self.violated, self.area_source = load_module_areas(dc_path)
+        self.store = store
+        self.sparsity = sparsity
+        self.defect_density = defect_density
+        self.alpha = alpha
+        self.workers = max(1, workers)
+        self._curves: Dict[int, np.ndarray] = {}
+        self._bist: Dict[Tuple, int] = {}
+        if store is not None:
+            for record in store.latest("dse_recovery").values():
+                if record["sparsity"] == sparsity:
+                    self._keep_curve(record["array_size"], np.asarray(record["unrecovered"]))
+            for record in store.latest("dse_bist").values():
+                self._bist[self._bist_key(record)] = record["total_cycles"]
+
+    # ---------------- area ----------------
+
+    def area(self, array_size: int, rescue_rows: int) -> Dict[str, float]:
+        """
+        Die area split in mm^2
+
+        Returns:
+            {"array_mm2" (PEs incl. rescue rows), "strait_mm2" (all scaled modules), "die_mm2"}
+        """
+        rows = array_size + rescue_rows
+        strait = 0.0
+        array = 0.0
+        for module, area in self.module_areas.items():
+            scaling = MODULE_SCALING[module]
+            scaled = area / _units(scaling, DC_SYSTOLIC_SIZE, DC_SYSTOLIC_SIZE) \
+                * _units(scaling, array_size, rows) / 1e6
+            strait += scaled
+            if scaling == "pe":
+                array += scaled
+        return {"array_mm2": array, "strait_mm2": strait, "die_mm2": LOGIC_AREA_MM2 + strait}
+
+    # ---------------- repaired yield ----------------
+
+    def _keep_curve(self, array_size: int, curve: np.ndarray):
+        if len(curve) > len(self._curves.get(array_size, ())):
+            self._curves[array_size] = curve
+
+    def _fault_pmf(self, array_size: int, rescue_rows: int) -> np.ndarray:
+        area = self.area(array_size, rescue_rows)
+        return negative_binomial_fault_pmf(area["array_mm2"], area["die_mm2"] - area["array_mm2"],
+                                           self.defect_density, self.alpha)
+
+    def repaired_yield(self, array_size: int, rescue_rows: int) -> float:
+        """Fraction of dies usable after Algorithm 2 and rescue rows (needs the recovery curve cached)"""
+        pmf = self._fault_pmf(array_size, rescue_rows)
+        curve = self._curves[array_size]
+        faults = min(len(pmf), len(curve))
+        return float(np.sum(pmf[:faults] * poisson_cdf(curve[:faults], rescue_rows)))
+
+    def _prepare_curves(self, configs: Iterable[Dict]):
+        """Evaluate missing recovery curves, in parallel across array sizes"""
+        needed: Dict[int, int] = {}
+        for c in configs:
+            n = c["array_size"]
+            faults = len(self._fault_pmf(n, c["rescue_rows"]))
+            needed[n] = max(needed.get(n, 0), faults)
+        missing = {n: 1 << math.ceil(math.log2(f)) for n, f in needed.items()
+                   if len(self._curves.get(n, ())) < f}
+        if not missing:
+            return
+        sizes = sorted(missing)
+        args = ([n for n in sizes], [self.sparsity] * len(sizes), [missing[n] for n in sizes])
+        if self.workers > 1 and len(sizes) > 1:
+            with ProcessPoolExecutor(min(self.workers, len(sizes))) as pool:
+                curves = list(pool.map(recovery_curve, *args))
+        else:
+            curves = list(map(recovery_curve, *args))
+        for n, curve in zip(sizes, curves):
+            self._keep_curve(n, curve)
+            if self.store is not None:
+                key = {"array_size": n, "sparsity": self.sparsity, "max_faults": len(curve)}
+                self.store.put("dse_recovery", key, {**key, "unrecovered": curve})
+
+    # ---------------- BIST time ----------------
+
+    @staticmethod
+    def _bist_key(c: Dict) -> Tuple:
+        return (c["array_size"], c["rescue_rows"], c["scan_chains"], c["sa_depth"], c["td_depth"],
+                c["mbist_depth"])
+
+    def bist_cycles(self, config: Dict) -> int:
+        """MBIST + LBIST cycles, memoized per timing-relevant configuration"""
+        key = self._bist_key(config)
+        if key not in self._bist:
+            n, r, chains, sa, td, mb = key
+            model = HybridBistTimingModel(n, sa, td, mb, scan_chain_length=n + r, scan_chains=chains)
+            self._bist[key] = model.run("BIST")["total_cycles"]
+            if self.store is not None:
+                record = {"array_size": n, "rescue_rows": r, "scan_chains": chains, "sa_depth": sa,
+                          "td_depth": td, "mbist_depth": mb}
+                self.store.put("dse_bist", record, {**record, "total_cycles": self._bist[key]})
+        return self._bist[key]
+
+    # ---------------- exploration ----------------
+
+    def evaluate(self, configs: List[Dict]) -> List[Dict]:
+        """
+        Metrics of every configuration
+
+        Args:
+            configs: Dicts with array_size, rescue_rows, scan_chains, sa_depth, td_depth, mbist_depth
+
+        Returns:
+            One record per configuration with area_mm2, repaired_yield (%), bist_cycles, bist_us
+            and good_dies_per_cm2
+        """
+        self._prepare_curves(configs)
+        records = []
+        for c in configs:
+            area = self.area(c["array_size"], c["rescue_rows"])
+            repaired = self.repaired_yield(c["array_size"], c["rescue_rows"])
+            cycles = self.bist_cycles(c)
+            records.append({
+                **c,
+                "area_mm2": area["die_mm2"],
+                "strait_mm2": area["strait_mm2"],
+                "repaired_yield": repaired * 100,
+                "good_dies_per_cm2": repaired * 100 / area["die_mm2"],
+                "bist_cycles": cycles,
+                "bist_us": cycles / CLOCK_MHZ,
+            })
+        return records
+
+    def explore(self, array_sizes: Iterable[int] = ARRAY_SIZES, rescue_rows: Iterable[int] = RESCUE_ROWS,
+                scan_chains: Iterable[int] = SCAN_CHAINS, sa_depths: Iterable[int] = SA_DEPTHS,
+                td_depths: Iterable[int] = TD_DEPTHS,
+                mbist_depths: Iterable[int] = (MBIST_PATTERN_DEPTH,)) -> List[Dict]:
+        """evaluate over the cartesian product of the design axes"""
+        configs = [{"array_size": n, "rescue_rows": r, "scan_chains": c, "sa_depth": sa, "td_depth": td,
+                    "mbist_depth": mb}
+                   for n, r, c, sa, td, mb in itertools.product(array_sizes, rescue_rows, scan_chains,
+                                                                 sa_depths, td_depths, mbist_depths)]
+        return self.evaluate(configs)
+
+
+def query(records: Sequence[Dict], max_area: Optional[float] = None, min_yield: Optional[float] = None,
+          max_bist_us: Optional[float] = None, array_size: Optional[int] = None) -> List[Dict]:
+    """Pareto front of the records that satisfy the constraints"""
+    kept = [r for r in records
+            if (max_area is None or r["area_mm2"] <= max_area)
+            and (min_yield is None or r["repaired_yield"] >= min_yield)
+            and (max_bist_us is None or r["bist_us"] <= max_bist_us)
+            and (array_size is None or r["array_size"] == array_size)]
+    return pareto_front(kept)
+
+
+def print_front(front: Sequence[Dict], limit: int = 20):
+    print(f"{'N':>5} {'R':>3} {'chains':>6} {'SA':>3} {'TD':>3} {'area mm2':>9} {'yield %':>8} "
+          f"{'BIST us':>9} {'good/cm2':>9}")
+    for r in front[:limit]:
+        print(f"{r['array_size']:>5} {r['rescue_rows']:>3} {r['scan_chains']:>6} {r['sa_depth']:>3} "
+              f"{r['td_depth']:>3} {r['area_mm2']:>9.2f} {r['repaired_yield']:>8.3f} {r['bist_us']:>9.2f} "
+              f"{r['good_dies_per_cm2']:>9.3f}")
+    if len(front) > limit:
+        print(f"  ... {len(front) - limit} more")
+
+
+# ==================== MAIN EXECUTION ====================
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="STRAIT design-space exploration")
+    parser.add_argument("--dc-path", default=DC_PATH)
+    parser.add_argument("--sparsity", type=float, default=SPARSITY)
+    parser.add_argument("--max-area", type=float, default=None, help="die area limit in mm^2")
+    parser.add_argument("--min-yield", type=float, default=None, help="repaired yield floor in %%")
+    parser.add_argument("--max-bist-us", type=float, default=None, help="BIST time limit in us")
+    parser.add_argument("--array-size", type=int, default=None)
+    parser.add_argument("--no-cache", action="store_true", help="do not read or write ./results")
+    args = parser.parse_args()
+
+    print("STRAIT Design-Space Exploration")
+    print("=" * 60)
+    space = DesignSpace(args.dc_path, None if args.no_cache else ResultsStore(), sparsity=args.sparsity)
+    print(f"Area source: {space.area_source} ({len(space.module_areas)} modules), "
+          f"sparsity {space.sparsity}")
+    if space.violated:
+        print(f"Warning: timing violations in {', '.join(space.violated)} at the synthesized clock; "
+              f"the fronts below assume they are closed")
+
+    start = time.perf_counter()
+    records = space.explore()
+    elapsed = time.perf_counter() - start
+    print(f"{len(records)} configurations evaluated in {elapsed:.2f}s")
+
+    start = time.perf_counter()
+    sizes = [args.array_size] if args.array_size else ARRAY_SIZES
+    fronts = {n: query(records, args.max_area, args.min_yield, args.max_bist_us, n) for n in sizes}
+    print(f"Pareto fronts (area, repaired yield, BIST time) per array size in "
+          f"{(time.perf_counter() - start) * 1e3:.1f} ms")
+    for n, front in fronts.items():
+        print(f"\n{n}x{n}: {len(front)} Pareto points")
+        print_front(front, limit=5)
+
+    start = time.perf_counter()
+    space.explore(rescue_rows=RESCUE_ROWS + [12, 16])
+    print(f"\nRe-exploring with more rescue rows (memoized): {time.perf_counter() - start:.2f}s")
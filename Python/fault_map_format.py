@@ -0,0 +1,326 @@
+"""
+STRAIT Fault-Map File Format
+Versioned binary storage of chip fault maps in the eNVM bit layout
+
+One file holds the fault maps of a fleet of chips with the same array size. Each
+map uses the layout of eNVM.v / faulty_pe_storage: PE (i, j) is bit i*N + j of
+faulty_patterns_flat. Three encodings are supported:
+  • dense:  ceil(N^2 / 8) bytes per chip, little bit order, so every record read
+            as a little-endian integer equals envm_faulty_patterns_flat
+  • sparse: sorted flat PE indices of the faulty PEs
+  • rle:    alternating healthy/faulty run lengths of the flat bit stream,
+            starting with a (possibly empty) healthy run
+Sparse and rle records are addressed through an offset index (num_chips + 1
+uint64 entries). The writer streams batches to disk, "auto" picks the smallest
+encoding for the first batch. The reader memory-maps the data and index, so
+opening a file costs nothing and batches of chips decode with numpy only.
+
+Layout (little-endian):
+    header   HEADER_SIZE bytes: magic, version, encoding, array size, chip count,
+             data offset, index offset, value itemsize
+    data     dense records, or sparse indices / rle runs (uint16 or uint32)
+    index    sparse / rle only: per-chip value offsets
+"""
+
+import os
+import struct
+import time
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# ==================== CONFIGURATION ====================
+MAGIC = b"STRAITFM"
+FORMAT_VERSION = 1
+HEADER_SIZE = 64
+ENCODINGS = {"dense": 0, "sparse": 1, "rle": 2}
+
+_HEADER = struct.Struct("<8sHHIQQQB")
+
+
+def _value_dtype(array_size: int, encoding: str) -> np.dtype:
+    """Smallest unsigned type holding a flat PE index (sparse) or a run length (rle)"""
+    largest = array_size * array_size - (encoding == "sparse")
+    return np.dtype("<u2") if largest <= 0xFFFF else np.dtype("<u4")
+
+
+def _record_bytes(array_size: int) -> int:
+    return -(-array_size * array_size // 8)
+
+
+def fault_lists_to_map(f_row_add: Sequence[int], faulty_position: Sequence[Sequence[int]],
+                       array_size: int) -> np.ndarray:
+    """Dense N x N boolean map from the (f_row_add, faulty_position) lists of inject_faults"""
+    fault_map = np.zeros((array_size, array_size), dtype=bool)
+    for row, positions in zip(f_row_add, faulty_position):
+        fault_map[row, list(positions)] = True
+    return fault_map
+
+
+def map_to_fault_lists(fault_map: np.ndarray) -> Tuple[List[int], List[List[int]]]:
+    """(f_row_add, faulty_position) lists of an N x N boolean map"""
+    rows = np.flatnonzero(fault_map.any(axis=1))
+    return rows.tolist(), [np.flatnonzero(fault_map[r]).tolist() for r in rows]
+
+
+def _encode_rle(flat: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Run lengths and runs-per-chip of a (B, N^2) boolean batch"""
+    batch, total = flat.shape
+    padded = np.concatenate([np.zeros((batch, 1), dtype=np.int8), flat.astype(np.int8)], axis=1)
+    chip, pos = np.nonzero(np.diff(padded, axis=1))
+    # boundaries per chip: 0, every change position, N^2 (start sorts before a change at 0)
+    chips = np.concatenate([np.arange(batch), chip, np.arange(batch)])
+    bounds = np.concatenate([np.zeros(batch, dtype=np.int64), pos, np.full(batch, total)])
+    kind = np.concatenate([np.zeros(batch), np.ones(len(pos)), np.full(batch, 2)])
+    order = np.lexsort((kind, bounds, chips))
+    chips, bounds = chips[order], bounds[order]
+    same_chip = chips[1:] == chips[:-1]
+    return np.diff(bounds)[same_chip], np.bincount(chip, minlength=batch) + 1
+
+
+class FaultMapWriter:
+    def __init__(self, path: str, array_size: int, encoding: str = "auto"):
+        """
+        Streaming writer; call append() with batches and close() (or use as a context manager)
+
+        Args:
+            path: Output file
+            array_size: Systolic array dimension N
+            encoding: "dense", "sparse", "rle" or "auto" (smallest for the first batch)
+        """
+        if encoding != "auto" and encoding not in ENCODINGS:
+            raise ValueError(f"Unknown encoding {encoding!r}")
+        self.path = path
+        self.array_size = array_size
+        self.encoding = encoding
+        self.num_chips = 0
+        self._offsets = [0]
+        self._file = open(path, "wb")
+        self._file.write(b"\0" * HEADER_SIZE)
+
+    def _choose(self, flat: np.ndarray) -> str:
+        faults = int(flat.sum())
+        runs = int(_encode_rle(flat)[1].sum())
+        sizes = {"dense": flat.shape[0] * _record_bytes(self.array_size),
+                 "sparse": faults * _value_dtype(self.array_size, "sparse").itemsize + 8 * flat.shape[0],
+                 "rle": runs * _value_dtype(self.array_size, "rle").itemsize + 8 * flat.shape[0]}
+        return min(sizes, key=sizes.get)
+
+    def append(self, fault_maps: np.ndarray):
+        """Write a (B, N, N) boolean batch of fault maps"""
+        fault_maps = np.asarray(fault_maps, dtype=bool)
+        if fault_maps.ndim == 2:
+            fault_maps = fault_maps[None]
+        batch = fault_maps.shape[0]
+        flat = fault_maps.reshape(batch, self.array_size * self.array_size)
+        if self.encoding == "auto":
+            self.encoding = self._choose(flat)
+
+        if self.encoding == "dense":
+            self._file.write(np.packbits(flat, axis=1, bitorder="little").tobytes())
+        elif self.encoding == "sparse":
+            chip, pos = np.nonzero(flat)
+            self._file.write(pos.astype(_value_dtype(self.array_size, "sparse")).tobytes())
+            self._offsets.extend((self._offsets[-1] + np.cumsum(np.bincount(chip, minlength=batch))).tolist())
+        else:
+            runs, per_chip = _encode_rle(flat)
+            self._file.write(runs.astype(_value_dtype(self.array_size, "rle")).tobytes())
+            self._offsets.extend((self._offsets[-1] + np.cumsum(per_chip)).tolist())
+        self.num_chips += batch
+
+    def close(self):
+        if self._file.closed:
+            return
+        if self.encoding == "auto":
+            self.encoding = "dense"
+        index_offset = 0
+        if self.encoding != "dense":
+            end = self._file.tell()
+            self._file.write(b"\0" * (-end % 8))
+            index_offset = self._file.tell()
+            self._file.write(np.asarray(self._offsets, dtype="<u8").tobytes())
+        itemsize = 0 if self.encoding == "dense" else _value_dtype(self.array_size, self.encoding).itemsize
+        header = _HEADER.pack(MAGIC, FORMAT_VERSION, ENCODINGS[self.encoding], self.array_size,
+                              self.num_chips, HEADER_SIZE, index_offset, itemsize)
+        self._file.seek(0)
+        self._file.write(header.ljust(HEADER_SIZE, b"\0"))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_fault_maps(path: str, fault_maps: Iterable[np.ndarray], array_size: int,
+                     encoding: str = "auto") -> int:
+    """
+    Bulk-write fault maps given as one (C, N, N) array or an iterable of batches
+
+    Returns:
+        Number of chips written
+    """
+    with FaultMapWriter(path, array_size, encoding) as writer:
+        if isinstance(fault_maps, np.ndarray):
+            fault_maps = [fault_maps]
+        for batch in fault_maps:
+            writer.append(batch)
+    return writer.num_chips
+
+
+class FaultMapFile:
+    def __init__(self, path: str):
+        """Memory-map a fault-map file written by FaultMapWriter"""
+        with open(path, "rb") as f:
+            raw = f.read(HEADER_SIZE)
+        if len(raw) < HEADER_SIZE or raw[:8] != MAGIC:
+            raise ValueError(f"{path} is not a STRAIT fault-map file")
+        magic, version, encoding, array_size, num_chips, data_offset, index_offset, itemsize = \
+            _HEADER.unpack_from(raw)
+        if version > FORMAT_VERSION:
+            raise ValueError(f"{path} uses format version {version}, newest supported is {FORMAT_VERSION}")
+
+        self.path = path
+        self.version = version
+        self.encoding = {v: k for k, v in ENCODINGS.items()}[encoding]
+        self.array_size = array_size
+        self.num_chips = num_chips
+
+        if self.encoding == "dense":
+            self.records = np.memmap(path, dtype=np.uint8, mode="r", offset=data_offset,
+                                     shape=(num_chips, _record_bytes(array_size))) if num_chips else \
+                np.zeros((0, _record_bytes(array_size)), dtype=np.uint8)
+        else:
+            self.offsets = np.memmap(path, dtype="<u8", mode="r", offset=index_offset, shape=(num_chips + 1,))
+            count = int(self.offsets[-1])
+            self.values = np.memmap(path, dtype=np.dtype(f"<u{itemsize}"), mode="r", offset=data_offset,
+                                    shape=(count,)) if count else np.zeros(0, dtype=np.dtype(f"<u{itemsize}"))
+
+    def __len__(self) -> int:
+        return self.num_chips
+
+    def __getitem__(self, chip: int) -> np.ndarray:
+        if not -self.num_chips <= chip < self.num_chips:
+            raise IndexError(chip)
+        chip %= self.num_chips
+        return self.dense(chip, chip + 1)[0]
+
+    def dense(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """Decode chips [start, stop) into a (k, N, N) boolean array"""
+        stop = self.num_chips if stop is None else min(stop, self.num_chips)
+        n, total = self.array_size, self.array_size * self.array_size
+        if self.encoding == "dense":
+            bits = np.unpackbits(self.records[start:stop], axis=1, count=total, bitorder="little")
+            return bits.astype(bool).reshape(-1, n, n)
+
+        lo, hi = int(self.offsets[start]), int(self.offsets[stop])
+        per_chip = np.diff(self.offsets[start:stop + 1]).astype(np.int64)
+        values = np.asarray(self.values[lo:hi], dtype=np.int64)
+        out = np.zeros((stop - start, total), dtype=bool)
+        if self.encoding == "sparse":
+            out[np.repeat(np.arange(stop - start), per_chip), values] = True
+        else:
+            # every chip's runs add up to N^2, so run ends are positions in the flattened batch
+            ends = np.cumsum(values)
+            run_index = np.arange(hi - lo) - np.repeat(self.offsets[start:stop].astype(np.int64) - lo, per_chip)
+            faulty = run_index % 2 == 1
+            lengths = values[faulty]
+            first = np.repeat(ends[faulty] - np.cumsum(lengths), lengths)
+            out.reshape(-1)[first + np.arange(int(lengths.sum()))] = True
+        return out.reshape(-1, n, n)
+
+    def iter_batches(self, batch_size: int = 4096):
+        """Yield (start index, (k, N, N) boolean batch) over the whole file"""
+        for start in range(0, self.num_chips, batch_size):
+            yield start, self.dense(start, start + batch_size)
+
+    def fault_counts(self, batch_size: int = 4096) -> np.ndarray:
+        """Number of faulty PEs of every chip, without decoding the maps (dense: batch_size records at a time)"""
+        if self.encoding == "dense":
+            popcount = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1, dtype=np.uint8)
+            counts = np.empty(self.num_chips, dtype=np.int64)
+            for start in range(0, self.num_chips, batch_size):
+                counts[start:start + batch_size] = popcount[self.records[start:start + batch_size]].sum(
+                    axis=1, dtype=np.int64)
+            return counts
+        if self.encoding == "sparse":
+            return np.diff(self.offsets).astype(np.int64)
+        per_chip = np.diff(self.offsets).astype(np.int64)
+        run_index = np.arange(len(self.values)) - np.repeat(self.offsets[:-1].astype(np.int64), per_chip)
+        return np.bincount(np.repeat(np.arange(self.num_chips), per_chip), minlength=self.num_chips,
+                           weights=np.where(run_index % 2 == 1, self.values, 0)).astype(np.int64)
+
+    def fault_lists(self, chip: int) -> Tuple[List[int], List[List[int]]]:
+        """(f_row_add, faulty_position) lists of one chip, as inject_faults returns them"""
+        return map_to_fault_lists(self[chip])
+
+
+def write_envm_image(path: str, fault_maps: np.ndarray):
+    """
+    Write a $readmemh image of eNVM faulty_pe_storage
+
+    Chip c occupies words [c*N, (c+1)*N); word c*N + i is row i with column j at bit j,
+    so one chip is loaded with $readmemh(path, faulty_pe_storage, c*N, c*N + N - 1).
+    """
+    fault_maps = np.asarray(fault_maps, dtype=bool)
+    if fault_maps.ndim == 2:
+        fault_maps = fault_maps[None]
+    n = fault_maps.shape[-1]
+    rows = fault_maps.reshape(-1, n)
+    padded = np.zeros((rows.shape[0], -(-n // 8) * 8), dtype=bool)
+    padded[:, :n] = rows
+    packed = np.packbits(padded, axis=1, bitorder="little")[:, ::-1]
+    digits = -(-n // 4)
+    with open(path, "w") as f:
+        f.write("\n".join(row.tobytes().hex()[-digits:] for row in packed) + "\n")
+
+
+# ==================== MAIN EXECUTION ====================
+
+if __name__ == "__main__":
+    import tempfile
+
+    print("STRAIT Fault-Map File Format")
+    print("=" * 60)
+    rng = np.random.default_rng(42)
+    n, chips, fault_rate = 64, 200_000, 0.1
+    faults = int(n * n * fault_rate / 100)
+
+    def batches(batch_size=20_000):
+        for start in range(0, chips, batch_size):
+            maps = np.zeros((batch_size, n * n), dtype=bool)
+            np.put_along_axis(maps, rng.integers(0, n * n, size=(batch_size, faults)), True, axis=1)
+            yield maps.reshape(-1, n, n)
+
+    sample = next(batches(1000))
+    text_bytes = len(repr([map_to_fault_lists(m) for m in sample]).encode()) * chips / len(sample)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{chips} chips, {n}x{n}, {fault_rate}% faulty PEs "
+              f"(text lists ~{text_bytes / 1e6:.0f} MB)")
+        for encoding in ("dense", "sparse", "rle"):
+            path = os.path.join(tmp, f"fleet_{encoding}.fmap")
+            rng = np.random.default_rng(7)
+            start = time.perf_counter()
+            write_fault_maps(path, batches(), n, encoding)
+            write_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            fleet = FaultMapFile(path)
+            counts = fleet.fault_counts()
+            decoded = sum(int(batch.sum()) for _, batch in fleet.iter_batches(20_000))
+            read_time = time.perf_counter() - start
+            print(f"  • {encoding:6s}: {os.path.getsize(path) / 1e6:7.1f} MB, write {write_time:5.2f}s, "
+                  f"count + decode all {read_time:5.2f}s, faults counted {int(counts.sum())}, decoded {decoded}")
+
+        auto = os.path.join(tmp, "fleet_auto.fmap")
+        write_fault_maps(auto, sample, n)
+        fleet = FaultMapFile(auto)
+        print(f"\nauto encoding for this fleet: {fleet.encoding}; round trip exact: "
+              f"{bool(np.array_equal(fleet.dense(), sample))}")
+
+        image = os.path.join(tmp, "envm_faulty_pe_storage.hex")
+        write_envm_image(image, sample[:4])
+        with open(image) as f:
+            print(f"eNVM image for 4 chips: {len(f.read().split())} words of {n} bits")
@@ -9,6 +9,10 @@ import matplotlib.pyplot as plt
 import random
 from typing import List, Tuple, Dict
 
+from zero_masks import generate_zero_weight_positions
+
+MASK_GENERATION = "float"   # Options: "float" (full weight matrix, reproduces seeded figures), "packed" (bit masks only)
+
 class StraitRecovery:
     def __init__(self, array_size: int = 256):
         """Initialize STRAIT recovery system for given array size"""
@@ -87,6 +91,27 @@ class StraitRecovery:
             zero_positions.append(zero_cols)
         return zero_positions
     
+    def generate_zero_weight_positions(self, sparsity: float) -> List[List[int]]:
+        """
+        Draw the zero weight positions of a random weight matrix directly
+        
+        Same distribution as get_zero_weight_positions(generate_weight_matrix(sparsity)),
+        drawn as packed bit masks without the float weights (see zero_masks.py)
+        
+        Args:
+            sparsity: Fraction of weights that should be zero (0.0 to 1.0)
+        
+        Returns:
+            List of zero weight column indices for each row
+        """
+        return generate_zero_weight_positions(self.num_row, sparsity)
+    
+    def draw_zero_weight_positions(self, sparsity: float) -> List[List[int]]:
+        """Zero weight positions of a random weight matrix (MASK_GENERATION selects the path)"""
+        if MASK_GENERATION == "packed":
+            return self.generate_zero_weight_positions(sparsity)
+        return self.get_zero_weight_positions(self.generate_weight_matrix(sparsity))
+    
     def positions_match(self, faulty_pos: List[int], zero_weight_pos: List[int]) -> bool:
         """
         Check if all faulty positions can be covered by zero weight positions
@@ -186,9 +211,8 @@ class StraitRecovery:
         Returns:
             True if recovery was successful
         """
-        # Generate weight matrix with specified sparsity
-        weights = self.generate_weight_matrix(sparsity)
-        z_weight_position = self.get_zero_weight_positions(weights)
+        # Draw the zero weight pattern with specified sparsity
+        z_weight_position = self.draw_zero_weight_positions(sparsity)
         
         # Inject faults with specified rate
         f_row_add, faulty_position, f_count = self.inject_faults(fault_rate)
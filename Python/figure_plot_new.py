@@ -7,18 +7,23 @@ Enhanced Algorithm with Multiple Rescue Rows for AI Accelerator Fault Recovery
 import numpy as np
 import matplotlib.pyplot as plt
 import random
+import time
 from typing import List, Tuple, Dict
 
+from zero_masks import generate_zero_weight_positions
+
 # ==================== CONFIGURATION ====================
 # Algorithm Configuration
 RECOVERY_MODE = "original"  # Options: "original", "enhanced"
 NUM_RESCUE_ROWS = 3        # Number of rescue rows to add (1, 2, 3, etc.)
 ITERATIONS = 1000           # Number of iterations per experiment
+MASK_GENERATION = "float"   # Options: "float" (full weight matrix, reproduces seeded figures), "packed" (bit masks only)
 
 # Figure Generation Selection
 GENERATE_FIG13 = 0      # Recovery rate vs Sparsity
 GENERATE_FIG14 = 0      # Recovery rate vs Fault rate  
 GENERATE_FIG15 = True      # Recovery rate vs Array size
+FIG15_COUPLED = False   # Figure 15 through coupled_sweep.coupled_size_sweep (original Algorithm 2 only)
 
 # ==================== CORE IMPLEMENTATION ====================
 
@@ -68,6 +73,16 @@ class StraitEnhancedRecovery:
         """Get zero weight positions for each row"""
         return [np.where(weights[row] == 0)[0].tolist() for row in range(self.array_size)]
     
+    def generate_zero_weight_positions(self, sparsity: float) -> List[List[int]]:
+        """Draw zero weight positions as packed bit masks, without the float weights"""
+        return generate_zero_weight_positions(self.array_size, sparsity)
+    
+    def draw_zero_weight_positions(self, sparsity: float) -> List[List[int]]:
+        """Zero weight positions of a random weight matrix (MASK_GENERATION selects the path)"""
+        if MASK_GENERATION == "packed":
+            return self.generate_zero_weight_positions(sparsity)
+        return self.get_zero_weight_positions(self.generate_weight_matrix(sparsity))
+    
     def positions_match(self, faulty_pos: List[int], zero_weight_pos: List[int]) -> bool:
         """Check if all faulty positions can be covered by zero weight positions"""
         return all(pos in zero_weight_pos for pos in faulty_pos)
@@ -116,9 +131,33 @@ class StraitEnhancedRecovery:
         if not unrecovered_rows:
             return True
         
-        rescued_rows = set()
+        rescued_rows, _ = self._rescue(unrecovered_rows, faulty_position, f_count,
+                                       z_weight_position, fault_rate)
+        
+        # SUCCESS only if ALL unrecovered rows are rescued
+        return len(rescued_rows) == len(unrecovered_rows)
+    
+    def _rescue(self, unrecovered_rows: List[int], 
+                faulty_position: List[List[int]], 
+                f_count: List[int],
+                z_weight_position: List[List[int]],
+                fault_rate: float,
+                num_rows: int = None) -> Tuple[List[int], int]:
+        """
+        Assign unrecovered rows to rescue rows, one rescue row at a time
         
-        for _ in range(NUM_RESCUE_ROWS):
+        The process for K rescue rows is a prefix of the process for K+1: once every
+        unrecovered row is rescued the remaining rows are not counted as used. Their
+        fault patterns are still drawn, so the random sequence (and every seeded
+        figure) is the same as when all rescue rows are tried.
+        
+        Returns:
+            Tuple of (rescued faulty-row indices in rescue order, rescue rows used)
+        """
+        rescued_rows = []
+        rows_used = 0
+        
+        for _ in range(NUM_RESCUE_ROWS if num_rows is None else num_rows):
             # Generate fault pattern for this rescue row
             total_faults_in_row = int(self.array_size * fault_rate / 100)
             if total_faults_in_row > 0:
@@ -127,6 +166,10 @@ class StraitEnhancedRecovery:
             else:
                 rescue_row_faults = []
             
+            if len(rescued_rows) == len(unrecovered_rows):
+                continue
+            rows_used += 1
+            
             working_pes = [i for i in range(self.array_size) if i not in rescue_row_faults]
             
             # Find best match among remaining unrecovered rows
@@ -152,10 +195,33 @@ class StraitEnhancedRecovery:
                             break
             
             if best_match_idx != -1:
-                rescued_rows.add(best_match_idx)
+                rescued_rows.append(best_match_idx)
         
-        # SUCCESS only if ALL unrecovered rows are rescued
-        return len(rescued_rows) == len(unrecovered_rows)
+        return rescued_rows, rows_used
+    
+    def rescue_rows_needed(self, sparsity: float, fault_rate: float, max_rows: int) -> int:
+        """
+        Run a single experiment and return how many rescue rows it needs
+        
+        Returns:
+            0 if Algorithm 2 alone recovers all rows, k (1..max_rows) if k rescue rows
+            are needed, max_rows + 1 if max_rows rescue rows are not enough (or rescue
+            rows are disabled)
+        """
+        z_weight_position = self.draw_zero_weight_positions(sparsity)
+        f_row_add, faulty_position, f_count = self.inject_faults(fault_rate)
+        
+        if len(faulty_position) == 0:
+            return 0
+        success, unrecovered_rows = self.original_algorithm_2(faulty_position, f_count, z_weight_position)
+        if success:
+            return 0
+        if not self.enable_rescue_row:
+            return max_rows + 1
+        
+        rescued_rows, rows_used = self._rescue(unrecovered_rows, faulty_position, f_count,
+                                               z_weight_position, fault_rate, num_rows=max_rows)
+        return rows_used if len(rescued_rows) == len(unrecovered_rows) else max_rows + 1
     
     def enhanced_weight_allocation_algorithm(self, faulty_position: List[List[int]], 
                                            f_count: List[int], 
@@ -178,8 +244,7 @@ class StraitEnhancedRecovery:
     
     def run_single_experiment(self, sparsity: float, fault_rate: float) -> bool:
         """Run a single recovery experiment"""
-        weights = self.generate_weight_matrix(sparsity)
-        z_weight_position = self.get_zero_weight_positions(weights)
+        z_weight_position = self.draw_zero_weight_positions(sparsity)
         f_row_add, faulty_position, f_count = self.inject_faults(fault_rate)
         
         if len(faulty_position) > 0:
@@ -191,6 +256,35 @@ class StraitEnhancedRecovery:
                     faulty_position, f_count, z_weight_position, fault_rate)
         return True
     
+    def run_traced_trial(self, sparsity: float, fault_rate: float) -> Dict:
+        """Run a single experiment and return its per-trial record (see trace_store.py)"""
+        start = time.perf_counter()
+        z_weight_position = self.draw_zero_weight_positions(sparsity)
+        f_row_add, faulty_position, f_count = self.inject_faults(fault_rate)
+        
+        success, unrecovered_rows = True, []
+        if len(faulty_position) > 0:
+            success, unrecovered_rows = self.original_algorithm_2(faulty_position, f_count, z_weight_position)
+        
+        rescue_used = not success and self.enable_rescue_row and RECOVERY_MODE == "enhanced"
+        rescued, rows_used = [], 0
+        if rescue_used:
+            rescued, rows_used = self._rescue(unrecovered_rows, faulty_position, f_count,
+                                              z_weight_position, fault_rate)
+            success = len(rescued) == len(unrecovered_rows)
+        
+        return {
+            "num_faulty_rows": len(f_row_add),
+            "max_faults_per_row": max(f_count, default=0),
+            "total_faults": sum(f_count),
+            "unrecovered": len(unrecovered_rows),
+            "rescue_used": rescue_used,
+            "rescued_rows": sorted(f_row_add[i] for i in rescued),
+            "rescue_rows_used": rows_used if rescue_used else 0,
+            "success": success,
+            "elapsed": time.perf_counter() - start,
+        }
+    
     def run_experiments(self, sparsity_range: List[float], 
                        fault_rates: List[float]) -> Dict[float, List[float]]:
         """Run experiments for given sparsity and fault rate ranges"""
@@ -213,6 +307,33 @@ class StraitEnhancedRecovery:
             
         return results
 
+    def run_experiments_all_k(self, sparsity_range: List[float], 
+                              fault_rates: List[float],
+                              max_rows: int = NUM_RESCUE_ROWS) -> Dict[float, np.ndarray]:
+        """
+        One sweep for every rescue-row count K = 0..max_rows
+        
+        Returns:
+            {sparsity: array (len(fault_rates), max_rows + 1)} of recovery rates, where
+            column K is the rate with K rescue rows (K = 0 is the original Algorithm 2)
+        """
+        results = {}
+        
+        for sparsity in sparsity_range:
+            curves = np.zeros((len(fault_rates), max_rows + 1))
+            for i, fault_rate in enumerate(fault_rates):
+                needed = np.zeros(max_rows + 2, dtype=np.int64)
+                for _ in range(ITERATIONS):
+                    needed[self.rescue_rows_needed(sparsity, fault_rate, max_rows)] += 1
+                curves[i] = np.cumsum(needed)[:max_rows + 1] / ITERATIONS * 100
+            results[sparsity] = curves
+            
+            for k in range(max_rows + 1):
+                rate_strs = [f"{r:5.1f}%" for r in curves[:, k]]
+                print(f"Sparsity {sparsity*100:2.0f}%, {k} rescue row{'s' if k != 1 else ''}: {rate_strs}")
+            
+        return results
+
 # ==================== FIGURE GENERATION ====================
 
 def create_plot_style():
@@ -235,7 +356,12 @@ def generate_figure_13():
     fault_rates = [0.03, 0.05, 0.07, 0.1]
     
     print("Generating Figure 13: Recovery Rate vs Sparsity")
-    results = strait.run_experiments(sparsity_range, fault_rates)
+    if RECOVERY_MODE == "enhanced":
+        # one sweep gives every rescue-row count; column NUM_RESCUE_ROWS is the plotted curve
+        curves = strait.run_experiments_all_k(sparsity_range, fault_rates)
+        results = {s: curves[s][:, NUM_RESCUE_ROWS].tolist() for s in sparsity_range}
+    else:
+        results = strait.run_experiments(sparsity_range, fault_rates)
     
     plt.figure(figsize=(10, 6))
     colors = ['black', 'darkgray', 'gray', 'lightgray']
@@ -279,21 +405,11 @@ def generate_figure_14():
     fault_rates = [0.1, 0.2, 0.3, 0.4, 0.5]
     
     print("Generating Figure 14: Recovery Rate vs Fault Rate")
-    results = {}
-    for sparsity in sparsity_levels:
-        recovery_rates = []
-        for fault_rate in fault_rates:
-            successful_recoveries = 0
-            for _ in range(ITERATIONS):
-                if strait.run_single_experiment(sparsity, fault_rate):
-                    successful_recoveries += 1
-            recovery_rate = (successful_recoveries / ITERATIONS) * 100
-            recovery_rates.append(recovery_rate)
-        results[sparsity] = recovery_rates
-        
-        # Display progress
-        rate_strs = [f"{r:5.1f}%" for r in recovery_rates]
-        print(f"Sparsity {sparsity*100:2.0f}%: {rate_strs}")
+    if RECOVERY_MODE == "enhanced":
+        curves = strait.run_experiments_all_k(sparsity_levels, fault_rates)
+        results = {s: curves[s][:, NUM_RESCUE_ROWS].tolist() for s in sparsity_levels}
+    else:
+        results = strait.run_experiments(sparsity_levels, fault_rates)
     
     # Create figure name based on mode and rescue rows
     if RECOVERY_MODE == "enhanced":
@@ -346,21 +462,34 @@ def generate_figure_15():
     
     print("Generating Figure 15: Recovery Rate vs Array Size")
     results = {}
-    for array_size in array_sizes:
-        strait = StraitEnhancedRecovery(array_size=array_size, enable_rescue_row=True)
-        recovery_rates = []
-        for fault_rate in fault_rates:
-            successful_recoveries = 0
-            for _ in range(ITERATIONS):
-                if strait.run_single_experiment(sparsity, fault_rate):
-                    successful_recoveries += 1
-            recovery_rate = (successful_recoveries / ITERATIONS) * 100
-            recovery_rates.append(recovery_rate)
-        results[array_size] = recovery_rates
-        
-        # Display progress
-        rate_strs = [f"{r:5.1f}%" for r in recovery_rates]
-        print(f"Array {array_size:3d}x{array_size:3d}: {rate_strs}")
+    if FIG15_COUPLED:
+        # the coupled engine runs plain Algorithm 2, so its curves only match the original mode
+        if RECOVERY_MODE == "enhanced":
+            raise ValueError("FIG15_COUPLED has no rescue rows; set RECOVERY_MODE = \"original\" "
+                             "or FIG15_COUPLED = False")
+        from coupled_sweep import coupled_size_sweep
+        by_size = coupled_size_sweep(array_sizes, [sparsity], fault_rates, ITERATIONS,
+                                     seed=int(np.random.randint(2 ** 31)))
+        for array_size in array_sizes:
+            results[array_size] = by_size[array_size][sparsity]
+            rate_strs = [f"{r:5.1f}%" for r in results[array_size]]
+            print(f"Array {array_size:3d}x{array_size:3d}: {rate_strs}")
+    else:
+        for array_size in array_sizes:
+            strait = StraitEnhancedRecovery(array_size=array_size, enable_rescue_row=True)
+            recovery_rates = []
+            for fault_rate in fault_rates:
+                successful_recoveries = 0
+                for _ in range(ITERATIONS):
+                    if strait.run_single_experiment(sparsity, fault_rate):
+                        successful_recoveries += 1
+                recovery_rate = (successful_recoveries / ITERATIONS) * 100
+                recovery_rates.append(recovery_rate)
+            results[array_size] = recovery_rates
+            
+            # Display progress
+            rate_strs = [f"{r:5.1f}%" for r in recovery_rates]
+            print(f"Array {array_size:3d}x{array_size:3d}: {rate_strs}")
     
     # Create figure name based on mode and rescue rows
     if RECOVERY_MODE == "enhanced":
@@ -0,0 +1,287 @@
+"""
+STRAIT LBIST Pattern Compaction
+Fault-simulation-driven compaction of the SA test patterns stored in eNVM
+
+The MAC inside PE_STRAIT.v (result = weight * activation + partial_sum) is
+modelled at word level. Every bit of its nets (weight, activation, partial_sum,
+mul_result, result) carries a stuck-at-0/1 fault. Candidate patterns (the
+hand-picked ones plus random ones) are fault-simulated, then a greedy set cover
+followed by reverse-order compaction picks a minimal subset that keeps the
+coverage of the original pattern set. The result is written back in the
+LBIST_SA_test_pattern.dat format with recomputed expected answers, after the
+answer model has reproduced every golden answer of the original file.
+
+TD patterns are not compacted: the launch/capture answers stored in
+LBIST_TD_test_pattern.dat do not follow W * A + P for the frames eNVM.v scans
+in, so recomputed answers could not be checked against them.
+"""
+
+import math
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# ==================== CONFIGURATION ====================
+SYSTOLIC_SIZE = 8
+WEIGHT_WIDTH = 8
+ACTIVATION_WIDTH = 8
+PARTIAL_SUM_WIDTH = WEIGHT_WIDTH + ACTIVATION_WIDTH + math.ceil(math.log2(SYSTOLIC_SIZE))
+
+SA_PATTERN_FILE = "./input_data/LBIST_SA_test_pattern.dat"
+SA_OUTPUT_FILE = "./input_data/LBIST_SA_test_pattern_compacted.dat"
+
+RANDOM_CANDIDATES = 2000    # extra random candidates fault-simulated next to the original patterns
+COMPACTION_METHOD = "greedy"  # Options: "greedy" (set cover + reverse cleanup), "reverse"
+
+# hybrid_bist.v cycle cost per pattern: 8-cycle shift/capture window
+SA_CYCLES_PER_PATTERN = 8
+
+# ==================== FAULT MODEL ====================
+
+def mac_nets(weight_width: int = WEIGHT_WIDTH, activation_width: int = ACTIVATION_WIDTH,
+             partial_sum_width: int = PARTIAL_SUM_WIDTH) -> Dict[str, int]:
+    """Nets of the MAC module and their bit widths"""
+    return {
+        "weight": weight_width,
+        "activation": activation_width,
+        "partial_sum": partial_sum_width,
+        "mul_result": weight_width + activation_width,
+        "result": partial_sum_width,
+    }
+
+
+def fault_list() -> List[Tuple[str, int, int]]:
+    """
+    Enumerate the MAC stuck-at fault list
+
+    Returns:
+        List of (net, bit, stuck value)
+    """
+    return [(net, bit, polarity)
+            for net, width in mac_nets().items()
+            for bit in range(width)
+            for polarity in (0, 1)]
+
+
+def _force(values: np.ndarray, bit: int, forced: np.ndarray) -> np.ndarray:
+    """Force one bit of every value to forced (array of 0/1)"""
+    return (values & ~np.int64(1 << bit)) | (forced.astype(np.int64) << bit)
+
+
+def mac_eval(weight: np.ndarray, activation: np.ndarray, partial_sum: np.ndarray,
+             fault: Optional[Tuple[str, int]] = None,
+             forced: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Evaluate MAC result = weight * activation + partial_sum for arrays of patterns
+
+    Args:
+        fault: Optional (net, bit) whose value is overridden by forced
+        forced: Bit value (0/1 per pattern) applied on the faulty net
+    """
+    nets = mac_nets()
+    values = {
+        "weight": weight.astype(np.int64) & ((1 << nets["weight"]) - 1),
+        "activation": activation.astype(np.int64) & ((1 << nets["activation"]) - 1),
+        "partial_sum": partial_sum.astype(np.int64) & ((1 << nets["partial_sum"]) - 1),
+    }
+    for net in ("weight", "activation", "partial_sum"):
+        if fault is not None and fault[0] == net:
+            values[net] = _force(values[net], fault[1], forced)
+
+    mul_result = (values["weight"] * values["activation"]) & ((1 << nets["mul_result"]) - 1)
+    if fault is not None and fault[0] == "mul_result":
+        mul_result = _force(mul_result, fault[1], forced)
+
+    result = (mul_result + values["partial_sum"]) & ((1 << nets["result"]) - 1)
+    if fault is not None and fault[0] == "result":
+        result = _force(result, fault[1], forced)
+    return result
+
+
+def simulate_sa_faults(patterns: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Stuck-at fault simulation
+
+    Returns:
+        Detection matrix [num_patterns, num_faults] (True = fault detected)
+    """
+    w, a, p = patterns["weight"], patterns["activation"], patterns["partial_sum_in"]
+    good = mac_eval(w, a, p)
+    faults = fault_list()
+    detected = np.zeros((len(w), len(faults)), dtype=bool)
+    for f, (net, bit, value) in enumerate(faults):
+        faulty = mac_eval(w, a, p, (net, bit), np.full(len(w), value))
+        detected[:, f] = faulty != good
+    return detected
+
+
+# ==================== PATTERN FILES ====================
+
+SA_FIELDS = ["weight", "activation", "partial_sum_in", "answer"]
+
+
+def read_pattern_file(filename: str, fields: List[str]) -> Tuple[Dict[str, np.ndarray], List[str]]:
+    """
+    Read an LBIST pattern file the same way tb_STRAIT.v does ($sscanf "%b ...")
+
+    Returns:
+        (columns, descriptions) where descriptions holds the comment above each pattern
+    """
+    rows, descriptions = [], []
+    description = ""
+    with open(filename, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("//"):
+                description = re.sub(r"^Pattern\s+\d+:\s*", "", line[2:].strip())
+                continue
+            tokens = line.split()
+            if len(tokens) >= len(fields) and all(re.fullmatch(r"[01]+", t) for t in tokens[:len(fields)]):
+                rows.append([int(t, 2) for t in tokens[:len(fields)]])
+                descriptions.append(description)
+    data = np.array(rows, dtype=np.int64).reshape(-1, len(fields))
+    return {name: data[:, i] for i, name in enumerate(fields)}, descriptions
+
+
+def sa_expected_answer(patterns: Dict[str, np.ndarray]) -> np.ndarray:
+    return mac_eval(patterns["weight"], patterns["activation"], patterns["partial_sum_in"])
+
+
+def verify_sa_answers(patterns: Dict[str, np.ndarray]):
+    """
+    Check the answer model against the golden answers of a pattern file
+
+    Raises:
+        ValueError: If any modelled answer differs from the golden one
+    """
+    answer = sa_expected_answer(patterns)
+    mismatches = [f"pattern {i}: file {patterns['answer'][i]}, model {answer[i]}"
+                  for i in np.flatnonzero(answer != patterns["answer"])]
+    if mismatches:
+        raise ValueError(f"SA answer model disagrees with {len(mismatches)} golden answer(s):\n  "
+                         + "\n  ".join(mismatches))
+
+
+def write_sa_pattern_file(filename: str, patterns: Dict[str, np.ndarray], descriptions: List[str],
+                          golden: Dict[str, np.ndarray]):
+    """Write SA patterns with recomputed expected answers, after checking the model against golden"""
+    verify_sa_answers(golden)
+    answer = sa_expected_answer(patterns)
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write("// SA Test Data (Stuck-At Fault Test Patterns)\n")
+        f.write(f"// {len(answer)} patterns, compacted by lbist_compaction.py\n")
+        f.write(f"// Format: Weight({WEIGHT_WIDTH}-bit) Activation({ACTIVATION_WIDTH}-bit) "
+                f"Partial_Sum_In({PARTIAL_SUM_WIDTH}-bit) Expected_Answer({PARTIAL_SUM_WIDTH}-bit)\n")
+        for i in range(len(answer)):
+            f.write(f"\n// Pattern {i}: {descriptions[i]}\n")
+            f.write(f"{patterns['weight'][i]:0{WEIGHT_WIDTH}b} "
+                    f"{patterns['activation'][i]:0{ACTIVATION_WIDTH}b} "
+                    f"{patterns['partial_sum_in'][i]:0{PARTIAL_SUM_WIDTH}b} "
+                    f"{answer[i]:0{PARTIAL_SUM_WIDTH}b}\n")
+
+
+# ==================== COMPACTION ====================
+
+def random_candidates(fields: List[str], count: int, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    """Uniform random candidate patterns for the input fields (answers are recomputed later)"""
+    widths = {"weight": WEIGHT_WIDTH, "activation": ACTIVATION_WIDTH, "partial_sum_in": PARTIAL_SUM_WIDTH}
+    columns = {}
+    for name in fields:
+        base = name.rsplit("_", 1)[0] if name[-1].isdigit() else name
+        if base in widths:
+            columns[name] = rng.integers(0, 1 << widths[base], size=count, dtype=np.int64)
+    return columns
+
+
+def reverse_order_compaction(detected: np.ndarray, order: List[int], target: np.ndarray) -> List[int]:
+    """
+    Reverse-order fault simulation with fault dropping
+
+    Patterns are revisited from last to first; a pattern is kept only when it
+    detects a target fault that no later-kept pattern detects.
+    """
+    covered = np.zeros(detected.shape[1], dtype=bool)
+    kept = []
+    for idx in reversed(order):
+        new = detected[idx] & target & ~covered
+        if new.any():
+            kept.append(idx)
+            covered |= detected[idx]
+    return sorted(kept, key=order.index)
+
+
+def greedy_set_cover(detected: np.ndarray, target: np.ndarray) -> List[int]:
+    """Greedy set cover: repeatedly take the pattern detecting the most uncovered target faults"""
+    remaining = target.copy()
+    selected = []
+    while remaining.any():
+        gains = (detected & remaining).sum(axis=1)
+        best = int(np.argmax(gains))
+        if gains[best] == 0:
+            break
+        selected.append(best)
+        remaining &= ~detected[best]
+    return reverse_order_compaction(detected, selected, target)
+
+
+def compact_patterns(original: Dict[str, np.ndarray], descriptions: List[str], fields: List[str],
+                     simulate, method: str = COMPACTION_METHOD,
+                     num_random: int = RANDOM_CANDIDATES, seed: int = 42):
+    """
+    Compact a pattern set while keeping the fault coverage of the original set
+
+    Returns:
+        (patterns, descriptions, report)
+    """
+    rng = np.random.default_rng(seed)
+    extra = random_candidates(fields, num_random, rng)
+    inputs = [name for name in fields if name in extra]
+    candidates = {name: np.concatenate([original[name], extra[name]]) for name in inputs}
+    candidate_descriptions = descriptions + [f"Random candidate {i}" for i in range(num_random)]
+    num_original = len(descriptions)
+
+    detected = simulate(candidates)
+    target = detected[:num_original].any(axis=0)
+
+    if method == "greedy":
+        selected = greedy_set_cover(detected, target)
+    elif method == "reverse":
+        selected = reverse_order_compaction(detected, list(range(num_original)), target)
+    else:
+        raise ValueError(f"Unknown compaction method: {method}")
+
+    kept = {name: candidates[name][selected] for name in inputs}
+    kept_descriptions = [candidate_descriptions[i] for i in selected]
+    num_faults = detected.shape[1]
+    report = {
+        "original_patterns": num_original,
+        "compacted_patterns": len(selected),
+        "faults": num_faults,
+        "original_coverage": float(target.sum() / num_faults),
+        "compacted_coverage": float(detected[selected].any(axis=0).sum() / num_faults),
+        "candidate_coverage": float(detected.any(axis=0).sum() / num_faults),
+    }
+    return kept, kept_descriptions, report
+
+
+def print_report(name: str, report: Dict, cycles_per_pattern: int):
+    print(f"{name} patterns: {report['original_patterns']} -> {report['compacted_patterns']}")
+    print(f"  • Fault coverage: {report['original_coverage']*100:.2f}% -> "
+          f"{report['compacted_coverage']*100:.2f}% "
+          f"(all candidates: {report['candidate_coverage']*100:.2f}%)")
+    saved = (report['original_patterns'] - report['compacted_patterns']) * cycles_per_pattern
+    print(f"  • Test cycles saved: {saved}")
+
+
+# ==================== MAIN EXECUTION ====================
+
+if __name__ == "__main__":
+    print("STRAIT LBIST Pattern Compaction")
+    print("=" * 60)
+
+    sa_patterns, sa_descriptions = read_pattern_file(SA_PATTERN_FILE, SA_FIELDS)
+    sa_kept, sa_kept_descriptions, sa_report = compact_patterns(
+        sa_patterns, sa_descriptions, SA_FIELDS, simulate_sa_faults)
+    write_sa_pattern_file(SA_OUTPUT_FILE, sa_kept, sa_kept_descriptions, sa_patterns)
+    print_report("SA", sa_report, SA_CYCLES_PER_PATTERN)
@@ -0,0 +1,178 @@
+"""
+STRAIT Mapping Validator
+Functional check of recovered weight mappings against the fault-free product
+
+A mapping is correct when the array, loaded as mapping_table.v loads it, computes
+the same product as the golden np.dot(weight, activation) of matrix.py:
+  • weight row m is placed on physical row mapping[m]
+  • every faulty PE is disabled (PE_disable), so its MAC is bypassed and its
+    product is zero
+  • outputs are read back in weight-row order (output_mapped_addr)
+The hardware result is therefore (W * enabled[mapping]) @ A. Batches of tiles are
+checked with one matrix multiplication each. Products are computed in float64,
+which is exact for integer operands while N * max|W| * max|A| < 2^53, so the
+comparison is bit-exact. By default only the residual (W * disabled[mapping]) @ A
+of tiles that place a nonzero weight on a disabled PE is multiplied out; it is
+zero exactly when the hardware result equals the golden one.
+"""
+
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+# ==================== CONFIGURATION ====================
+ARRAY_SIZE = 256
+WEIGHT_WIDTH = 8            # signed weights
+ACTIVATION_WIDTH = 8        # unsigned activations
+BATCH_SIZE = 64
+
+_EXACT_LIMIT = 2 ** 53
+
+
+def invert_mapping(mapping_table: np.ndarray) -> np.ndarray:
+    """Convert mapping_table_reg order (physical row -> weight row) to weight row -> physical row"""
+    mapping_table = np.asarray(mapping_table)
+    inverse = np.empty_like(mapping_table)
+    np.put_along_axis(inverse, mapping_table,
+                      np.broadcast_to(np.arange(mapping_table.shape[-1]), mapping_table.shape), axis=-1)
+    return inverse
+
+
+def disabled_weights(mappings: np.ndarray, fault_maps: np.ndarray) -> np.ndarray:
+    """
+    Args:
+        mappings: (B, N) physical row of every weight row
+        fault_maps: (B, N, N) or (N, N) boolean, True = faulty (disabled) PE
+
+    Returns:
+        (B, N, N) boolean, True where weight element (m, j) lands on a disabled PE
+    """
+    fault_maps = np.asarray(fault_maps, dtype=bool)
+    if fault_maps.ndim == 2:
+        return fault_maps[mappings]
+    return np.take_along_axis(fault_maps, mappings[:, :, None], axis=1)
+
+
+def hardware_product(weights: np.ndarray, activations: np.ndarray, mappings: np.ndarray,
+                     fault_maps: np.ndarray) -> np.ndarray:
+    """Result the array computes with the given mappings, in weight-row order"""
+    enabled = ~disabled_weights(mappings, fault_maps)
+    return np.rint((weights * enabled).astype(np.float64) @ activations.astype(np.float64)).astype(np.int64)
+
+
+def validate_batch(weights: np.ndarray, activations: np.ndarray, mappings: np.ndarray,
+                   fault_maps: np.ndarray, full: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Compare the mapped, PE-disabled product with the golden product for a batch
+
+    Args:
+        weights: (B, N, N) integer weight tiles
+        activations: (B, N, K) or (N, K) integer activations
+        mappings: (B, N) physical row of every weight row
+        fault_maps: (B, N, N) or (N, N) boolean fault maps
+        full: Compute hardware and golden products explicitly instead of the residual
+
+    Returns:
+        {"valid_mapping" (B,), "mismatches" (B,) differing output elements, "max_error" (B,)}
+    """
+    weights = np.asarray(weights)
+    activations = np.asarray(activations)
+    mappings = np.asarray(mappings)
+    n = weights.shape[-1]
+    bound = n * int(np.abs(weights).max(initial=0)) * int(np.abs(activations).max(initial=0))
+    if bound >= _EXACT_LIMIT:
+        raise ValueError(f"Operands too wide for an exact float64 product (bound {bound})")
+
+    valid_mapping = (np.sort(mappings, axis=1) == np.arange(n)).all(axis=1)
+    batch = weights.shape[0]
+    mismatches = np.zeros(batch, dtype=np.int64)
+    max_error = np.zeros(batch, dtype=np.int64)
+
+    a = activations.astype(np.float64)
+    if full:
+        golden = np.rint(weights.astype(np.float64) @ a).astype(np.int64)
+        error = np.abs(hardware_product(weights, activations, mappings, fault_maps) - golden)
+        mismatches = (error != 0).sum(axis=(1, 2))
+        max_error = error.max(axis=(1, 2))
+    else:
+        residual = weights * disabled_weights(mappings, fault_maps)
+        suspect = np.flatnonzero(residual.any(axis=(1, 2)))
+        if len(suspect):
+            a_suspect = a[suspect] if a.ndim == 3 else a
+            error = np.abs(np.rint(residual[suspect].astype(np.float64) @ a_suspect)).astype(np.int64)
+            mismatches[suspect] = (error != 0).sum(axis=(1, 2))
+            max_error[suspect] = error.max(axis=(1, 2))
+    return {"valid_mapping": valid_mapping, "mismatches": mismatches, "max_error": max_error}
+
+
+def random_int_tiles(rng: np.random.Generator, zero_masks: np.ndarray,
+                     weight_width: int = WEIGHT_WIDTH) -> np.ndarray:
+    """Nonzero signed weights outside the zero masks"""
+    q_max = (1 << (weight_width - 1)) - 1
+    magnitude = rng.integers(1, q_max + 1, size=zero_masks.shape)
+    sign = np.where(rng.random(zero_masks.shape) < 0.5, -1, 1)
+    return np.where(zero_masks, 0, sign * magnitude).astype(np.int16)
+
+
+def validate_sweep(array_size: int, sparsity: float, fault_rate: float, trials: int,
+                   batch_size: int = BATCH_SIZE, activation_cols: Optional[int] = None,
+                   seed: Optional[int] = None, full: bool = False) -> Dict:
+    """
+    Allocate and functionally validate every trial of one sweep cell
+
+    Each batch shares one fault map (one chip) and allocates batch_size weight tiles
+    against it with ChipFaultIndex.
+
+    Returns:
+        Summary counts plus the indices of mismatching tiles
+    """
+    from chip_fault_index import ChipFaultIndex
+    from coupled_sweep import draw_faults
+
+    rng = np.random.default_rng(seed)
+    cols = activation_cols or array_size
+    num_faults = int(array_size * array_size * fault_rate / 100)
+    summary = {"tiles": 0, "recovered": 0, "invalid_mappings": 0,
+               "recovered_mismatch": [], "unrecovered_mismatch": 0, "unrecovered_exact": 0}
+
+    for start in range(0, trials, batch_size):
+        batch = min(batch_size, trials - start)
+        f_row_add, faulty_position = draw_faults(rng, array_size, num_faults)
+        fault_map = np.zeros((array_size, array_size), dtype=bool)
+        for row, positions in zip(f_row_add, faulty_position):
+            fault_map[row, positions] = True
+
+        zero_masks = rng.random((batch, array_size, array_size)) < sparsity
+        weights = random_int_tiles(rng, zero_masks)
+        activations = rng.integers(0, 1 << ACTIVATION_WIDTH, size=(batch, array_size, cols))
+        success, mappings, _ = ChipFaultIndex(f_row_add, faulty_position, array_size).allocate(zero_masks)
+        result = validate_batch(weights, activations, mappings, fault_map, full=full)
+
+        wrong = result["mismatches"] > 0
+        summary["tiles"] += batch
+        summary["recovered"] += int(success.sum())
+        summary["invalid_mappings"] += int((~result["valid_mapping"]).sum())
+        summary["recovered_mismatch"] += (start + np.flatnonzero(success & wrong)).tolist()
+        summary["unrecovered_mismatch"] += int((~success & wrong).sum())
+        summary["unrecovered_exact"] += int((~success & ~wrong).sum())
+    return summary
+
+
+# ==================== MAIN EXECUTION ====================
+
+if __name__ == "__main__":
+    print("STRAIT Mapping Validator")
+    print("=" * 60)
+
+    for full in (True, False):
+        start = time.perf_counter()
+        summary = validate_sweep(ARRAY_SIZE, sparsity=0.2, fault_rate=0.1, trials=256, seed=42, full=full)
+        elapsed = time.perf_counter() - start
+        print(f"{'Full product' if full else 'Residual'} check, {summary['tiles']} tiles "
+              f"({ARRAY_SIZE}x{ARRAY_SIZE}, sparsity 0.2, 0.1% faults): {elapsed:.2f}s")
+        print(f"  • recovered allocations:              {summary['recovered']}")
+        print(f"  • invalid mappings:                   {summary['invalid_mappings']}")
+        print(f"  • recovered but mismatching tiles:    {summary['recovered_mismatch']}")
+        print(f"  • unrecovered tiles with wrong output: {summary['unrecovered_mismatch']}")
+        print(f"  • unrecovered tiles still exact:      {summary['unrecovered_exact']}")
@@ -0,0 +1,168 @@
+"""
+STRAIT Paired Strategy Evaluation
+Common-random-number comparison of allocation strategies with McNemar tests
+
+Every trial draws its weight matrix and fault map once and feeds the same inputs
+to every registered allocation strategy. Strategies that draw their own random
+numbers (the rescue rows) are reseeded identically before each call, so they
+also see the same rescue-row faults. Differences between strategies are then
+measured on matched pairs:
+  • per-strategy recovery rates
+  • discordant-pair counts b (baseline only) and c (other only)
+  • McNemar test: exact binomial for b + c <= EXACT_LIMIT, else chi-square with
+    continuity correction
+  • paired rate difference with its matched-pairs standard error
+
+New allocators are added with @register_strategy("name").
+"""
+
+import math
+import random
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from results_store import ResultsStore
+
+# ==================== CONFIGURATION ====================
+ITERATIONS = 500
+BASE_SEED = 2024
+EXACT_LIMIT = 1000
+
+STRATEGIES: Dict[str, Callable] = {}
+
+
+def register_strategy(name: str):
+    """Decorator registering fn(strait, trial) -> bool as an allocation strategy"""
+    def decorator(fn: Callable) -> Callable:
+        STRATEGIES[name] = fn
+        return fn
+    return decorator
+
+
+@register_strategy("original")
+def original_strategy(strait, trial: Dict) -> bool:
+    """Algorithm 2 only"""
+    success, _ = strait.original_algorithm_2(trial["faulty_position"], trial["f_count"],
+                                             trial["z_weight_position"])
+    return success
+
+
+@register_strategy("enhanced")
+def enhanced_strategy(strait, trial: Dict) -> bool:
+    """Algorithm 2 followed by NUM_RESCUE_ROWS rescue rows"""
+    import figure_plot_new
+
+    success, unrecovered_rows = strait.original_algorithm_2(trial["faulty_position"], trial["f_count"],
+                                                            trial["z_weight_position"])
+    if success:
+        return True
+    rescued, _ = strait._rescue(unrecovered_rows, trial["faulty_position"], trial["f_count"],
+                                trial["z_weight_position"], trial["fault_rate"],
+                                num_rows=figure_plot_new.NUM_RESCUE_ROWS)
+    return len(rescued) == len(unrecovered_rows)
+
+
+@register_strategy("chip_index")
+def chip_index_strategy(strait, trial: Dict) -> bool:
+    """Batch allocator of chip_fault_index.py (must agree with "original")"""
+    from chip_fault_index import ChipFaultIndex
+
+    index = ChipFaultIndex(trial["f_row_add"], trial["faulty_position"], strait.array_size)
+    success, _, _ = index.allocate(trial["zero_mask"])
+    return bool(success[0])
+
+
+def mcnemar(b: int, c: int) -> float:
+    """Two-sided McNemar p-value for discordant counts b and c"""
+    n = b + c
+    if n == 0:
+        return 1.0
+    if n <= EXACT_LIMIT:
+        tail = sum(math.comb(n, i) for i in range(min(b, c) + 1)) / 2 ** n
+        return min(1.0, 2 * tail)
+    chi2 = (abs(b - c) - 1) ** 2 / n
+    return math.erfc(math.sqrt(chi2 / 2))
+
+
+def compare(baseline: np.ndarray, other: np.ndarray) -> Dict:
+    """Paired statistics of two boolean success vectors over the same trials"""
+    n = len(baseline)
+    b = int(np.sum(baseline & ~other))
+    c = int(np.sum(~baseline & other))
+    diff = (c - b) / n
+    stderr = math.sqrt(max(b + c - (c - b) ** 2 / n, 0)) / n
+    return {"b": b, "c": c, "difference": diff * 100, "stderr": stderr * 100,
+            "ci95": ((diff - 1.96 * stderr) * 100, (diff + 1.96 * stderr) * 100),
+            "p_value": mcnemar(b, c)}
+
+
+def evaluate_paired(array_size: int, sparsity_range: List[float], fault_rates: List[float],
+                    iterations: int = ITERATIONS, strategies: Optional[List[str]] = None,
+                    base_seed: int = BASE_SEED, store: Optional[ResultsStore] = None) -> List[Dict]:
+    """
+    Run every strategy on the same trials for each (sparsity, fault rate) cell
+
+    Args:
+        strategies: Registered strategy names; the first one is the baseline
+        store: Optional ResultsStore; records go to kind "paired_evaluation"
+
+    Returns:
+        One record per cell with per-strategy rates and comparisons to the baseline
+    """
+    from figure_plot_new import StraitEnhancedRecovery
+
+    names = strategies or list(STRATEGIES)
+    strait = StraitEnhancedRecovery(array_size=array_size, enable_rescue_row=True)
+    records = []
+    for s_idx, sparsity in enumerate(sparsity_range):
+        for f_idx, fault_rate in enumerate(fault_rates):
+            outcomes = {name: np.zeros(iterations, dtype=bool) for name in names}
+            for t in range(iterations):
+                seed = int(np.random.SeedSequence([base_seed, s_idx, f_idx, t]).generate_state(1)[0])
+                random.seed(seed)
+                np.random.seed(seed)
+                weights = strait.generate_weight_matrix(sparsity)
+                f_row_add, faulty_position, f_count = strait.inject_faults(fault_rate)
+                trial = {"fault_rate": fault_rate, "zero_mask": weights == 0,
+                         "z_weight_position": strait.get_zero_weight_positions(weights),
+                         "f_row_add": f_row_add, "faulty_position": faulty_position, "f_count": f_count}
+                for name in names:
+                    if not faulty_position:
+                        outcomes[name][t] = True
+                        continue
+                    random.seed(seed + 1)           # identical rescue-row draws for every strategy
+                    outcomes[name][t] = STRATEGIES[name](strait, trial)
+
+            baseline = names[0]
+            key = {"array_size": array_size, "sparsity": sparsity, "fault_rate": fault_rate,
+                   "iterations": iterations, "base_seed": base_seed}
+            record = {**key,
+                      "rates": {name: float(v.mean() * 100) for name, v in outcomes.items()},
+                      "baseline": baseline,
+                      "comparisons": {name: compare(outcomes[baseline], outcomes[name])
+                                      for name in names[1:]}}
+            records.append(record)
+            if store is not None:
+                store.put("paired_evaluation", key, record)
+    return records
+
+
+def print_paired(records: List[Dict]):
+    for r in records:
+        rates = ", ".join(f"{name} {rate:5.1f}%" for name, rate in r["rates"].items())
+        print(f"Sparsity {r['sparsity']*100:2.0f}%, fault {r['fault_rate']:.2f}%: {rates}")
+        for name, cmp in r["comparisons"].items():
+            print(f"  • {name} - {r['baseline']}: {cmp['difference']:+5.1f}% "
+                  f"[{cmp['ci95'][0]:+.1f}, {cmp['ci95'][1]:+.1f}]  b={cmp['b']} c={cmp['c']}  "
+                  f"McNemar p={cmp['p_value']:.3g}")
+
+
+# ==================== MAIN EXECUTION ====================
+
+if __name__ == "__main__":
+    print("STRAIT Paired Strategy Evaluation")
+    print("=" * 60)
+
+    records = evaluate_paired(64, [0.3, 0.4], [1.0, 2.0], iterations=300)
+    print_paired(records)
@@ -0,0 +1,295 @@
+"""
+STRAIT Experiment Profiler
+Switchable per-phase timers and counters for the recovery experiment loops
+
+ExperimentProfiler wraps the methods of StraitRecovery / StraitEnhancedRecovery
+while it is enabled and restores the original methods when disabled, so the
+experiment code runs untouched (zero cost) when profiling is off.
+
+Recorded per sweep cell (array size, sparsity, fault rate, recovery mode):
+  • phase timers: weight generation, zero-position extraction, fault injection,
+    allocation (Algorithm 2) and rescue
+  • counters: trials, successes, positions_match calls, candidates found
+    (positions_match hits), rescue passes and rescue rows used
+Cells are keyed from the arguments of the trial methods (run_single_experiment,
+rescue_rows_needed for the all-K sweeps, run_traced_trial), so run_experiments
+and the figure generators need no changes. Results export to JSON or the ResultsStore.
+A single cell can additionally be captured with cProfile (.prof file, viewable
+with pstats, snakeviz or flameprof).
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import sys
+import time
+from typing import Dict, Iterable, List, Optional
+
+from results_store import ResultsStore
+
+# ==================== CONFIGURATION ====================
+PROFILE_OUTPUT = "./results/experiment_profile.json"
+CPROFILE_OUTPUT = "./results/experiment_cell.prof"
+
+# method name -> phase it is timed under
+PHASE_METHODS = {
+    "generate_weight_matrix": "weights",
+    "generate_zero_weight_positions": "weights",
+    "get_zero_weight_positions": "zero_positions",
+    "inject_faults": "faults",
+    "weight_allocation_algorithm": "allocation",
+    "original_algorithm_2": "allocation",
+    "_rescue": "rescue",
+}
+# trial method -> success of its return value (max_rows: rescue_rows_needed argument)
+TRIAL_METHODS = {
+    "run_single_experiment": lambda result, max_rows: bool(result),
+    "rescue_rows_needed": lambda result, max_rows: result <= max_rows,
+    "run_traced_trial": lambda result, max_rows: bool(result["success"]),
+}
+PHASES = ["weights", "zero_positions", "faults", "allocation", "rescue"]
+COUNTERS = ["trials", "successes", "match_calls", "candidates", "rescue_calls", "rescue_rows_used"]
+
+
+def _new_cell() -> Dict:
+    return {"counters": {name: 0 for name in COUNTERS},
+            "phases": {name: 0.0 for name in PHASES},
+            "total_time": 0.0}
+
+
+class ExperimentProfiler:
+    def __init__(self, classes: Optional[Iterable[type]] = None):
+        """
+        Args:
+            classes: Experiment classes to instrument (default: StraitRecovery and
+                     StraitEnhancedRecovery)
+        """
+        if classes is None:
+            from figure_plot import StraitRecovery
+            from figure_plot_new import StraitEnhancedRecovery
+            classes = [StraitRecovery, StraitEnhancedRecovery]
+        self.classes = list(classes)
+        self.cells: Dict[str, Dict] = {}
+        self._keys: Dict[str, Dict] = {}
+        self._originals: List = []
+        self._cell = self._select_cell({"cell": "unscoped"})
+
+    # ---------------- switching ----------------
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._originals)
+
+    def enable(self) -> "ExperimentProfiler":
+        """Install the instrumented methods"""
+        if self.enabled:
+            return self
+        for cls in self.classes:
+            for name, phase in PHASE_METHODS.items():
+                if name in cls.__dict__:
+                    self._patch(cls, name, self._timed(cls.__dict__[name], phase, name))
+            if "positions_match" in cls.__dict__:
+                self._patch(cls, "positions_match", self._counted_match(cls.__dict__["positions_match"]))
+            for name, succeeded in TRIAL_METHODS.items():
+                if name in cls.__dict__:
+                    self._patch(cls, name, self._scoped_trial(cls, cls.__dict__[name], succeeded))
+        return self
+
+    def disable(self):
+        """Restore the original methods"""
+        for cls, name, original in reversed(self._originals):
+            setattr(cls, name, original)
+        self._originals = []
+
+    def __enter__(self):
+        return self.enable()
+
+    def __exit__(self, *exc):
+        self.disable()
+
+    def _patch(self, cls: type, name: str, wrapper):
+        self._originals.append((cls, name, cls.__dict__[name]))
+        setattr(cls, name, wrapper)
+
+    # ---------------- wrappers ----------------
+
+    def _timed(self, method, phase: str, name: str):
+        profiler = self
+
+        def wrapper(obj, *args, **kwargs):
+            start = time.perf_counter()
+            result = method(obj, *args, **kwargs)
+            profiler._cell["phases"][phase] += time.perf_counter() - start
+            if name == "_rescue":
+                profiler._cell["counters"]["rescue_calls"] += 1
+                profiler._cell["counters"]["rescue_rows_used"] += result[1]
+            return result
+        wrapper.__wrapped__ = method
+        return wrapper
+
+    def _counted_match(self, method):
+        profiler = self
+
+        def wrapper(obj, faulty_pos, zero_weight_pos):
+            result = method(obj, faulty_pos, zero_weight_pos)
+            counters = profiler._cell["counters"]
+            counters["match_calls"] += 1
+            if result:
+                counters["candidates"] += 1
+            return result
+        wrapper.__wrapped__ = method
+        return wrapper
+
+    def _scoped_trial(self, cls: type, method, succeeded):
+        profiler = self
+        module = sys.modules[cls.__module__]
+        name = method.__name__
+
+        def wrapper(obj, sparsity, fault_rate, *args, **kwargs):
+            key = {"model": cls.__name__, "array_size": obj.array_size,
+                   "sparsity": sparsity, "fault_rate": fault_rate}
+            max_rows = args[0] if args else kwargs.get("max_rows")
+            if hasattr(module, "RECOVERY_MODE"):
+                rescue = getattr(obj, "enable_rescue_row", False)
+                if name == "rescue_rows_needed":
+                    key["recovery_mode"] = "all_k"
+                    key["rescue_rows"] = max_rows if rescue else 0
+                else:
+                    key["recovery_mode"] = module.RECOVERY_MODE
+                    key["rescue_rows"] = module.NUM_RESCUE_ROWS \
+                        if rescue and module.RECOVERY_MODE == "enhanced" else 0
+            previous = profiler._cell
+            cell = profiler._cell = profiler._select_cell(key)
+            start = time.perf_counter()
+            try:
+                result = method(obj, sparsity, fault_rate, *args, **kwargs)
+            finally:
+                cell["total_time"] += time.perf_counter() - start
+                profiler._cell = previous
+            cell["counters"]["trials"] += 1
+            cell["counters"]["successes"] += int(succeeded(result, max_rows))
+            return result
+        wrapper.__wrapped__ = method
+        return wrapper
+
+    def _select_cell(self, key: Dict) -> Dict:
+        name = json.dumps(key, sort_keys=True)
+        if name not in self.cells:
+            self.cells[name] = _new_cell()
+            self._keys[name] = key
+        return self.cells[name]
+
+    # ---------------- results ----------------
+
+    def summary(self) -> List[Dict]:
+        """One record per cell with totals and per-trial averages"""
+        records = []
+        for name, cell in self.cells.items():
+            counters = cell["counters"]
+            if counters["trials"] == 0 and not any(cell["phases"].values()):
+                continue
+            trials = max(counters["trials"], 1)
+            phases = dict(cell["phases"])
+            phases["other"] = max(cell["total_time"] - sum(cell["phases"].values()), 0.0)
+            records.append({
+                "cell": self._keys[name],
+                "counters": dict(counters),
+                "phases": phases,
+                "total_time": cell["total_time"],
+                "per_trial": {
+                    "time_ms": cell["total_time"] / trials * 1e3,
+                    "match_calls": counters["match_calls"] / trials,
+                    "candidates": counters["candidates"] / trials,
+                },
+            })
+        return records
+
+    def to_json(self, path: str = PROFILE_OUTPUT) -> List[Dict]:
+        records = self.summary()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(records, f, indent=2)
+        return records
+
+    def to_store(self, store: ResultsStore) -> List[Dict]:
+        records = self.summary()
+        for record in records:
+            store.put("experiment_profile", record["cell"], record)
+        return records
+
+    def reset(self):
+        self.cells = {}
+        self._keys = {}
+        self._cell = self._select_cell({"cell": "unscoped"})
+
+
+def print_profile(records: List[Dict]):
+    print("Per-cell profile")
+    print("-" * 60)
+    for record in records:
+        cell, total = record["cell"], record["total_time"] or 1.0
+        print(f"{cell}")
+        print(f"  trials {record['counters']['trials']}, "
+              f"{record['per_trial']['time_ms']:.2f} ms/trial, "
+              f"{record['per_trial']['match_calls']:.0f} match calls/trial, "
+              f"{record['per_trial']['candidates']:.1f} candidates/trial, "
+              f"rescue passes {record['counters']['rescue_calls']} "
+              f"({record['counters']['rescue_rows_used']} rescue rows used)")
+        for phase, seconds in record["phases"].items():
+            if seconds > 0:
+                print(f"    • {phase:<15} {seconds:8.3f}s ({seconds / total * 100:5.1f}%)")
+
+
+def profile_cell(strait, sparsity: float, fault_rate: float, trials: int,
+                 output: str = CPROFILE_OUTPUT, top: int = 15) -> pstats.Stats:
+    """
+    Capture a cProfile of a single sweep cell
+
+    Args:
+        strait: StraitRecovery / StraitEnhancedRecovery instance
+        sparsity, fault_rate: The cell to profile
+        trials: Number of run_single_experiment calls
+        output: .prof file for pstats / snakeviz / flameprof
+
+    Returns:
+        The collected pstats.Stats
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    for _ in range(trials):
+        strait.run_single_experiment(sparsity, fault_rate)
+    profiler.disable()
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    profiler.dump_stats(output)
+    stats = pstats.Stats(profiler).sort_stats("cumulative")
+    stats.print_stats(top)
+    return stats
+
+
+# ==================== MAIN EXECUTION ====================
+
+if __name__ == "__main__":
+    import random
+    import numpy as np
+    import figure_plot_new
+    from figure_plot_new import StraitEnhancedRecovery
+
+    print("STRAIT Experiment Profiler")
+    print("=" * 60)
+    random.seed(42)
+    np.random.seed(42)
+
+    figure_plot_new.ITERATIONS = 20
+    figure_plot_new.RECOVERY_MODE = "enhanced"
+    strait = StraitEnhancedRecovery(array_size=64, enable_rescue_row=True)
+
+    profiler = ExperimentProfiler()
+    with profiler:
+        strait.run_experiments([0.3, 0.6], [0.5, 2.0])
+    records = profiler.to_json()
+    print_profile(records)
+    print(f"\nProfile written to {PROFILE_OUTPUT}")
+
+    print(f"\ncProfile capture of one cell -> {CPROFILE_OUTPUT}")
+    profile_cell(strait, 0.3, 2.0, trials=20)
@@ -0,0 +1,288 @@
+"""
+STRAIT Rare-Event Recovery Estimator
+Importance sampling of Algorithm 2 failure probabilities in near-100% recovery regimes
+
+At low fault rates and high sparsity Algorithm 2 almost never fails, and plain
+Monte Carlo needs ~100 / p trials to see a failure probability p at all. A
+faulty row f with fault columns E_f is compatible with weight row m when all of
+E_f are zero in m (probability s^|E_f|), so its number of compatible weight rows
+is C_f ~ Binomial(N, s^|E_f|). Failures come from rows that are left with very
+few compatible weight rows, which in this regime mostly means rows that collect
+several faults. Both are biased, each with a defensive mixture whose likelihood
+ratio is known in closed form:
+  • fault map: with probability GAMMA a random row is forced to hold at least k
+    faults (k drawn from ROW_FAULT_LEVELS, the row's count from the truncated
+    hypergeometric, the other faults uniform); with P_k = P(a row holds >= k),
+    p / q = 1 / ((1 - GAMMA) + sum_k GAMMA_k * #{rows with >= k faults} / (N * P_k))
+  • weight tiles given the map: with probability BETA a level j and a faulty row f
+    are drawn (f with probability P(A_fj) / sum_f P(A_fj)) and the zero mask is
+    drawn conditioned on A_fj = {C_f <= t_fj}, t_fj = COMPATIBLE_LEVELS[j] (C_f
+    from the truncated binomial, the compatible rows at random, every other row
+    conditioned to have a nonzero weight in E_f);
+    p / q = 1 / ((1 - BETA) + sum_j BETA_j * #{f: A_fj} / sum_f P(A_fj))
+Both ratios are at most 1 / (1 - GAMMA) and 1 / (1 - BETA), so a poor bias cannot
+blow up the variance, and their product weights every failure, which keeps the
+estimate unbiased. Confidence intervals use the normal approximation of the
+per-fault-map weighted means; "equivalent_mc_trials" is the plain Monte Carlo
+trial count with the same variance. Heavy-tailed weights can still make the
+interval optimistic when very few biased samples fail.
+"""
+
+import math
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from chip_fault_index import recover_fault_batch
+
+# ==================== CONFIGURATION ====================
+ARRAY_SIZE = 256
+SPARSITY = 0.5
+FAULT_RATES = [0.03, 0.05, 0.07, 0.1]   # Figure 13 regime (%)
+TRIALS = 2000
+GAMMA = 0.5                              # share of biased fault maps
+ROW_FAULT_LEVELS = [2, 3, 4, 5, 6, 8]    # fault-map levels: some row holds at least k faults
+BETA = 0.8                               # share of biased weight tiles
+COMPATIBLE_LEVELS = [0, 1, 2, 4, 8, 16, 32]   # tile levels: a faulty row has at most t compatible rows
+TILES_PER_MAP = 8                         # weight tiles evaluated against every fault map
+CONFIDENCE_Z = 1.96
+
+
+def binomial_log_pmf(n: int, p: float) -> np.ndarray:
+    """log P(Binomial(n, p) = c) for c = 0..n"""
+    c = np.arange(n + 1)
+    log_choose = np.array([math.lgamma(n + 1) - math.lgamma(i + 1) - math.lgamma(n - i + 1) for i in c])
+    with np.errstate(divide="ignore"):
+        return log_choose + c * np.log(p) + (n - c) * np.log1p(-p)
+
+
+def hypergeometric_log_pmf(population: int, successes: int, draws: int) -> np.ndarray:
+    """log P(X = x), x = 0..min(successes, draws), for draws without replacement"""
+    x = np.arange(min(successes, draws) + 1)
+
+    def log_choose(n, k):
+        return np.array([math.lgamma(n + 1) - math.lgamma(i + 1) - math.lgamma(n - i + 1) for i in np.atleast_1d(k)])
+
+    return log_choose(successes, x) + log_choose(population - successes, draws - x) \
+        - log_choose(population, [draws])[0]
+
+
+def row_fault_tails(array_size: int, num_faults: int, row_levels: Sequence[int]) -> np.ndarray:
+    """P(a given row holds at least k of the faults) for every k in row_levels"""
+    pmf = np.exp(hypergeometric_log_pmf(array_size * array_size, array_size, num_faults))
+    tail = np.cumsum(pmf[::-1])[::-1]
+    return np.array([tail[k] if k < len(tail) else 0.0 for k in row_levels])
+
+
+def draw_fault_rows(rng: np.random.Generator, array_size: int, fault_rate: float,
+                    gamma: float = 0.0, row_levels: Sequence[int] = ROW_FAULT_LEVELS
+                    ) -> Tuple[List[np.ndarray], float]:
+    """
+    Uniform distinct faulty PEs (as inject_faults), or with probability gamma a map
+    in which a random row holds at least k faults for a random level k
+
+    Returns:
+        Tuple of (column sets of the faulty rows in address order, likelihood ratio of the map)
+    """
+    n = array_size
+    num_faults = int(n * n * fault_rate / 100)
+    if num_faults == 0:
+        return [], 1.0
+    tails = row_fault_tails(n, num_faults, row_levels) if gamma > 0 else np.zeros(len(row_levels))
+    active = np.flatnonzero(tails > 0)
+    if len(active) and rng.random() < gamma:
+        k = row_levels[active[rng.integers(len(active))]]
+        row = rng.integers(n)
+        log_pmf = hypergeometric_log_pmf(n * n, n, num_faults)[k:]
+        pmf = np.exp(log_pmf - log_pmf.max())
+        in_row = k + rng.choice(len(pmf), p=pmf / pmf.sum())
+        # given in_row faults in the row, the others are uniform over the remaining PEs
+        others = rng.choice(n * n - n, size=num_faults - in_row, replace=False)
+        others += np.where(others >= row * n, n, 0)
+        flat = np.concatenate([row * n + rng.choice(n, size=in_row, replace=False), others])
+    else:
+        flat = rng.choice(n * n, size=num_faults, replace=False)
+    rows, cols = np.divmod(np.sort(flat), n)
+    _, starts, per_row = np.unique(rows, return_index=True, return_counts=True)
+
+    ratio = 1.0
+    if len(active):
+        hits = np.array([(per_row >= k).sum() for k in np.asarray(row_levels)[active]])
+        ratio = 1 / (1 - gamma + np.sum(gamma / len(active) * hits / (n * tails[active])))
+    return np.split(cols, starts[1:]), ratio
+
+
+def level_events(fault_cols: Sequence[np.ndarray], array_size: int, sparsity: float,
+                 levels: Sequence[int] = COMPATIBLE_LEVELS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Thresholds and exact probabilities of the biasing events A_fj = {C_f <= t_fj}
+
+    t_fj is levels[j] capped at 3/4 of the expected compatible rows N * s^|E_f|, so
+    no level is a typical event.
+
+    Returns:
+        Tuple of (t (F, L) int, P(A_fj) (F, L))
+    """
+    thresholds = np.zeros((len(fault_cols), len(levels)), dtype=np.int64)
+    probs = np.zeros((len(fault_cols), len(levels)))
+    cdfs: Dict[int, np.ndarray] = {}
+    for f, cols in enumerate(fault_cols):
+        k = len(cols)
+        if k not in cdfs:
+            cdfs[k] = np.cumsum(np.exp(binomial_log_pmf(array_size, sparsity ** k)))
+        cap = int(0.75 * array_size * sparsity ** k)
+        for j, level in enumerate(levels):
+            t = min(level, cap)
+            thresholds[f, j], probs[f, j] = t, min(cdfs[k][t], 1.0)
+    return thresholds, probs
+
+
+def compatible_counts(zero_masks: np.ndarray, fault_cols: Sequence[np.ndarray]) -> np.ndarray:
+    """(B, F) number of weight rows of every tile compatible with every faulty row"""
+    return np.stack([zero_masks[:, :, cols].all(axis=2).sum(axis=1) for cols in fault_cols], axis=1)
+
+
+def _conditioned_mask(rng: np.random.Generator, zero_mask: np.ndarray, cols: np.ndarray,
+                      threshold: int, sparsity: float):
+    """Redraw the E_f columns of one tile conditioned on at most threshold compatible weight rows"""
+    n = zero_mask.shape[0]
+    log_pmf = binomial_log_pmf(n, sparsity ** len(cols))[:threshold + 1]
+    pmf = np.exp(log_pmf - log_pmf.max())
+    count = rng.choice(threshold + 1, p=pmf / pmf.sum())
+    compatible = np.zeros(n, dtype=bool)
+    compatible[rng.choice(n, size=count, replace=False)] = True
+
+    block = np.ones((n, len(cols)), dtype=bool)
+    redraw = ~compatible
+    while redraw.any():
+        block[redraw] = rng.random((int(redraw.sum()), len(cols))) < sparsity
+        redraw = ~compatible & block.all(axis=1)
+    zero_mask[:, cols] = block
+
+
+def likelihood_ratio(counts: np.ndarray, thresholds: np.ndarray, probs: np.ndarray,
+                     beta: float = BETA) -> np.ndarray:
+    """p / q of samples with (B, F) compatible counts under the defensive mixture"""
+    active = probs.sum(axis=0) > 0
+    if not active.any():
+        return np.ones(len(counts))
+    beta_j = beta / active.sum()
+    hits = (counts[:, :, None] <= thresholds[None]).sum(axis=1)                           # (B, L)
+    mixture = 1 - beta + (beta_j * hits[:, active] / probs.sum(axis=0)[active]).sum(axis=1)
+    return 1 / mixture
+
+
+def sample_batch(rng: np.random.Generator, batch: int, array_size: int, sparsity: float,
+                 fault_cols: Sequence[np.ndarray], thresholds: np.ndarray, probs: np.ndarray,
+                 beta: float = BETA) -> np.ndarray:
+    """(B, N, N) zero masks drawn from the defensive mixture for one fault map"""
+    zero_masks = rng.random((batch, array_size, array_size), dtype=np.float32) < sparsity
+    active = np.flatnonzero(probs.sum(axis=0) > 0)
+    if len(active) == 0:
+        return zero_masks
+    biased = rng.random(batch) < beta
+    for b in np.flatnonzero(biased):
+        j = active[rng.integers(len(active))]
+        f = rng.choice(len(fault_cols), p=probs[:, j] / probs[:, j].sum())
+        _conditioned_mask(rng, zero_masks[b], fault_cols[f], int(thresholds[f, j]), sparsity)
+    return zero_masks
+
+
+def _failures(fault_cols: Sequence[np.ndarray], zero_masks: np.ndarray) -> np.ndarray:
+    """Algorithm 2 failure of every tile of a batch against one fault map"""
+    batch = len(zero_masks)
+    # faulty rows are numbered in address order, which is all Algorithm 2 priority needs
+    rows = np.concatenate([np.full(len(c), f) for f, c in enumerate(fault_cols)])
+    cols = np.concatenate(fault_cols)
+    trial = np.repeat(np.arange(batch), len(cols))
+    unrecovered, _ = recover_fault_batch(trial, np.tile(rows, batch), np.tile(cols, batch), zero_masks)
+    return unrecovered > 0
+
+
+def estimate_failure(array_size: int, sparsity: float, fault_rate: float, trials: int = TRIALS,
+                     beta: float = BETA, levels: Sequence[int] = COMPATIBLE_LEVELS, gamma: float = GAMMA,
+                     row_levels: Sequence[int] = ROW_FAULT_LEVELS, tiles_per_map: int = TILES_PER_MAP, z: float = CONFIDENCE_Z,
+                     seed: Optional[int] = None) -> Dict:
+    """
+    Importance-sampling estimate of the Algorithm 2 failure probability
+
+    Each fault map is paired with tiles_per_map weight tiles drawn from the mixture;
+    the confidence interval uses the per-map means, so tiles sharing a map are not
+    counted as independent.
+
+    Returns:
+        {"failure_probability", "ci_low", "ci_high", "relative_error", "biased_failures",
+         "equivalent_mc_trials", "trials"}
+    """
+    rng = np.random.default_rng(seed)
+    maps = max(2, trials // tiles_per_map)
+    per_map = np.zeros(maps)
+    failures = 0
+    for m in range(maps):
+        fault_cols, map_ratio = draw_fault_rows(rng, array_size, fault_rate, gamma, row_levels)
+        if not fault_cols:
+            continue
+        thresholds, probs = level_events(fault_cols, array_size, sparsity, levels)
+        zero_masks = sample_batch(rng, tiles_per_map, array_size, sparsity, fault_cols, thresholds, probs, beta)
+        failed = _failures(fault_cols, zero_masks)
+        if failed.any():
+            counts = compatible_counts(zero_masks[failed], fault_cols)
+            per_map[m] = map_ratio * likelihood_ratio(counts, thresholds, probs, beta).sum() / tiles_per_map
+            failures += int(failed.sum())
+    return _summary(per_map, failures, maps * tiles_per_map, z)
+
+
+def plain_monte_carlo(array_size: int, sparsity: float, fault_rate: float, trials: int,
+                      tiles_per_map: int = TILES_PER_MAP, z: float = CONFIDENCE_Z,
+                      seed: Optional[int] = None) -> Dict:
+    """Nominal sampling with the same summary, for validation"""
+    rng = np.random.default_rng(seed)
+    maps = max(2, trials // tiles_per_map)
+    per_map = np.zeros(maps)
+    for m in range(maps):
+        fault_cols, _ = draw_fault_rows(rng, array_size, fault_rate)
+        if fault_cols:
+            zero_masks = rng.random((tiles_per_map, array_size, array_size), dtype=np.float32) < sparsity
+            per_map[m] = _failures(fault_cols, zero_masks).mean()
+    return _summary(per_map, int(round(per_map.sum() * tiles_per_map)), maps * tiles_per_map, z)
+
+
+def _summary(per_map: np.ndarray, failures: int, trials: int, z: float) -> Dict:
+    p = float(per_map.mean())
+    stderr = float(per_map.std(ddof=1) / math.sqrt(len(per_map)))
+    return {
+        "failure_probability": p,
+        "ci_low": max(0.0, p - z * stderr),
+        "ci_high": p + z * stderr,
+        "relative_error": stderr / p if p > 0 else float("inf"),
+        "biased_failures": failures,
+        "equivalent_mc_trials": p * (1 - p) / stderr ** 2 if stderr > 0 else float("inf"),
+        "trials": trials,
+    }
+
+
+def print_estimate(label: str, r: Dict):
+    print(f"  {label:<22} p_fail = {r['failure_probability']:.3e}  "
+          f"CI [{r['ci_low']:.2e}, {r['ci_high']:.2e}]  rel.err {r['relative_error']:5.2f}  "
+          f"failures {r['biased_failures']:5d}/{r['trials']}  MC-equivalent {r['equivalent_mc_trials']:.2e}")
+
+
+# ==================== MAIN EXECUTION ====================
+
+if __name__ == "__main__":
+    print("STRAIT Rare-Event Recovery Estimator")
+    print("=" * 60)
+
+    print("Validation against plain Monte Carlo (32x32, sparsity 0.6, fault rate 2%):")
+    start = time.perf_counter()
+    print_estimate("plain Monte Carlo", plain_monte_carlo(32, 0.6, 2.0, 40000, seed=1))
+    print_estimate("importance sampling", estimate_failure(32, 0.6, 2.0, 2000, seed=2))
+    print(f"  ({time.perf_counter() - start:.1f}s)")
+
+    print(f"\nFigure 13 regime, {ARRAY_SIZE}x{ARRAY_SIZE}, sparsity {SPARSITY}, {TRIALS} trials each:")
+    for fault_rate in FAULT_RATES:
+        start = time.perf_counter()
+        result = estimate_failure(ARRAY_SIZE, SPARSITY, fault_rate, seed=42)
+        print_estimate(f"fault rate {fault_rate:.2f}%", result)
+        print(f"  {'':<22} {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,85 @@
+"""
+STRAIT Results Store
+Append-only JSON-lines store shared by the analysis scripts
+
+Every metric producer (waveform analysis, recovery sweeps, test-time models, ...)
+writes its records here under a "kind" so that later scripts can read cached
+results instead of re-running simulations.
+
+Layout:
+    <root>/<kind>.jsonl   one JSON object per line: {"key", "timestamp", "record"}
+"""
+
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, Optional
+
+DEFAULT_RESULTS_DIR = "./results"
+
+
+def canonical_key(key: Any) -> str:
+    """Convert a record key (str, number, tuple or dict) to a stable string"""
+    if isinstance(key, str):
+        return key
+    return json.dumps(key, sort_keys=True, default=str)
+
+
+class ResultsStore:
+    def __init__(self, root: str = DEFAULT_RESULTS_DIR):
+        """Open (and create if needed) a results store rooted at the given directory"""
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, kind: str) -> str:
+        return os.path.join(self.root, f"{kind}.jsonl")
+
+    def put(self, kind: str, key: Any, record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Append a record to the store
+
+        Args:
+            kind: Metric family, e.g. "vcd_state_residency"
+            key: Identifies the configuration the record belongs to
+            record: JSON-serialisable result payload
+
+        Returns:
+            The stored entry
+        """
+        entry = {"key": canonical_key(key), "timestamp": time.time(), "record": record}
+        with open(self._path(kind), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, default=_json_default) + "\n")
+        return entry
+
+    def entries(self, kind: str) -> Iterator[Dict[str, Any]]:
+        """Iterate over all entries of a kind in insertion order"""
+        path = self._path(kind)
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+    def get(self, kind: str, key: Any) -> Optional[Dict[str, Any]]:
+        """Return the most recent record stored for key, or None"""
+        wanted = canonical_key(key)
+        found = None
+        for entry in self.entries(kind):
+            if entry["key"] == wanted:
+                found = entry["record"]
+        return found
+
+    def latest(self, kind: str) -> Dict[str, Dict[str, Any]]:
+        """Return {key: most recent record} for a kind"""
+        return {entry["key"]: entry["record"] for entry in self.entries(kind)}
+
+
+def _json_default(value: Any) -> Any:
+    """Serialise numpy scalars/arrays without importing numpy here"""
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serialisable")
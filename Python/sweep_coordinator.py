@@ -0,0 +1,425 @@
+"""
+STRAIT Sweep Coordinator
+Sharded recovery-rate sweeps over a shared-filesystem work queue
+
+A sweep (array sizes x sparsity x fault rates x iterations) is split into shards
+of SHARD_TRIALS trials per array size. Each shard evaluates the whole sparsity x
+fault-rate grid with a coupled-sweep engine and its own SeedSequence seed, so its
+result only depends on the shard spec. Workers on any number of nodes coordinate
+through files only (no broker):
+
+    <root>/sweep.json              sweep spec
+    <root>/shards/<id>.json        shard specs
+    <root>/claims/<id>.lock        claim, created with O_CREAT | O_EXCL; holds the owner
+                                   and the claim start time, its mtime is the worker
+                                   heartbeat
+    <root>/backups/<id>.lock       at most one speculative copy of a straggler, same
+                                   content and heartbeat as a claim
+    <root>/attempts/<id>.<k>       failed attempts, retried up to MAX_ATTEMPTS
+    <root>/results/<id>.json       success counts, written with an atomic rename
+
+A claim whose heartbeat is older than STALE_SECONDS belongs to a dead worker and
+is stolen: the stale lock is renamed away (only one worker can win the rename),
+checked to still be the stale claim that was observed, and a fresh claim is
+created. When no unclaimed shard is left, idle workers run
+a backup of the oldest claim older than STRAGGLER_SECONDS; both copies write the
+same result. A backup lock with a stale heartbeat is stolen like a claim, so a
+dead or failed backup does not block the next backup of that shard. merge() adds
+integer success counts in shard order, so the merged rates do not depend on
+which worker ran which shard.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from results_store import ResultsStore
+
+# ==================== CONFIGURATION ====================
+SHARD_TRIALS = 50
+BASE_SEED = 2024
+HEARTBEAT_SECONDS = 10.0
+STALE_SECONDS = 60.0
+STRAGGLER_SECONDS = 120.0
+MAX_ATTEMPTS = 3
+POLL_SECONDS = 1.0
+
+ENGINES: Dict[str, Callable] = {}
+
+
+def register_engine(name: str):
+    """Decorator registering fn(array_size, sparsity_range, fault_rates, trials, seed) -> (S, F) success counts"""
+    def decorator(fn: Callable) -> Callable:
+        ENGINES[name] = fn
+        return fn
+    return decorator
+
+
+@register_engine("coupled")
+def coupled_engine(array_size: int, sparsity_range: List[float], fault_rates: List[float],
+                   trials: int, seed: int) -> np.ndarray:
+    """Nested zero masks and nested fault maps (coupled_sweep)"""
+    from coupled_sweep import coupled_sweep
+
+    rates = coupled_sweep(array_size, sparsity_range, fault_rates, trials, seed=seed)
+    return np.rint(np.array([rates[s] for s in sparsity_range]) * trials / 100).astype(np.int64)
+
+
+@register_engine("independent_faults")
+def independent_faults_engine(array_size: int, sparsity_range: List[float], fault_rates: List[float],
+                              trials: int, seed: int) -> np.ndarray:
+    """Nested zero masks, an independent fault map per fault rate"""
+    from coupled_sweep import coupled_sweep
+
+    rates = coupled_sweep(array_size, sparsity_range, fault_rates, trials, seed=seed, nested_faults=False)
+    return np.rint(np.array([rates[s] for s in sparsity_range]) * trials / 100).astype(np.int64)
+
+
+def _write_json_atomic(path: str, data: Dict):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _read_json(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _create_exclusive(path: str, content: str) -> bool:
+    """Create a file only if it does not exist yet"""
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w") as f:
+        f.write(content)
+    return True
+
+
+def _claim_content(worker: str) -> str:
+    return f"{worker}\n{time.time()!r}"
+
+
+def _read_claim(path: str) -> Optional[Tuple[str, float]]:
+    """(owner, claim start time) of a claim file, None when it is gone or not written yet"""
+    try:
+        with open(path) as f:
+            owner, _, start = f.read().rpartition("\n")
+        return owner, float(start)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+class SweepQueue:
+    def __init__(self, root: str):
+        """Open a sweep queue directory created by create_sweep"""
+        self.root = root
+        self.spec = _read_json(os.path.join(root, "sweep.json"))
+
+    def _path(self, folder: str, name: str) -> str:
+        return os.path.join(self.root, folder, name)
+
+    def shard_ids(self) -> List[str]:
+        return sorted(name[:-5] for name in os.listdir(os.path.join(self.root, "shards")) if name.endswith(".json"))
+
+    def shard(self, shard_id: str) -> Dict:
+        return _read_json(self._path("shards", f"{shard_id}.json"))
+
+    def is_done(self, shard_id: str) -> bool:
+        return os.path.exists(self._path("results", f"{shard_id}.json"))
+
+    def attempts(self, shard_id: str) -> int:
+        prefix = f"{shard_id}."
+        return sum(name.startswith(prefix) for name in os.listdir(os.path.join(self.root, "attempts")))
+
+    def is_failed(self, shard_id: str) -> bool:
+        return self.attempts(shard_id) >= self.spec["max_attempts"]
+
+    def claim_age(self, shard_id: str) -> Optional[float]:
+        """Seconds since the last heartbeat of the claim, None when unclaimed"""
+        try:
+            return time.time() - os.stat(self._path("claims", f"{shard_id}.lock")).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def _try_lock(self, lock: str, worker: str) -> bool:
+        """Create a claim-style lock, or steal it when its heartbeat has gone stale"""
+        if _create_exclusive(lock, _claim_content(worker)):
+            return True
+        claim = _read_claim(lock)
+        try:
+            age = time.time() - os.stat(lock).st_mtime
+        except FileNotFoundError:
+            return False
+        if claim is None or age < self.spec["stale_seconds"]:
+            return False
+        # only one worker wins the rename of the stale lock
+        stolen = f"{lock}.stale.{worker}"
+        try:
+            os.rename(lock, stolen)
+        except FileNotFoundError:
+            return False
+        # another worker may have stolen the observed claim and created a fresh one
+        # between the stale check and the rename: put that one back and give up
+        if _read_claim(stolen) != claim or time.time() - os.stat(stolen).st_mtime < self.spec["stale_seconds"]:
+            try:
+                os.link(stolen, lock)
+            except FileExistsError:
+                pass
+            os.unlink(stolen)
+            return False
+        os.unlink(stolen)
+        return _create_exclusive(lock, _claim_content(worker))
+
+    def try_claim(self, shard_id: str, worker: str) -> bool:
+        """Claim an unclaimed shard, or steal it when its claim has gone stale"""
+        if self.is_done(shard_id) or self.is_failed(shard_id):
+            return False
+        return self._try_lock(self._path("claims", f"{shard_id}.lock"), worker)
+
+    def try_backup(self, shard_id: str, worker: str) -> bool:
+        """Start the single speculative copy of a straggling shard (or take over a dead one)"""
+        return self._try_lock(self._path("backups", f"{shard_id}.lock"), worker)
+
+    def heartbeat(self, shard_id: str, folder: str = "claims"):
+        try:
+            os.utime(self._path(folder, f"{shard_id}.lock"))
+        except FileNotFoundError:
+            pass
+
+    def release(self, shard_id: str, worker: str):
+        lock = self._path("claims", f"{shard_id}.lock")
+        claim = _read_claim(lock)
+        if claim is not None and claim[0] == worker:
+            try:
+                os.unlink(lock)
+            except FileNotFoundError:
+                pass
+
+    def record_failure(self, shard_id: str, worker: str, error: str):
+        for k in range(self.spec["max_attempts"] + 1):
+            if _create_exclusive(self._path("attempts", f"{shard_id}.{k}"), f"{worker}: {error}"):
+                return
+
+    def write_result(self, shard_id: str, result: Dict):
+        _write_json_atomic(self._path("results", f"{shard_id}.json"), result)
+
+    def status(self) -> Dict[str, int]:
+        ids = self.shard_ids()
+        done = sum(self.is_done(s) for s in ids)
+        failed = sum(not self.is_done(s) and self.is_failed(s) for s in ids)
+        claimed = sum(not self.is_done(s) and self.claim_age(s) is not None for s in ids)
+        return {"shards": len(ids), "done": done, "claimed": claimed, "failed": failed,
+                "pending": len(ids) - done - claimed - failed}
+
+
+def create_sweep(root: str, array_sizes: List[int], sparsity_range: List[float], fault_rates: List[float],
+                 iterations: int, shard_trials: int = SHARD_TRIALS, engine: str = "coupled",
+                 base_seed: int = BASE_SEED) -> SweepQueue:
+    """
+    Write the sweep spec and one shard file per (array size, trial chunk)
+
+    Returns:
+        The queue, ready for workers
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}")
+    for folder in ["shards", "claims", "backups", "attempts", "results"]:
+        os.makedirs(os.path.join(root, folder), exist_ok=True)
+    spec = {"array_sizes": list(array_sizes), "sparsity_range": list(sparsity_range),
+            "fault_rates": list(fault_rates), "iterations": iterations, "shard_trials": shard_trials,
+            "engine": engine, "base_seed": base_seed, "stale_seconds": STALE_SECONDS,
+            "straggler_seconds": STRAGGLER_SECONDS, "max_attempts": MAX_ATTEMPTS}
+    _write_json_atomic(os.path.join(root, "sweep.json"), spec)
+
+    for n in array_sizes:
+        for chunk, start in enumerate(range(0, iterations, shard_trials)):
+            seed = int(np.random.SeedSequence([base_seed, n, chunk]).generate_state(1)[0])
+            shard = {"array_size": n, "chunk": chunk, "trials": min(shard_trials, iterations - start),
+                     "seed": seed}
+            _write_json_atomic(os.path.join(root, "shards", f"n{n:05d}_c{chunk:06d}.json"), shard)
+    return SweepQueue(root)
+
+
+def run_shard(spec: Dict, shard: Dict) -> Dict:
+    """Evaluate one shard; the result depends only on the sweep spec and the shard"""
+    start = time.perf_counter()
+    counts = ENGINES[spec["engine"]](shard["array_size"], spec["sparsity_range"], spec["fault_rates"],
+                                     shard["trials"], shard["seed"])
+    return {**shard, "successes": np.asarray(counts).tolist(), "elapsed": time.perf_counter() - start}
+
+
+def work(root: str, worker: Optional[str] = None, max_shards: Optional[int] = None,
+         heartbeat_seconds: float = HEARTBEAT_SECONDS) -> int:
+    """
+    Claim and run shards until the sweep is complete (or max_shards were run)
+
+    Returns:
+        Number of shards this worker completed
+    """
+    queue = SweepQueue(root)
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    ids = queue.shard_ids()
+    # start at a worker-specific offset so workers rarely race for the same claim
+    offset = hash(worker) % max(len(ids), 1)
+    ids = ids[offset:] + ids[:offset]
+    completed = 0
+
+    while max_shards is None or completed < max_shards:
+        shard_id = next((s for s in ids if queue.try_claim(s, worker)), None)
+        backup = False
+        if shard_id is None:
+            open_ids = [s for s in ids if not queue.is_done(s) and not queue.is_failed(s)]
+            if not open_ids:
+                break
+            ages = {s: queue.claim_age(s) for s in open_ids}
+            stragglers = sorted((s for s, age in ages.items()
+                                 if age is not None and age < queue.spec["stale_seconds"]
+                                 and _claim_runtime(queue, s) > queue.spec["straggler_seconds"]),
+                                key=lambda s: -_claim_runtime(queue, s))
+            shard_id = next((s for s in stragglers if queue.try_backup(s, worker)), None)
+            if shard_id is None:
+                time.sleep(POLL_SECONDS)
+                continue
+            backup = True
+
+        folder = "backups" if backup else "claims"
+        stop = threading.Event()
+        beat = threading.Thread(target=_heartbeat_loop, args=(queue, shard_id, folder, stop, heartbeat_seconds),
+                                daemon=True)
+        beat.start()
+        try:
+            result = run_shard(queue.spec, queue.shard(shard_id))
+            queue.write_result(shard_id, {**result, "worker": worker, "backup": backup})
+            completed += 1
+        except Exception as e:
+            if not backup:
+                queue.record_failure(shard_id, worker, repr(e))
+        finally:
+            stop.set()
+            beat.join()
+            # a backup lock stays: it ages out after a failure, so a retry waits stale_seconds
+            if not backup:
+                queue.release(shard_id, worker)
+    return completed
+
+
+def _claim_runtime(queue: SweepQueue, shard_id: str) -> float:
+    """Seconds since the shard was claimed (start time stored in the claim; heartbeats move mtime/ctime)"""
+    claim = _read_claim(queue._path("claims", f"{shard_id}.lock"))
+    return 0.0 if claim is None else time.time() - claim[1]
+
+
+def _heartbeat_loop(queue: SweepQueue, shard_id: str, folder: str, stop: threading.Event, interval: float):
+    while not stop.wait(interval):
+        queue.heartbeat(shard_id, folder)
+
+
+def merge(root: str, store: Optional[ResultsStore] = None) -> Dict[int, Dict[float, List[float]]]:
+    """
+    Add up the shard results of a complete sweep
+
+    Args:
+        store: Optional ResultsStore; one record per array size goes to kind "sharded_sweep"
+
+    Returns:
+        {array_size: {sparsity: [recovery rate per fault rate]}}
+    """
+    queue = SweepQueue(root)
+    spec = queue.spec
+    missing = [s for s in queue.shard_ids() if not queue.is_done(s)]
+    if missing:
+        raise RuntimeError(f"{len(missing)} shards are not finished (first: {missing[0]})")
+
+    shape = (len(spec["sparsity_range"]), len(spec["fault_rates"]))
+    successes = {n: np.zeros(shape, dtype=np.int64) for n in spec["array_sizes"]}
+    trials = {n: 0 for n in spec["array_sizes"]}
+    for shard_id in queue.shard_ids():
+        result = _read_json(queue._path("results", f"{shard_id}.json"))
+        successes[result["array_size"]] += np.asarray(result["successes"], dtype=np.int64)
+        trials[result["array_size"]] += result["trials"]
+
+    merged = {}
+    for n in spec["array_sizes"]:
+        rates = successes[n] / trials[n] * 100
+        merged[n] = {s: rates[i].tolist() for i, s in enumerate(spec["sparsity_range"])}
+        if store is not None:
+            key = {"array_size": n, "engine": spec["engine"], "iterations": spec["iterations"],
+                   "base_seed": spec["base_seed"], "shard_trials": spec["shard_trials"]}
+            store.put("sharded_sweep", key, {**key, "sparsity_range": spec["sparsity_range"],
+                                             "fault_rates": spec["fault_rates"],
+                                             "successes": successes[n].tolist(), "rates": merged[n]})
+    return merged
+
+
+# ==================== MAIN EXECUTION ====================
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="STRAIT sharded sweep coordinator")
+    sub = parser.add_subparsers(dest="command")
+    init = sub.add_parser("init", help="create a sweep queue")
+    init.add_argument("root")
+    init.add_argument("--array-sizes", type=int, nargs="+", default=[64, 128, 256])
+    init.add_argument("--sparsity", type=float, nargs="+", default=[0.1, 0.3, 0.5, 0.7, 0.9])
+    init.add_argument("--fault-rates", type=float, nargs="+", default=[0.03, 0.05, 0.07, 0.1])
+    init.add_argument("--iterations", type=int, default=1000)
+    init.add_argument("--shard-trials", type=int, default=SHARD_TRIALS)
+    init.add_argument("--engine", choices=sorted(ENGINES), default="coupled")
+    worker_cmd = sub.add_parser("work", help="run a worker on this node")
+    worker_cmd.add_argument("root")
+    worker_cmd.add_argument("--max-shards", type=int, default=None)
+    status_cmd = sub.add_parser("status", help="show queue progress")
+    status_cmd.add_argument("root")
+    merge_cmd = sub.add_parser("merge", help="merge the results of a finished sweep")
+    merge_cmd.add_argument("root")
+    args = parser.parse_args()
+
+    if args.command == "init":
+        queue = create_sweep(args.root, args.array_sizes, args.sparsity, args.fault_rates, args.iterations,
+                             args.shard_trials, args.engine)
+        print(f"Created {len(queue.shard_ids())} shards in {args.root}")
+    elif args.command == "work":
+        print(f"Completed {work(args.root, max_shards=args.max_shards)} shards")
+    elif args.command == "status":
+        print(SweepQueue(args.root).status())
+    elif args.command == "merge":
+        for n, rates in merge(args.root, ResultsStore()).items():
+            print(f"Array {n}x{n}:")
+            for s, r in rates.items():
+                print(f"  Sparsity {s*100:2.0f}%: {[f'{v:5.1f}%' for v in r]}")
+    else:
+        import multiprocessing
+        import tempfile
+
+        print("STRAIT Sweep Coordinator")
+        print("=" * 60)
+        with tempfile.TemporaryDirectory() as tmp:
+            grid = dict(array_sizes=[32, 64], sparsity_range=[0.2, 0.4, 0.6], fault_rates=[0.5, 1.0, 2.0],
+                        iterations=400, shard_trials=50)
+            timings = {}
+            merged = {}
+            for workers in (1, 4):
+                root = os.path.join(tmp, f"sweep_{workers}")
+                queue = create_sweep(root, **grid)
+                start = time.perf_counter()
+                with multiprocessing.get_context("spawn").Pool(workers) as pool:
+                    done = pool.starmap(work, [(root, f"worker{w}") for w in range(workers)])
+                timings[workers] = time.perf_counter() - start
+                merged[workers] = merge(root)
+                print(f"{workers} worker(s): {len(queue.shard_ids())} shards, per worker {done}, "
+                      f"{timings[workers]:.1f}s, status {queue.status()}")
+
+            print(f"Merged results identical across worker counts: {merged[1] == merged[4]}")
+            for n, rates in merged[4].items():
+                print(f"Array {n}x{n}:")
+                for s, r in rates.items():
+                    print(f"  Sparsity {s*100:2.0f}%: {[f'{v:5.1f}%' for v in r]}")
@@ -0,0 +1,94 @@
+"""
+Regression tests for the vectorized Algorithm 2 in chip_fault_index.py
+
+Random seeded fault maps and weight tiles are allocated by ChipFaultIndex /
+recover_fault_batch and by the reference loops of figure_plot.py and
+figure_plot_new.py; the single-tile greedy path is checked against the batched one.
+Run with: python -m pytest -q test_chip_fault_index.py
+"""
+
+import numpy as np
+import pytest
+
+from chip_fault_index import ChipFaultIndex, greedy_recover, recover_fault_batch
+from fault_map_format import map_to_fault_lists
+from figure_plot import StraitRecovery
+from figure_plot_new import StraitEnhancedRecovery
+
+# ==================== CONFIGURATION ====================
+SEEDS = range(6)
+CASES = [(16, 0.3, 0.04), (32, 0.5, 0.03), (32, 0.7, 0.06), (48, 0.4, 0.02)]  # (N, sparsity, fault rate)
+TILES = 12
+
+
+def _random_case(seed: int, array_size: int, sparsity: float, fault_rate: float):
+    rng = np.random.default_rng(seed)
+    fault_maps = rng.random((TILES, array_size, array_size)) < fault_rate
+    zero_masks = rng.random((TILES, array_size, array_size)) < sparsity
+    return fault_maps, zero_masks
+
+
+def _reference(array_size: int, fault_map: np.ndarray, zero_mask: np.ndarray):
+    """(success, unrecovered physical rows) of the loop implementations"""
+    f_row_add, faulty_position = map_to_fault_lists(fault_map)
+    f_count = [len(p) for p in faulty_position]
+    z_weight_position = [np.flatnonzero(row).tolist() for row in zero_mask]
+    success = StraitRecovery(array_size).weight_allocation_algorithm(faulty_position, f_count, z_weight_position)
+    tracked, unrecovered = StraitEnhancedRecovery(array_size).original_algorithm_2(
+        faulty_position, f_count, z_weight_position)
+    assert tracked == success
+    return success, sorted(f_row_add[i] for i in unrecovered)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("array_size, sparsity, fault_rate", CASES)
+def test_allocate_matches_algorithm_2(seed, array_size, sparsity, fault_rate):
+    fault_maps, zero_masks = _random_case(seed, array_size, sparsity, fault_rate)
+    index = ChipFaultIndex.from_fault_map(fault_maps[0])
+    success, mapping, unrecovered = index.allocate(zero_masks)
+    for t in range(TILES):
+        expected_success, expected_rows = _reference(array_size, fault_maps[0], zero_masks[t])
+        assert bool(success[t]) == expected_success
+        assert sorted(unrecovered[t].tolist()) == expected_rows
+        assert sorted(mapping[t].tolist()) == list(range(array_size))
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("array_size, sparsity, fault_rate", CASES)
+def test_single_tile_allocate_matches_batch(seed, array_size, sparsity, fault_rate):
+    fault_maps, zero_masks = _random_case(seed, array_size, sparsity, fault_rate)
+    index = ChipFaultIndex.from_fault_map(fault_maps[0])
+    success, mapping, unrecovered = index.allocate(zero_masks)
+    for t in range(TILES):
+        single_success, single_mapping, single_unrecovered = index.allocate(zero_masks[t])
+        assert bool(single_success[0]) == bool(success[t])
+        np.testing.assert_array_equal(single_mapping[0], mapping[t])
+        np.testing.assert_array_equal(single_unrecovered[0], unrecovered[t])
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("array_size, sparsity, fault_rate", CASES)
+def test_recover_fault_batch_matches_algorithm_2(seed, array_size, sparsity, fault_rate):
+    fault_maps, zero_masks = _random_case(seed, array_size, sparsity, fault_rate)
+    die, row, col = np.nonzero(fault_maps)
+    unrecovered, faulty_rows = recover_fault_batch(die, row, col, zero_masks)
+    for t in range(TILES):
+        expected_success, expected_rows = _reference(array_size, fault_maps[t], zero_masks[t])
+        assert (unrecovered[t] == 0) == expected_success
+        assert unrecovered[t] == len(expected_rows)
+        assert faulty_rows[t] == int(fault_maps[t].any(axis=1).sum())
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_greedy_recover_single_matches_batched(seed):
+    rng = np.random.default_rng(seed)
+    for batch, n, rows, density in [(8, 16, 5, 0.3), (10, 32, 12, 0.1), (6, 24, 40, 0.05)]:
+        compat = rng.random((batch, n, rows)) < density
+        active = rng.random((batch, rows)) < 0.8
+        for mask in (None, active):
+            recovered, matched = greedy_recover(compat, mask)
+            for b in range(batch):
+                single_recovered, single_matched = greedy_recover(
+                    compat[b:b + 1], None if mask is None else mask[b:b + 1])
+                np.testing.assert_array_equal(single_recovered[0], recovered[b])
+                np.testing.assert_array_equal(single_matched[0], matched[b])
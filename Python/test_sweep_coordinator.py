@@ -0,0 +1,146 @@
+"""
+Tests for the file-based work queue in sweep_coordinator.py
+
+Claims are raced from threads against one queue directory, stale claims are
+aged with os.utime instead of waiting STALE_SECONDS, and merge() is checked on
+hand-written shard results and on a full run with a constant test engine.
+Run with: python -m pytest -q test_sweep_coordinator.py
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import sweep_coordinator
+from sweep_coordinator import SweepQueue, create_sweep, merge, work
+
+# ==================== CONFIGURATION ====================
+GRID = dict(array_sizes=[8, 16], sparsity_range=[0.2, 0.6], fault_rates=[1.0, 2.0, 4.0],
+            iterations=30, shard_trials=10)
+THREADS = 8
+
+
+@pytest.fixture
+def queue(tmp_path) -> SweepQueue:
+    return create_sweep(str(tmp_path / "sweep"), **GRID)
+
+
+def _lock(queue: SweepQueue, shard_id: str, folder: str = "claims") -> str:
+    return queue._path(folder, f"{shard_id}.lock")
+
+
+def _age(path: str, seconds: float):
+    """Move the heartbeat (mtime) of a lock into the past"""
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def _race(fn, threads: int = THREADS) -> list:
+    """Run fn(worker) from several threads released at the same time"""
+    barrier = threading.Barrier(threads)
+    results = [None] * threads
+
+    def run(w):
+        barrier.wait()
+        results[w] = fn(f"worker{w}")
+
+    pool = [threading.Thread(target=run, args=(w,)) for w in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return results
+
+
+def test_concurrent_claims_have_one_owner(queue):
+    ids = queue.shard_ids()
+    won = _race(lambda worker: [s for s in ids if queue.try_claim(s, worker)])
+    assert sorted(s for claimed in won for s in claimed) == ids
+    for w, claimed in enumerate(won):
+        for s in claimed:
+            assert sweep_coordinator._read_claim(_lock(queue, s))[0] == f"worker{w}"
+
+
+def test_fresh_claim_is_not_stolen(queue):
+    shard_id = queue.shard_ids()[0]
+    assert queue.try_claim(shard_id, "a")
+    _age(_lock(queue, shard_id), queue.spec["stale_seconds"] / 2)
+    assert not queue.try_claim(shard_id, "b")
+
+
+def test_stale_claim_is_stolen_once(queue):
+    shard_id = queue.shard_ids()[0]
+    assert queue.try_claim(shard_id, "dead")
+    _age(_lock(queue, shard_id), 2 * queue.spec["stale_seconds"])
+
+    won = _race(lambda worker: queue.try_claim(shard_id, worker))
+    assert sum(won) == 1
+    owner = sweep_coordinator._read_claim(_lock(queue, shard_id))[0]
+    assert owner == f"worker{won.index(True)}"
+    assert queue.claim_age(shard_id) < queue.spec["stale_seconds"]
+    assert [n for n in os.listdir(os.path.join(queue.root, "claims")) if ".stale." in n] == []
+
+
+def test_release_after_steal_keeps_new_claim(queue):
+    shard_id = queue.shard_ids()[0]
+    assert queue.try_claim(shard_id, "old")
+    _age(_lock(queue, shard_id), 2 * queue.spec["stale_seconds"])
+    assert queue.try_claim(shard_id, "new")
+
+    queue.release(shard_id, "old")
+    assert sweep_coordinator._read_claim(_lock(queue, shard_id))[0] == "new"
+    queue.release(shard_id, "new")
+    assert queue.claim_age(shard_id) is None
+
+
+def test_backup_is_single_until_its_heartbeat_stops(queue):
+    shard_id = queue.shard_ids()[0]
+    assert queue.try_backup(shard_id, "a")
+    assert not queue.try_backup(shard_id, "b")
+
+    queue.heartbeat(shard_id, "backups")
+    assert not queue.try_backup(shard_id, "b")
+
+    _age(_lock(queue, shard_id, "backups"), 2 * queue.spec["stale_seconds"])
+    won = _race(lambda worker: queue.try_backup(shard_id, worker))
+    assert sum(won) == 1
+
+
+def test_merge_adds_counts_in_shard_order(queue):
+    rng = np.random.default_rng(0)
+    shape = (len(GRID["sparsity_range"]), len(GRID["fault_rates"]))
+    expected = {n: np.zeros(shape, dtype=np.int64) for n in GRID["array_sizes"]}
+    trials = {n: 0 for n in GRID["array_sizes"]}
+    ids = queue.shard_ids()
+    with pytest.raises(RuntimeError):
+        merge(queue.root)
+
+    for shard_id in reversed(ids):
+        shard = queue.shard(shard_id)
+        successes = rng.integers(0, shard["trials"] + 1, size=shape)
+        expected[shard["array_size"]] += successes
+        trials[shard["array_size"]] += shard["trials"]
+        queue.write_result(shard_id, {**shard, "successes": successes.tolist()})
+
+    merged = merge(queue.root)
+    assert trials == {n: GRID["iterations"] for n in GRID["array_sizes"]}
+    for n in GRID["array_sizes"]:
+        rates = expected[n] / trials[n] * 100
+        assert merged[n] == {s: rates[i].tolist() for i, s in enumerate(GRID["sparsity_range"])}
+
+
+def test_workers_complete_sweep(tmp_path, monkeypatch):
+    def engine(array_size, sparsity_range, fault_rates, trials, seed):
+        return np.full((len(sparsity_range), len(fault_rates)), trials // 2, dtype=np.int64)
+
+    monkeypatch.setitem(sweep_coordinator.ENGINES, "half", engine)
+    queue = create_sweep(str(tmp_path / "sweep"), engine="half", **GRID)
+    done = _race(lambda worker: work(queue.root, worker, heartbeat_seconds=0.01), threads=4)
+
+    assert sum(done) == len(queue.shard_ids())
+    assert queue.status()["done"] == len(queue.shard_ids())
+    for rates in merge(queue.root).values():
+        assert all(r == [50.0] * len(GRID["fault_rates"]) for r in rates.values())
@@ -0,0 +1,197 @@
+"""
+STRAIT Critical Fault Rate Search
+Stochastic bisection for the fault rate at which recovery drops below a target
+
+Figures 14 and 15 are read for one number per configuration: the faulty-PE rate
+at which the recovery rate falls below e.g. 90% or 99%. Instead of gridding
+fault_rates, this script bisects over the fault rate:
+  • each probe runs trials in batches until the Wilson confidence interval of its
+    recovery rate lies entirely above or below the target (or the trial cap is hit)
+  • probes far from the threshold therefore stop after one batch, and only probes
+    near it spend many trials
+  • the bracket is narrowed until it is below the tolerance (never finer than the
+    fault-rate resolution 100/N^2 % of an N x N array)
+The threshold is reported as the bracket midpoint. Its interval runs from the
+highest fault rate confidently above the target to the lowest one confidently
+below it, so probes that hit the trial cap undecided widen it instead of being
+trusted as if their point estimate were exact.
+"""
+
+import math
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from results_store import ResultsStore
+
+# ==================== CONFIGURATION ====================
+TARGETS = [0.90, 0.99]
+CONFIDENCE_Z = 1.96         # 95% Wilson interval
+BATCH_TRIALS = 50
+MIN_TRIALS = 50
+MAX_TRIALS = 2000
+TOLERANCE = 0.01            # fault-rate bracket width (percentage points)
+MAX_PROBES = 20
+
+
+def wilson_interval(successes: int, trials: int, z: float = CONFIDENCE_Z) -> Tuple[float, float]:
+    """Wilson score interval of a binomial proportion"""
+    if trials == 0:
+        return 0.0, 1.0
+    p = successes / trials
+    denom = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denom
+    half = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def probe(trial: Callable[[float], bool], fault_rate: float, target: float,
+          min_trials: int = MIN_TRIALS, max_trials: int = MAX_TRIALS,
+          batch: int = BATCH_TRIALS, z: float = CONFIDENCE_Z) -> Dict:
+    """
+    Estimate the recovery rate at one fault rate with a CI-driven trial budget
+
+    Args:
+        trial: Runs one experiment at the given fault rate, returns success
+        target: Recovery-rate threshold (0..1)
+
+    Returns:
+        {"fault_rate", "rate", "ci", "trials", "above"} where above is True/False once the
+        interval excludes the target, or decided by the point estimate at the trial cap
+    """
+    successes = trials = 0
+    while trials < max_trials:
+        for _ in range(batch):
+            successes += int(trial(fault_rate))
+        trials += batch
+        lo, hi = wilson_interval(successes, trials, z)
+        if trials >= min_trials and (lo > target or hi < target):
+            break
+    lo, hi = wilson_interval(successes, trials, z)
+    rate = successes / trials
+    return {"fault_rate": fault_rate, "rate": rate, "ci": (lo, hi), "trials": trials,
+            "above": rate >= target, "decided": lo > target or hi < target}
+
+
+def find_threshold(trial: Callable[[float], bool], target: float, low: float, high: float,
+                   resolution: float = 0.0, tolerance: float = TOLERANCE,
+                   max_probes: int = MAX_PROBES, **probe_kwargs) -> Dict:
+    """
+    Stochastic bisection for the fault rate where recovery crosses the target
+
+    Args:
+        trial: Runs one experiment at the given fault rate, returns success
+        target: Recovery-rate threshold (0..1)
+        low, high: Initial fault-rate bracket (percent)
+        resolution: Smallest meaningful fault-rate step (percent)
+
+    Returns:
+        {"threshold", "error", "interval", "bracket", "status", "undecided", "probes", "trials"};
+        status is "undecided" when a bracket end rests on a probe that hit the trial cap
+    """
+    probes = []
+    tolerance = max(tolerance, resolution)
+
+    def run(rate):
+        result = probe(trial, rate, target, **probe_kwargs)
+        probes.append(result)
+        return result
+
+    if not run(low)["above"]:
+        return _threshold_result(probes, low, low, "below_bracket")
+    if run(high)["above"]:
+        return _threshold_result(probes, high, high, "above_bracket")
+
+    while high - low > tolerance and len(probes) < max_probes:
+        mid = (low + high) / 2
+        if resolution:
+            mid = round(mid / resolution) * resolution
+            if mid <= low or mid >= high:
+                break
+        if run(mid)["above"]:
+            low = mid
+        else:
+            high = mid
+    return _threshold_result(probes, low, high, "ok")
+
+
+def _threshold_result(probes: List[Dict], low: float, high: float, status: str) -> Dict:
+    rates = [p["fault_rate"] for p in probes]
+    above = [p["fault_rate"] for p in probes if p["decided"] and p["above"]]
+    below = [p["fault_rate"] for p in probes if p["decided"] and not p["above"]]
+    # recovery falls with the fault rate: the threshold lies between the last confident
+    # "above" and the first confident "below"; undecided probes could sit on either side
+    interval = sorted((max(above, default=min(rates)), min(below, default=max(rates))))
+    threshold = (low + high) / 2
+    undecided = sum(not p["decided"] for p in probes)
+    if status == "ok" and any(not p["decided"] for p in probes if p["fault_rate"] in (low, high)):
+        status = "undecided"
+    return {
+        "threshold": threshold,
+        "error": max(threshold - interval[0], interval[1] - threshold),
+        "interval": tuple(interval),
+        "bracket": (low, high),
+        "status": status,
+        "undecided": undecided,
+        "probes": probes,
+        "trials": sum(p["trials"] for p in probes),
+    }
+
+
+def search_thresholds(configs: List[Dict], targets: List[float] = TARGETS,
+                      rate_range: Tuple[float, float] = (0.01, 1.0),
+                      store: Optional[ResultsStore] = None, **kwargs) -> List[Dict]:
+    """
+    Find the critical fault rate of every (array size, sparsity) configuration
+
+    Args:
+        configs: [{"array_size": N, "sparsity": s}, ...]
+        targets: Recovery-rate targets (0..1)
+        rate_range: Initial fault-rate bracket (percent)
+        store: Optional ResultsStore; records go to kind "fault_rate_threshold"
+
+    Returns:
+        One record per configuration and target
+    """
+    import figure_plot_new
+    from figure_plot_new import StraitEnhancedRecovery
+
+    records = []
+    for config in configs:
+        size, sparsity = config["array_size"], config["sparsity"]
+        strait = StraitEnhancedRecovery(array_size=size, enable_rescue_row=True)
+        resolution = 100 / (size * size)
+        for target in targets:
+            start = time.perf_counter()
+            result = find_threshold(lambda rate: strait.run_single_experiment(sparsity, rate),
+                                    target, *rate_range, resolution=resolution, **kwargs)
+            mode = figure_plot_new.RECOVERY_MODE
+            key = {"array_size": size, "sparsity": sparsity, "target": target, "recovery_mode": mode,
+                   "rescue_rows": figure_plot_new.NUM_RESCUE_ROWS if mode == "enhanced" else 0}
+            record = {**key, "threshold": result["threshold"], "error": result["error"],
+                      "interval": result["interval"], "bracket": result["bracket"],
+                      "status": result["status"], "undecided": result["undecided"],
+                      "probes": len(result["probes"]), "trials": result["trials"],
+                      "elapsed": time.perf_counter() - start}
+            records.append(record)
+            if store is not None:
+                store.put("fault_rate_threshold", key, record)
+    return records
+
+
+# ==================== MAIN EXECUTION ====================
+
+if __name__ == "__main__":
+    import random
+    import numpy as np
+
+    print("STRAIT Critical Fault Rate Search")
+    print("=" * 60)
+    random.seed(42)
+    np.random.seed(42)
+
+    configs = [{"array_size": 64, "sparsity": s} for s in [0.3, 0.4, 0.5]]
+    records = search_thresholds(configs, rate_range=(0.05, 3.0), store=ResultsStore())
+    for r in records:
+        print(f"  N={r['array_size']:3d} sparsity {r['sparsity']:.1f} target {r['target'] * 100:.0f}%: "
+              f"threshold {r['threshold']:.3f}% in [{r['interval'][0]:.3f}, {r['interval'][1]:.3f}]  "
+              f"({r['probes']} probes, {r['trials']} trials, {r['elapsed']:.1f}s) [{r['status']}]")
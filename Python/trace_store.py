@@ -0,0 +1,252 @@
+"""
+STRAIT Trial Trace Store
+Append-only columnar store of per-trial sweep records with checkpoint/resume
+
+Every trial of a sweep is kept, not only the per-cell success percentage, so
+follow-up questions (distribution of unrecovered rows, faulty-row counts, which
+rows the rescue step saved, ...) become vectorized queries instead of reruns.
+
+Layout:
+    <root>/manifest.json          chunk list, schema and per-cell progress
+    <root>/chunk_000000.npz        one array per column for a block of trials
+Ragged columns (lists per trial) are stored as <name>__values + <name>__offsets.
+
+A chunk is written first and the manifest is then replaced atomically, so an
+interrupted sweep resumes from the last completed chunk. Trials are seeded from
+(base seed, hash of the cell config, trial index), so re-running a lost partial
+chunk reproduces it exactly, whatever the grid the cell is swept in.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# ==================== CONFIGURATION ====================
+TRACE_DIR = "./results/traces"
+CHUNK_TRIALS = 5000
+BASE_SEED = 2024
+
+MANIFEST = "manifest.json"
+RAGGED_COLUMNS = ["rescued_rows"]
+
+
+class TraceStore:
+    def __init__(self, root: str = TRACE_DIR):
+        """Open (and create if needed) a trace store directory"""
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.manifest = self._read_manifest()
+
+    # ---------------- manifest ----------------
+
+    def _read_manifest(self) -> Dict:
+        path = os.path.join(self.root, MANIFEST)
+        if not os.path.exists(path):
+            return {"chunks": [], "rows": 0, "cells": {}, "created": time.time()}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_manifest(self):
+        path = os.path.join(self.root, MANIFEST)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(tmp, path)
+
+    def completed_trials(self, cell: str) -> int:
+        """Number of trials of a cell that are safely on disk"""
+        return self.manifest["cells"].get(cell, 0)
+
+    # ---------------- writing ----------------
+
+    def append(self, records: List[Dict], cell_counts: Dict[str, int]):
+        """
+        Write a chunk of trial records and commit it to the manifest
+
+        Args:
+            records: Trial records with identical keys
+            cell_counts: Trials contributed per cell (for resume bookkeeping)
+        """
+        if not records:
+            return
+        columns = {}
+        for name in records[0]:
+            values = [r[name] for r in records]
+            if name in RAGGED_COLUMNS:
+                columns[name + "__values"] = np.array([v for row in values for v in row], dtype=np.int32)
+                columns[name + "__offsets"] = np.cumsum([0] + [len(row) for row in values]).astype(np.int64)
+            else:
+                columns[name] = np.asarray(values)
+
+        chunk = f"chunk_{len(self.manifest['chunks']):06d}.npz"
+        np.savez(os.path.join(self.root, chunk), **columns)
+
+        self.manifest["chunks"].append({"file": chunk, "rows": len(records)})
+        self.manifest["rows"] += len(records)
+        for cell, count in cell_counts.items():
+            self.manifest["cells"][cell] = self.manifest["cells"].get(cell, 0) + count
+        self._write_manifest()
+
+    # ---------------- reading ----------------
+
+    def load(self, columns: Optional[Iterable[str]] = None,
+             where: Optional[Callable[[Dict[str, np.ndarray]], np.ndarray]] = None) -> Dict[str, np.ndarray]:
+        """
+        Load columns of every chunk into contiguous arrays
+
+        Args:
+            columns: Column names to load (default: all fixed-width columns)
+            where: Optional filter, called per chunk with its columns, returning a row mask
+
+        Returns:
+            {column: array}; ragged columns come back as a list of per-trial arrays
+        """
+        parts: Dict[str, List] = {}
+        for entry in self.manifest["chunks"]:
+            with np.load(os.path.join(self.root, entry["file"])) as chunk:
+                names = list(columns) if columns is not None else \
+                    [n for n in chunk.files if "__" not in n]
+                data = {n: self._column(chunk, n) for n in names}
+                if where is not None:
+                    mask = where(_LazyColumns(chunk, data))
+                    data = {n: _select(v, mask) for n, v in data.items()}
+                for name, values in data.items():
+                    parts.setdefault(name, []).append(values)
+        return {name: _concat(values) for name, values in parts.items()}
+
+    @staticmethod
+    def _column(chunk, name: str):
+        if name in RAGGED_COLUMNS:
+            values, offsets = chunk[name + "__values"], chunk[name + "__offsets"]
+            return [values[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+        return chunk[name]
+
+    def cell_summary(self, group_by: Tuple[str, ...] = ("array_size", "sparsity", "fault_rate",
+                                                         "recovery_mode", "rescue_rows")) -> List[Dict]:
+        """Recovery rate and unrecovered-row statistics per cell"""
+        data = self.load(list(group_by) + ["success", "unrecovered", "num_faulty_rows"])
+        if not data:
+            return []
+        keys = np.rec.fromarrays([data[g] for g in group_by], names=list(group_by))
+        cells, inverse = np.unique(keys, return_inverse=True)
+        inverse = inverse.ravel()
+        counts = np.bincount(inverse)
+        summary = []
+        for i, cell in enumerate(cells):
+            mask = inverse == i
+            summary.append({
+                **{g: cell[g].item() for g in group_by},
+                "trials": int(counts[i]),
+                "recovery_rate": float(data["success"][mask].mean() * 100),
+                "mean_unrecovered": float(data["unrecovered"][mask].mean()),
+                "max_unrecovered": int(data["unrecovered"][mask].max()),
+                "mean_faulty_rows": float(data["num_faulty_rows"][mask].mean()),
+            })
+        return summary
+
+
+class _LazyColumns(dict):
+    """Column mapping for where-filters that reads further columns only on access"""
+
+    def __init__(self, chunk, loaded: Dict):
+        super().__init__(loaded)
+        self.chunk = chunk
+
+    def __missing__(self, name: str):
+        self[name] = TraceStore._column(self.chunk, name)
+        return self[name]
+
+
+def _select(values, mask: np.ndarray):
+    if isinstance(values, list):
+        return [v for v, keep in zip(values, mask) if keep]
+    return values[mask]
+
+
+def _concat(parts: List):
+    if isinstance(parts[0], list):
+        return [row for part in parts for row in part]
+    return np.concatenate(parts)
+
+
+def trial_seed(base_seed: int, config: Dict, trial: int) -> int:
+    """Deterministic, independent 32-bit seed for one trial of the cell described by config"""
+    digest = hashlib.sha256(json.dumps(config, sort_keys=True).encode()).digest()
+    words = np.frombuffer(digest, dtype="<u4").tolist()
+    return int(np.random.SeedSequence([base_seed, *words, trial]).generate_state(1)[0])
+
+
+def run_traced_sweep(strait, sparsity_range: List[float], fault_rates: List[float],
+                     iterations: int, store: TraceStore, base_seed: int = BASE_SEED,
+                     chunk_trials: int = CHUNK_TRIALS) -> List[Dict]:
+    """
+    Run a sweep with StraitEnhancedRecovery.run_traced_trial, storing every trial
+
+    Cells already (partly) present in the store are resumed from their last
+    committed trial.
+
+    Returns:
+        The per-cell summary of the store after the sweep
+    """
+    import random
+    import figure_plot_new
+
+    mode = figure_plot_new.RECOVERY_MODE
+    rescue_rows = figure_plot_new.NUM_RESCUE_ROWS if strait.enable_rescue_row and mode == "enhanced" else 0
+
+    pending: List[Dict] = []
+    cell_counts: Dict[str, int] = {}
+    for sparsity in sparsity_range:
+        for fault_rate in fault_rates:
+            config = {"array_size": strait.array_size, "sparsity": sparsity, "fault_rate": fault_rate,
+                      "recovery_mode": mode, "rescue_rows": rescue_rows}
+            cell = json.dumps(config, sort_keys=True)
+            for trial in range(store.completed_trials(cell), iterations):
+                seed = trial_seed(base_seed, config, trial)
+                random.seed(seed)
+                np.random.seed(seed)
+                record = strait.run_traced_trial(sparsity, fault_rate)
+                pending.append({**config, "trial": trial, "seed": seed, **record})
+                cell_counts[cell] = cell_counts.get(cell, 0) + 1
+                if len(pending) >= chunk_trials:
+                    store.append(pending, cell_counts)
+                    pending, cell_counts = [], {}
+    store.append(pending, cell_counts)
+    return store.cell_summary()
+
+
+# ==================== MAIN EXECUTION ====================
+
+if __name__ == "__main__":
+    import figure_plot_new
+    from figure_plot_new import StraitEnhancedRecovery
+
+    print("STRAIT Trial Trace Store")
+    print("=" * 60)
+
+    figure_plot_new.RECOVERY_MODE = "enhanced"
+    strait = StraitEnhancedRecovery(array_size=64, enable_rescue_row=True)
+    store = TraceStore(TRACE_DIR)
+    print(f"Store {TRACE_DIR}: {store.manifest['rows']} trials in {len(store.manifest['chunks'])} chunks")
+
+    start = time.perf_counter()
+    summary = run_traced_sweep(strait, [0.3, 0.5], [0.5, 1.0, 2.0], iterations=200,
+                               store=store, chunk_trials=500)
+    print(f"Sweep finished in {time.perf_counter() - start:.2f}s "
+          f"({store.manifest['rows']} trials stored)")
+    for cell in summary:
+        print(f"  • sparsity {cell['sparsity']:.1f}, fault rate {cell['fault_rate']:.1f}%: "
+              f"{cell['recovery_rate']:5.1f}% recovered, "
+              f"mean unrecovered {cell['mean_unrecovered']:.2f}")
+
+    # Example post-hoc query: unrecovered-row distribution of trials that needed the rescue step
+    data = store.load(["unrecovered", "rescued_rows", "success"], where=lambda c: c["rescue_used"])
+    if len(data.get("unrecovered", [])):
+        values, counts = np.unique(data["unrecovered"], return_counts=True)
+        saved = sum(len(r) for r in data["rescued_rows"])
+        print(f"\nTrials using rescue rows: {len(data['unrecovered'])}, rows saved by rescue: {saved}")
+        print(f"  unrecovered before rescue: {dict(zip(values.tolist(), counts.tolist()))}")
@@ -0,0 +1,342 @@
+"""
+STRAIT Streaming VCD Analyzer
+State residency and systolic array utilization of hybrid_bist from tb_STRAIT.v dumps
+
+The dump is read line by line in a single pass. Only the signals that were
+requested (state, clock and an optional busy signal) are decoded, every other
+value change is skipped after a dictionary lookup. All statistics are kept in
+bounded containers so memory stays constant for multi-GB dumps:
+  • per-state cycle counts and power-of-two dwell-length histograms
+  • state transition counts
+  • a fixed number of timeline buckets whose width doubles as the dump grows
+"""
+
+import gzip
+from typing import Dict, List, Optional, Tuple
+
+from results_store import ResultsStore
+
+# ==================== CONFIGURATION ====================
+VCD_FILE = "./tb_STRAIT.vcd"
+STATE_SIGNAL = "hybrid_bist_inst.current_state"
+CLOCK_SIGNAL = "UUT.clk"
+TIMELINE_BUCKETS = 256
+
+# hybrid_bist.v state encoding
+HYBRID_BIST_STATES = {
+    0b00000: "IDLE",
+    0b00001: "MBIST_START",
+    0b00010: "MBIST_WRITE",
+    0b00011: "MBIST_READ",
+    0b00100: "MBIST_CHECK",
+    0b00101: "MBIST_FINAL_READ",
+    0b00110: "MBIST_FINAL_CHECK",
+    0b00111: "LBIST_START",
+    0b01000: "SA_SHIFT",
+    0b01001: "SA_FINAL_SHIFT",
+    0b01010: "TD_SHIFT",
+    0b01011: "TD_LAUNCH",
+    0b01100: "TD_CAPTURE",
+    0b01101: "TD_FINAL_SHIFT",
+    0b01110: "TEST_COMPLETE",
+    0b01111: "FAIL",
+    0b10000: "WEIGHT_ALLOCATION",
+    0b10001: "WEIGHT_LOAD",
+    0b10010: "NORMAL_OPERATION",
+    0b10011: "TD_START",
+    0b10100: "TD_START_2",
+}
+
+# States in which the systolic array is shifting, capturing or computing
+ARRAY_BUSY_STATES = {
+    "SA_SHIFT", "SA_FINAL_SHIFT",
+    "TD_SHIFT", "TD_LAUNCH", "TD_CAPTURE", "TD_FINAL_SHIFT",
+    "WEIGHT_LOAD", "NORMAL_OPERATION",
+}
+
+
+def _parse_value(raw: str) -> Optional[int]:
+    """Convert a VCD value string to int; x/z bits make the value unknown (None)"""
+    try:
+        return int(raw, 2)
+    except ValueError:
+        return None
+
+
+class StreamingVcdAnalyzer:
+    def __init__(self, state_signal: str = STATE_SIGNAL,
+                 clock_signal: Optional[str] = CLOCK_SIGNAL,
+                 busy_signal: Optional[str] = None,
+                 clock_period: Optional[int] = None,
+                 state_names: Dict[int, str] = HYBRID_BIST_STATES,
+                 busy_states=ARRAY_BUSY_STATES,
+                 timeline_buckets: int = TIMELINE_BUCKETS):
+        """
+        Args:
+            state_signal: Hierarchical suffix of the FSM state register
+            clock_signal: Hierarchical suffix of the clock; cycles are counted on its rising edges
+            busy_signal: Optional signal whose non-zero value marks the array as busy;
+                         when None the array is busy in busy_states
+            clock_period: Cycle length in dump time units, used when no clock is dumped
+            state_names: State encoding -> name
+            busy_states: State names counted as busy when no busy_signal is given
+            timeline_buckets: Number of utilization timeline buckets kept in memory
+        """
+        if clock_signal is None and clock_period is None:
+            raise ValueError("Either clock_signal or clock_period must be given")
+        self.state_signal = state_signal
+        self.clock_signal = clock_signal
+        self.busy_signal = busy_signal
+        self.clock_period = clock_period
+        self.state_names = state_names
+        self.busy_states = set(busy_states)
+        self.timeline_buckets = timeline_buckets
+        self._reset()
+
+    def _reset(self):
+        self.state_cycles: Dict[str, int] = {}
+        self.dwell_histogram: Dict[str, Dict[int, int]] = {}
+        self.transitions: Dict[Tuple[str, str], int] = {}
+        self.total_cycles = 0
+        self.busy_cycles = 0
+        self.timescale = ""
+        self.signal_paths: Dict[str, str] = {}
+
+        # timeline: fixed bucket count, bucket width doubles when full
+        self.bucket_width = 1
+        self.timeline_busy: List[int] = [0] * self.timeline_buckets
+        self.timeline_total: List[int] = [0] * self.timeline_buckets
+
+        self._state = None
+        self._busy_value = None
+        self._clock_value = None
+        self._dwell_state = None
+        self._dwell_length = 0
+
+    # ---------------- header ----------------
+
+    @staticmethod
+    def _matches(path: str, suffix: str) -> bool:
+        return path == suffix or path.endswith("." + suffix)
+
+    def _parse_header(self, lines) -> Dict[str, str]:
+        """Consume header lines up to $enddefinitions and return {id_code: role}"""
+        scope: List[str] = []
+        ids: Dict[str, str] = {}
+        tokens: List[str] = []
+        for line in lines:
+            tokens.extend(line.split())
+            if "$end" not in tokens:
+                continue
+            keyword = tokens[0]
+            if keyword == "$scope":
+                scope.append(tokens[2])
+            elif keyword == "$upscope":
+                scope.pop()
+            elif keyword == "$timescale":
+                self.timescale = " ".join(tokens[1:-1])
+            elif keyword == "$var":
+                id_code, name = tokens[3], tokens[4]
+                path = ".".join(scope + [name])
+                for role, suffix in (("state", self.state_signal),
+                                     ("clock", self.clock_signal),
+                                     ("busy", self.busy_signal)):
+                    if suffix is not None and role not in self.signal_paths.values() \
+                            and self._matches(path, suffix):
+                        ids[id_code] = role
+                        self.signal_paths[path] = role
+            elif keyword == "$enddefinitions":
+                return ids
+            tokens = []
+        raise ValueError("VCD header has no $enddefinitions")
+
+    # ---------------- statistics ----------------
+
+    def _state_name(self, value: Optional[int]) -> str:
+        if value is None:
+            return "X"
+        return self.state_names.get(value, f"UNKNOWN_{value}")
+
+    def _count_cycles(self, cycles: int):
+        """Attribute cycles to the state (and busy flag) that was stable before the edge"""
+        name = self._state_name(self._state)
+        self.state_cycles[name] = self.state_cycles.get(name, 0) + cycles
+
+        if self.busy_signal is not None:
+            busy = bool(self._busy_value)
+        else:
+            busy = name in self.busy_states
+        if busy:
+            self.busy_cycles += cycles
+
+        if name == self._dwell_state:
+            self._dwell_length += cycles
+        else:
+            self._close_dwell()
+            if self._dwell_state is not None:
+                key = (self._dwell_state, name)
+                self.transitions[key] = self.transitions.get(key, 0) + 1
+            self._dwell_state = name
+            self._dwell_length = cycles
+
+        self._add_timeline(cycles, busy)
+
+    def _close_dwell(self):
+        """Record a finished state visit in a power-of-two dwell-length bin"""
+        if self._dwell_state is None or self._dwell_length == 0:
+            return
+        bin_start = 1 << (self._dwell_length.bit_length() - 1)
+        hist = self.dwell_histogram.setdefault(self._dwell_state, {})
+        hist[bin_start] = hist.get(bin_start, 0) + 1
+
+    def _add_timeline(self, cycles: int, busy: bool):
+        """Spread cycles over the timeline buckets, merging buckets when the timeline is full"""
+        while cycles > 0:
+            bucket = self.total_cycles // self.bucket_width
+            if bucket >= self.timeline_buckets:
+                # merge neighbouring buckets so the timeline keeps a fixed size
+                half = self.timeline_buckets // 2
+                for i in range(half):
+                    self.timeline_busy[i] = self.timeline_busy[2 * i] + self.timeline_busy[2 * i + 1]
+                    self.timeline_total[i] = self.timeline_total[2 * i] + self.timeline_total[2 * i + 1]
+                for i in range(half, self.timeline_buckets):
+                    self.timeline_busy[i] = 0
+                    self.timeline_total[i] = 0
+                self.bucket_width *= 2
+                continue
+            step = min(cycles, (bucket + 1) * self.bucket_width - self.total_cycles)
+            self.timeline_total[bucket] += step
+            if busy:
+                self.timeline_busy[bucket] += step
+            self.total_cycles += step
+            cycles -= step
+
+    # ---------------- main loop ----------------
+
+    def analyze(self, vcd_path: str) -> Dict:
+        """
+        Stream a VCD dump and collect state residency statistics
+
+        Args:
+            vcd_path: Path to a .vcd (or .vcd.gz) dump
+
+        Returns:
+            Report dictionary, see report()
+        """
+        self._reset()
+        opener = gzip.open if vcd_path.endswith(".gz") else open
+        with opener(vcd_path, "rt", encoding="ascii", errors="replace") as f:
+            ids = self._parse_header(f)
+            if "state" not in ids.values():
+                raise ValueError(f"State signal '{self.state_signal}' not found in {vcd_path}")
+            if self.clock_signal is not None and "clock" not in ids.values():
+                raise ValueError(f"Clock signal '{self.clock_signal}' not found in {vcd_path}")
+
+            time_now = 0
+            last_time = 0
+            state_at_step = None
+            busy_at_step = None
+            rising = False
+
+            for line in f:
+                if not line:
+                    continue
+                head = line[0]
+                if head == "#":
+                    # close the previous timestamp: sample values as they were before it
+                    if rising:
+                        saved_state, saved_busy = self._state, self._busy_value
+                        self._state, self._busy_value = state_at_step, busy_at_step
+                        self._count_cycles(1)
+                        self._state, self._busy_value = saved_state, saved_busy
+                        rising = False
+                    time_now = int(line[1:])
+                    if self.clock_signal is None and time_now > last_time:
+                        cycles = (time_now - last_time) // self.clock_period
+                        if cycles:
+                            self._count_cycles(cycles)
+                            last_time += cycles * self.clock_period
+                    state_at_step = self._state
+                    busy_at_step = self._busy_value
+                    continue
+
+                if head in "01xXzZ":
+                    role = ids.get(line[1:].strip())
+                    raw = head
+                elif head in "bB":
+                    value, _, id_code = line[1:].partition(" ")
+                    role = ids.get(id_code.strip())
+                    raw = value
+                else:
+                    continue    # $dumpvars/$end markers, real values, comments
+
+                if role is None:
+                    continue
+                value = _parse_value(raw)
+                if role == "state":
+                    self._state = value
+                elif role == "busy":
+                    self._busy_value = value
+                elif role == "clock":
+                    if self._clock_value == 0 and value == 1:
+                        rising = True
+                    self._clock_value = value
+
+            if rising:
+                self._state, self._busy_value = state_at_step, busy_at_step
+                self._count_cycles(1)
+        self._close_dwell()
+        return self.report()
+
+    def report(self) -> Dict:
+        """Summarise the collected statistics as a JSON-serialisable dictionary"""
+        used = (self.total_cycles + self.bucket_width - 1) // self.bucket_width
+        timeline = [
+            self.timeline_busy[i] / self.timeline_total[i] if self.timeline_total[i] else 0.0
+            for i in range(min(used, self.timeline_buckets))
+        ]
+        return {
+            "timescale": self.timescale,
+            "signals": self.signal_paths,
+            "total_cycles": self.total_cycles,
+            "state_cycles": dict(sorted(self.state_cycles.items(), key=lambda kv: -kv[1])),
+            "dwell_histogram": {state: dict(sorted(hist.items()))
+                                for state, hist in self.dwell_histogram.items()},
+            "transitions": {f"{src}->{dst}": count
+                            for (src, dst), count in sorted(self.transitions.items())},
+            "busy_cycles": self.busy_cycles,
+            "array_utilization": self.busy_cycles / self.total_cycles if self.total_cycles else 0.0,
+            "timeline_bucket_cycles": self.bucket_width,
+            "utilization_timeline": timeline,
+        }
+
+
+def print_report(report: Dict):
+    """Print a residency table in the same style as the figure scripts"""
+    total = report["total_cycles"]
+    print("hybrid_bist State Residency")
+    print("=" * 60)
+    print(f"{'State':<22} {'Cycles':>10} {'Share':>8}")
+    print("-" * 60)
+    for state, cycles in report["state_cycles"].items():
+        share = cycles / total * 100 if total else 0.0
+        print(f"{state:<22} {cycles:>10} {share:>7.2f}%")
+    print("-" * 60)
+    print(f"{'Total':<22} {total:>10}")
+    print(f"\nSystolic array utilization: {report['array_utilization']*100:.2f}%")
+    print("\nTransitions:")
+    for transition, count in report["transitions"].items():
+        print(f"  {transition:<40} {count}")
+
+
+def analyze_to_store(vcd_path: str, store: Optional[ResultsStore] = None, **kwargs) -> Dict:
+    """Analyze a dump and append the report to the results store (kind: vcd_state_residency)"""
+    report = StreamingVcdAnalyzer(**kwargs).analyze(vcd_path)
+    store = store or ResultsStore()
+    store.put("vcd_state_residency", {"vcd": vcd_path, **{k: str(v) for k, v in kwargs.items()}}, report)
+    return report
+
+
+if __name__ == "__main__":
+    report = analyze_to_store(VCD_FILE)
+    print_report(report)
@@ -0,0 +1,263 @@
+"""
+STRAIT Weight Tile Loader
+Streams real (pruned) model weights as systolic-array-sized tiles
+
+Checkpoints are never loaded as a whole:
+  • .npy files and uncompressed .npz members are memory-mapped
+  • compressed .npz members are decompressed sequentially, one row band at a time
+Each tensor is viewed as a 2-D matrix (out_features x fan_in), quantized to
+WEIGHT_WIDTH-bit signed integers with a per-tensor scale, and cut into
+ARRAY_SIZE x ARRAY_SIZE tiles (zero padded at the edges). Every tile carries its
+zero mask and can be fed directly to Algorithm 2 against a chip's fault map.
+"""
+
+import os
+import struct
+import zipfile
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# ==================== CONFIGURATION ====================
+CHECKPOINT_FILE = "./model.npz"
+ARRAY_SIZE = 256
+WEIGHT_WIDTH = 8
+FAULT_RATE = 0.1            # percentage of faulty PEs for the demo fault map
+DEMO_CHECKPOINT_FILE = "./results/demo_pruned_model.npz"   # synthetic model used when CHECKPOINT_FILE is missing
+
+_ZIP_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+
+
+def _read_npy_header(f) -> Tuple[Tuple[int, ...], bool, np.dtype]:
+    """Read the .npy magic and header, leaving f positioned at the array data"""
+    if np.lib.format.read_magic(f) == (1, 0):
+        return np.lib.format.read_array_header_1_0(f)
+    return np.lib.format.read_array_header_2_0(f)
+
+
+class WeightTile:
+    __slots__ = ("tensor", "tile_row", "tile_col", "weights", "zero_mask")
+
+    def __init__(self, tensor: str, tile_row: int, tile_col: int,
+                 weights: np.ndarray, zero_mask: np.ndarray):
+        self.tensor = tensor
+        self.tile_row = tile_row
+        self.tile_col = tile_col
+        self.weights = weights
+        self.zero_mask = zero_mask
+
+    def zero_weight_positions(self) -> List[List[int]]:
+        """Zero weight column indices per row, same format as get_zero_weight_positions"""
+        return [np.flatnonzero(row).tolist() for row in self.zero_mask]
+
+    def sparsity(self) -> float:
+        return float(self.zero_mask.mean())
+
+
+class _CompressedMember:
+    """Sequential reader for a deflated .npz member (C-order arrays only)"""
+
+    def __init__(self, path: str, member: str):
+        self.path = path
+        self.member = member
+        with zipfile.ZipFile(path) as zf, zf.open(member) as f:
+            shape, fortran_order, dtype = _read_npy_header(f)
+        if fortran_order:
+            raise ValueError(f"{member}: Fortran-ordered compressed arrays cannot be streamed")
+        self.shape = shape
+        self.dtype = dtype
+        self.ndim = len(shape)
+
+    def iter_rows(self, band_rows: int) -> Iterator[np.ndarray]:
+        """Yield consecutive blocks of band_rows rows of the 2-D view"""
+        cols = int(np.prod(self.shape[1:])) if self.ndim > 1 else 1
+        row_bytes = cols * self.dtype.itemsize
+        with zipfile.ZipFile(self.path) as zf, zf.open(self.member) as f:
+            _read_npy_header(f)
+            remaining = self.shape[0]
+            while remaining > 0:
+                rows = min(band_rows, remaining)
+                block = f.read(rows * row_bytes)
+                yield np.frombuffer(block, dtype=self.dtype).reshape(rows, cols)
+                remaining -= rows
+
+
+def _memmap_npz_member(path: str, info: zipfile.ZipInfo) -> np.memmap:
+    """Memory-map an uncompressed (stored) .npz member in place"""
+    with open(path, "rb") as f:
+        f.seek(info.header_offset)
+        header = _ZIP_LOCAL_HEADER.unpack(f.read(_ZIP_LOCAL_HEADER.size))
+        name_len, extra_len = header[-2], header[-1]
+        f.seek(info.header_offset + _ZIP_LOCAL_HEADER.size + name_len + extra_len)
+        shape, fortran_order, dtype = _read_npy_header(f)
+        offset = f.tell()
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape,
+                     order="F" if fortran_order else "C")
+
+
+def open_checkpoint(path: str) -> Dict[str, object]:
+    """
+    Open a checkpoint without reading its data
+
+    Args:
+        path: .npy file or .npz archive
+
+    Returns:
+        {tensor name: memory-mapped array or sequential reader}
+    """
+    if path.endswith(".npy"):
+        name = os.path.splitext(os.path.basename(path))[0]
+        return {name: np.load(path, mmap_mode="r")}
+
+    tensors = {}
+    with zipfile.ZipFile(path) as zf:
+        for info in zf.infolist():
+            if not info.filename.endswith(".npy"):
+                continue
+            name = info.filename[:-len(".npy")]
+            if info.compress_type == zipfile.ZIP_STORED:
+                tensors[name] = _memmap_npz_member(path, info)
+            else:
+                tensors[name] = _CompressedMember(path, info.filename)
+    return tensors
+
+
+def iter_row_bands(tensor, band_rows: int) -> Iterator[np.ndarray]:
+    """Yield the 2-D (out_features x fan_in) view of a tensor band by band"""
+    if isinstance(tensor, _CompressedMember):
+        yield from tensor.iter_rows(band_rows)
+        return
+    # slice before flattening: reshaping a whole Fortran-ordered memmap would copy it
+    for start in range(0, tensor.shape[0], band_rows):
+        band = np.asarray(tensor[start:start + band_rows])
+        yield band.reshape(band.shape[0], -1)
+
+
+def quantization_scale(tensor, weight_width: int = WEIGHT_WIDTH, band_rows: int = 4096) -> float:
+    """Symmetric per-tensor scale, found with one streaming max-abs pass"""
+    max_abs = 0.0
+    for band in iter_row_bands(tensor, band_rows):
+        if band.size:
+            max_abs = max(max_abs, float(np.abs(band).max()))
+    q_max = (1 << (weight_width - 1)) - 1
+    return max_abs / q_max if max_abs > 0 else 1.0
+
+
+def quantize(band: np.ndarray, scale: float, weight_width: int = WEIGHT_WIDTH) -> np.ndarray:
+    """Quantize to signed weight_width-bit integers; pruned and tiny weights become exact zeros"""
+    q_max = (1 << (weight_width - 1)) - 1
+    return np.clip(np.rint(band / scale), -q_max, q_max).astype(np.int16)
+
+
+def iter_weight_tiles(path: str, array_size: int = ARRAY_SIZE, weight_width: int = WEIGHT_WIDTH,
+                      tensors: Optional[List[str]] = None, min_ndim: int = 2) -> Iterator[WeightTile]:
+    """
+    Stream quantized array_size x array_size tiles of every weight tensor in a checkpoint
+
+    Args:
+        path: .npy/.npz checkpoint
+        array_size: Systolic array dimension N
+        weight_width: Quantization width (WEIGHT_WIDTH)
+        tensors: Optional subset of tensor names
+        min_ndim: Skip tensors with fewer dimensions (biases, norm parameters)
+
+    Yields:
+        WeightTile objects; only one row band of a tensor is resident at a time
+    """
+    for name, tensor in open_checkpoint(path).items():
+        if tensors is not None and name not in tensors:
+            continue
+        if tensor.ndim < min_ndim:
+            continue
+        scale = quantization_scale(tensor, weight_width)
+        for tile_row, band in enumerate(iter_row_bands(tensor, array_size)):
+            q = quantize(band, scale, weight_width)
+            rows, cols = q.shape
+            for tile_col, col_start in enumerate(range(0, cols, array_size)):
+                block = np.zeros((array_size, array_size), dtype=np.int16)
+                piece = q[:, col_start:col_start + array_size]
+                block[:rows, :piece.shape[1]] = piece
+                yield WeightTile(name, tile_row, tile_col, block, block == 0)
+
+
+def evaluate_model(path: str, f_row_add: List[int], faulty_position: List[List[int]],
+                   array_size: int = ARRAY_SIZE, weight_width: int = WEIGHT_WIDTH,
+                   batch_size: int = 64) -> Dict:
+    """
+    Run Algorithm 2 for every tile of a model against one chip fault map
+
+    Args:
+        f_row_add, faulty_position: Fault map in the format returned by inject_faults
+        batch_size: Tiles allocated together against the chip's fault index
+
+    Returns:
+        Summary with overall and per-tensor tile recovery counts
+    """
+    from chip_fault_index import ChipFaultIndex
+
+    index = ChipFaultIndex(f_row_add, faulty_position, array_size)
+    per_tensor: Dict[str, Dict[str, float]] = {}
+    failed_tiles: List[Tuple[str, int, int, int]] = []
+    tiles = iter_weight_tiles(path, array_size, weight_width)
+    for tile, success, _, unrecovered in index.allocate_stream(tiles, batch_size):
+        stats = per_tensor.setdefault(tile.tensor, {"tiles": 0, "recovered": 0, "zero_fraction": 0.0})
+        stats["tiles"] += 1
+        stats["recovered"] += int(success)
+        stats["zero_fraction"] += tile.sparsity()
+        if not success:
+            failed_tiles.append((tile.tensor, tile.tile_row, tile.tile_col, len(unrecovered)))
+
+    for stats in per_tensor.values():
+        stats["zero_fraction"] /= stats["tiles"]
+    total = sum(s["tiles"] for s in per_tensor.values())
+    recovered = sum(s["recovered"] for s in per_tensor.values())
+    return {
+        "tiles": total,
+        "recovered_tiles": recovered,
+        "recovery_rate": recovered / total * 100 if total else 100.0,
+        "per_tensor": per_tensor,
+        "failed_tiles": failed_tiles,
+    }
+
+
+def _write_demo_checkpoint(path: str, rng: np.random.Generator):
+    """Small channel- and block-pruned model used when no checkpoint is available"""
+    layers = {}
+    for i, (out_f, in_f) in enumerate([(512, 768), (768, 512), (300, 1000)]):
+        w = rng.standard_normal((out_f, in_f)).astype(np.float32)
+        w[rng.random(out_f) < 0.3, :] = 0                       # pruned output channels
+        blocks = rng.random((out_f // 16 + 1, in_f // 16 + 1)) < 0.4
+        w[np.kron(blocks, np.ones((16, 16), dtype=bool))[:out_f, :in_f]] = 0  # 16x16 block pruning
+        layers[f"layer{i}.weight"] = w
+        layers[f"layer{i}.bias"] = rng.standard_normal(out_f).astype(np.float32)
+    np.savez(path, **layers)
+
+
+# ==================== MAIN EXECUTION ====================
+
+if __name__ == "__main__":
+    import random
+
+    print("STRAIT Weight Tile Loader")
+    print("=" * 60)
+    np.random.seed(42)
+    random.seed(42)
+
+    checkpoint = CHECKPOINT_FILE
+    if not os.path.exists(checkpoint):
+        checkpoint = DEMO_CHECKPOINT_FILE
+        os.makedirs(os.path.dirname(checkpoint), exist_ok=True)
+        _write_demo_checkpoint(checkpoint, np.random.default_rng(42))
+        print(f"{CHECKPOINT_FILE} not found, using synthetic pruned model {checkpoint}")
+
+    from figure_plot_new import StraitEnhancedRecovery
+    f_row_add, faulty_position, f_count = StraitEnhancedRecovery(array_size=ARRAY_SIZE).inject_faults(FAULT_RATE)
+    print(f"Fault map: {sum(f_count)} faulty PEs in {len(f_count)} rows "
+          f"({ARRAY_SIZE}x{ARRAY_SIZE}, {FAULT_RATE}%)")
+
+    summary = evaluate_model(checkpoint, f_row_add, faulty_position)
+    for name, stats in summary["per_tensor"].items():
+        print(f"  {name:<20} tiles {stats['tiles']:4d}  recovered {stats['recovered']:4d}  "
+              f"zeros {stats['zero_fraction']*100:5.1f}%")
+    print(f"\nModel recovery rate: {summary['recovery_rate']:.1f}% "
+          f"({summary['recovered_tiles']}/{summary['tiles']} tiles)")
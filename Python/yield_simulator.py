@@ -0,0 +1,227 @@
+"""
+STRAIT Wafer Yield Simulator
+Yield after self-recovery for wafers of systolic-array dies with clustered defects
+
+Each die is a fixed logic area plus an N x N PE array. Defects land on the wafer
+and are mapped to dies and, inside the array region, to single faulty PEs:
+  • negative_binomial: per-die defect counts are Poisson with a Gamma(alpha)
+    distributed density (the classic clustered yield model,
+    Y = (1 + A*D0/alpha)^-alpha), placed uniformly inside the die
+  • clustered: per-wafer Poisson clusters with Gaussian spread plus a uniform
+    background, so neighbouring dies and neighbouring PEs fail together
+A defect outside the array kills the die. Dies whose defects are all inside the
+array are repaired with Algorithm 2 against TILES_PER_DIE random weight tiles.
+All dies of a batch are allocated together: every die's faulty rows are padded
+to the batch maximum and one greedy pass runs over the whole batch. Sparsity
+levels share one uniform draw per die (nested zero masks).
+"""
+
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from chip_fault_index import recover_fault_batch
+
+# ==================== CONFIGURATION ====================
+WAFER_DIAMETER_MM = 300.0
+EDGE_EXCLUSION_MM = 3.0
+LOGIC_AREA_MM2 = 20.0           # non-array area of a die
+PE_AREA_MM2 = 0.001             # area of one PE (MAC + registers)
+DEFECT_DENSITY = 0.5            # killer defects per cm^2
+CLUSTER_ALPHA = 2.0             # negative binomial clustering parameter
+
+# clustered model
+CLUSTERS_PER_WAFER = 20
+DEFECTS_PER_CLUSTER = 15
+CLUSTER_SIGMA_MM = 0.5
+BACKGROUND_FRACTION = 0.5       # share of DEFECT_DENSITY placed uniformly
+
+TILES_PER_DIE = 1
+DIE_BATCH = 256
+ARRAY_SIZES = [32, 64, 128, 256]
+SPARSITY_RANGE = [0.1, 0.3, 0.5, 0.7]
+
+
+def die_area(array_size: int) -> float:
+    """Die area in mm^2"""
+    return LOGIC_AREA_MM2 + array_size * array_size * PE_AREA_MM2
+
+
+def die_grid(array_size: int) -> Tuple[np.ndarray, float]:
+    """
+    Lower-left corners of the square dies fully inside the usable wafer area
+
+    Returns:
+        Tuple of ((D, 2) die corners in mm, die pitch in mm)
+    """
+    pitch = math.sqrt(die_area(array_size))
+    radius = WAFER_DIAMETER_MM / 2 - EDGE_EXCLUSION_MM
+    steps = np.arange(-math.ceil(radius / pitch), math.ceil(radius / pitch)) * pitch
+    x, y = np.meshgrid(steps, steps, indexing="ij")
+    corners = np.stack([x.ravel(), y.ravel()], axis=1)
+    far = np.maximum(np.abs(corners), np.abs(corners + pitch))
+    inside = np.hypot(far[:, 0], far[:, 1]) <= radius
+    return corners[inside], pitch
+
+
+def sample_defects(rng: np.random.Generator, array_size: int, wafers: int,
+                   model: str = "negative_binomial") -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Defects of all wafers in die-local coordinates
+
+    Returns:
+        Tuple of (die index over wafers x dies, u, v in [0, 1) inside the die)
+    """
+    corners, pitch = die_grid(array_size)
+    dies = len(corners)
+    density = DEFECT_DENSITY / 100                                     # per mm^2
+
+    if model == "negative_binomial":
+        rate = density * pitch * pitch * rng.gamma(CLUSTER_ALPHA, 1 / CLUSTER_ALPHA, size=wafers * dies)
+        counts = rng.poisson(rate)
+        die = np.repeat(np.arange(wafers * dies), counts)
+        return die, rng.random(len(die)), rng.random(len(die))
+
+    if model != "clustered":
+        raise ValueError(f"Unknown defect model {model!r}")
+    radius = WAFER_DIAMETER_MM / 2
+    background = rng.poisson(BACKGROUND_FRACTION * density * math.pi * radius ** 2, size=wafers)
+    clusters = rng.poisson(CLUSTERS_PER_WAFER, size=wafers)
+
+    def uniform_points(n):
+        r = radius * np.sqrt(rng.random(n))
+        theta = 2 * math.pi * rng.random(n)
+        return np.stack([r * np.cos(theta), r * np.sin(theta)], axis=1)
+
+    center_wafer = np.repeat(np.arange(wafers), clusters)
+    per_cluster = rng.poisson(DEFECTS_PER_CLUSTER, size=len(center_wafer))
+    centers = np.repeat(uniform_points(len(center_wafer)), per_cluster, axis=0)
+    points = np.concatenate([uniform_points(int(background.sum())),
+                             centers + rng.normal(0, CLUSTER_SIGMA_MM, size=centers.shape)])
+    wafer = np.concatenate([np.repeat(np.arange(wafers), background), np.repeat(center_wafer, per_cluster)])
+
+    # locate the die under every defect through the die grid
+    origin = corners.min(axis=0)
+    cell = np.floor((points - origin) / pitch).astype(np.int64)
+    span = int(np.round((corners - origin).max() / pitch)) + 1
+    lookup = np.full(span * span, -1, dtype=np.int64)
+    grid = np.round((corners - origin) / pitch).astype(np.int64)
+    lookup[grid[:, 0] * span + grid[:, 1]] = np.arange(dies)
+    on_grid = np.all((cell >= 0) & (cell < span), axis=1)
+    die_local = np.full(len(points), -1, dtype=np.int64)
+    die_local[on_grid] = lookup[cell[on_grid, 0] * span + cell[on_grid, 1]]
+    hit = die_local >= 0
+    uv = (points[hit] - origin) / pitch - cell[hit]
+    return wafer[hit] * dies + die_local[hit], uv[:, 0], uv[:, 1]
+
+
+def defects_to_faults(die: np.ndarray, u: np.ndarray, v: np.ndarray, array_size: int,
+                      num_dies: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Map die-local defects to PEs; the array is a square in the lower-left corner of the die
+
+    Returns:
+        Tuple of (killed (num_dies,) bool, fault die, fault row, fault column)
+    """
+    side = math.sqrt(array_size * array_size * PE_AREA_MM2 / die_area(array_size))
+    in_array = (u < side) & (v < side)
+    killed = np.zeros(num_dies, dtype=bool)
+    killed[die[~in_array]] = True
+    col = np.minimum((u[in_array] / side * array_size).astype(np.int64), array_size - 1)
+    row = np.minimum((v[in_array] / side * array_size).astype(np.int64), array_size - 1)
+    return killed, die[in_array], row, col
+
+
+def recover_dies(fault_die: np.ndarray, fault_row: np.ndarray, fault_col: np.ndarray,
+                 zero_masks: np.ndarray) -> np.ndarray:
+    """(D,) boolean Algorithm 2 success of dies with their own fault maps (see recover_fault_batch)"""
+    unrecovered, _ = recover_fault_batch(fault_die, fault_row, fault_col, zero_masks)
+    return unrecovered == 0
+
+
+def simulate_yield(array_size: int, sparsity_range: List[float] = SPARSITY_RANGE, wafers: int = 100,
+                   model: str = "negative_binomial", tiles_per_die: int = TILES_PER_DIE,
+                   seed: Optional[int] = None) -> Dict:
+    """
+    Repaired yield of one array size over a number of simulated wafers
+
+    Returns:
+        {"dies_per_wafer", "raw_yield", "logic_killed", "repaired_yield" {s: %},
+         "good_dies_per_wafer" {s: dies}} with yields in percent
+    """
+    rng = np.random.default_rng(seed)
+    corners, _ = die_grid(array_size)
+    num_dies = wafers * len(corners)
+    die, u, v = sample_defects(rng, array_size, wafers, model)
+    killed, fault_die, fault_row, fault_col = defects_to_faults(die, u, v, array_size, num_dies)
+
+    faulty = np.zeros(num_dies, dtype=bool)
+    faulty[fault_die] = True
+    candidates = np.flatnonzero(faulty & ~killed)
+    good = {s: np.count_nonzero(~faulty & ~killed) for s in sparsity_range}
+
+    # faults grouped by candidate die
+    position = np.full(num_dies, -1, dtype=np.int64)
+    position[candidates] = np.arange(len(candidates))
+    keep = position[fault_die] >= 0
+    fault_pos, fault_row, fault_col = position[fault_die[keep]], fault_row[keep], fault_col[keep]
+    by_die = np.argsort(fault_pos, kind="stable")
+    fault_pos, fault_row, fault_col = fault_pos[by_die], fault_row[by_die], fault_col[by_die]
+    bounds = np.searchsorted(fault_pos, np.arange(0, len(candidates) + DIE_BATCH, DIE_BATCH))
+
+    thresholds = np.asarray(sparsity_range, dtype=np.float32)
+    for b, start in enumerate(range(0, len(candidates), DIE_BATCH)):
+        batch = min(DIE_BATCH, len(candidates) - start)
+        lo, hi = bounds[b], bounds[b + 1]
+        repaired = np.ones((len(sparsity_range), batch), dtype=bool)
+        for _ in range(tiles_per_die):
+            uniform = rng.random((batch, array_size, array_size), dtype=np.float32)
+            for i, s in enumerate(thresholds):
+                repaired[i] &= recover_dies(fault_pos[lo:hi] - start, fault_row[lo:hi], fault_col[lo:hi],
+                                            uniform < s)
+        for i, s in enumerate(sparsity_range):
+            good[s] += int(repaired[i].sum())
+
+    return {
+        "array_size": array_size, "model": model, "wafers": wafers,
+        "dies_per_wafer": len(corners),
+        "raw_yield": float(np.mean(~faulty & ~killed) * 100),
+        "logic_killed": float(np.mean(killed) * 100),
+        "repaired_yield": {s: good[s] / num_dies * 100 for s in sparsity_range},
+        "good_dies_per_wafer": {s: good[s] / wafers for s in sparsity_range},
+    }
+
+
+def yield_sweep(array_sizes: List[int] = ARRAY_SIZES, sparsity_range: List[float] = SPARSITY_RANGE,
+                wafers: int = 100, model: str = "negative_binomial",
+                seed: Optional[int] = None) -> Dict[int, Dict]:
+    """simulate_yield for every array size"""
+    return {n: simulate_yield(n, sparsity_range, wafers, model, seed=seed) for n in array_sizes}
+
+
+def print_yield(results: Dict[int, Dict]):
+    for n, r in results.items():
+        repaired = ", ".join(f"s={s:.1f}: {y:5.1f}%" for s, y in r["repaired_yield"].items())
+        print(f"  {n:3d}x{n:<3d} {r['dies_per_wafer']:4d} dies/wafer, "
+              f"raw {r['raw_yield']:5.1f}%, logic-killed {r['logic_killed']:4.1f}% | repaired {repaired}")
+        best = max(r["good_dies_per_wafer"].values())
+        print(f"          good dies per wafer (best sparsity): {best:6.1f}, "
+              f"PE-equivalents per wafer: {best * n * n / 1e6:6.2f} M")
+
+
+# ==================== MAIN EXECUTION ====================
+
+if __name__ == "__main__":
+    print("STRAIT Wafer Yield Simulator")
+    print("=" * 60)
+    print(f"D0 = {DEFECT_DENSITY}/cm^2, logic area {LOGIC_AREA_MM2} mm^2, PE area {PE_AREA_MM2} mm^2")
+
+    for model in ("negative_binomial", "clustered"):
+        start = time.perf_counter()
+        results = yield_sweep(wafers=200, model=model, seed=42)
+        elapsed = time.perf_counter() - start
+        total = sum(r["dies_per_wafer"] * r["wafers"] for r in results.values())
+        print(f"\n{model} defects, 200 wafers per size ({total} dies, {elapsed:.1f}s):")
+        print_yield(results)
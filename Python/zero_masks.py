@@ -0,0 +1,172 @@
+"""
+STRAIT Packed Zero Masks
+Bernoulli(sparsity) zero-weight masks drawn straight into packed 64-bit words
+
+generate_weight_matrix draws two N x N float64 arrays per trial only to learn
+where the zeros are. Algorithm 2 needs nothing but that zero pattern, so this
+module generates it bit-sliced: the sparsity is quantized to PRECISION_BITS
+bits q / 2^k, and for every set bit of q (least significant first) the mask word
+is OR-ed, for every clear bit AND-ed, with a fresh random word. Each step halves
+or mirrors the bit probability, so every bit ends up 1 with probability q / 2^k
+independently of the others:
+  • k random words per 64 mask bits instead of 128 bytes of floats
+  • rows are generated in chunks of at most MAX_CHUNK_BYTES of words, so peak
+    memory stays flat as the array grows
+  • bits past column N in the last word of a row are always clear
+The random source is anything with a bytes(n) method: a numpy Generator, or the
+np.random module itself so np.random.seed still reproduces a run.
+"""
+
+import time
+import tracemalloc
+from typing import Iterator, List
+
+import numpy as np
+
+# ==================== CONFIGURATION ====================
+PRECISION_BITS = 16                 # sparsity resolution 2^-16
+MAX_CHUNK_BYTES = 1 << 20           # random words drawn per step
+WORD_BITS = 64
+
+
+def words_per_row(array_size: int) -> int:
+    return (array_size + WORD_BITS - 1) // WORD_BITS
+
+
+def quantize_sparsity(sparsity: float, precision_bits: int = PRECISION_BITS) -> int:
+    """Sparsity as an integer q with probability q / 2^precision_bits"""
+    return int(np.clip(round(sparsity * (1 << precision_bits)), 0, 1 << precision_bits))
+
+
+def _random_words(rng, count: int) -> np.ndarray:
+    return np.frombuffer(rng.bytes(count * 8), dtype="<u8")
+
+
+def bernoulli_words(count: int, sparsity: float, rng=np.random,
+                    precision_bits: int = PRECISION_BITS) -> np.ndarray:
+    """
+    count random 64-bit words whose bits are independently 1 with probability sparsity
+
+    Returns:
+        (count,) little-endian uint64 array
+    """
+    q = quantize_sparsity(sparsity, precision_bits)
+    if q == 0:
+        return np.zeros(count, dtype="<u8")
+    if q == 1 << precision_bits:
+        return np.full(count, np.iinfo(np.uint64).max, dtype="<u8")
+    # trailing zero bits of q would AND zeros with zeros; start at the lowest set bit
+    bit = (q & -q).bit_length() - 1
+    words = _random_words(rng, count).copy()
+    for bit in range(bit + 1, precision_bits):
+        if q >> bit & 1:
+            words |= _random_words(rng, count)
+        else:
+            words &= _random_words(rng, count)
+    return words
+
+
+def packed_zero_masks(batch: int, array_size: int, sparsity: float, rng=np.random,
+                      max_chunk_bytes: int = MAX_CHUNK_BYTES,
+                      precision_bits: int = PRECISION_BITS) -> np.ndarray:
+    """
+    Packed zero masks of a batch of N x N weight tiles
+
+    Returns:
+        (batch, N, words_per_row) uint64 words; bit c of word w in row r is
+        weight (r, 64 * w + c) being zero
+    """
+    width = words_per_row(array_size)
+    packed = np.empty((batch * array_size, width), dtype="<u8")
+    rows_per_chunk = max(1, max_chunk_bytes // (8 * width))
+    for start in range(0, batch * array_size, rows_per_chunk):
+        stop = min(start + rows_per_chunk, batch * array_size)
+        packed[start:stop] = bernoulli_words((stop - start) * width, sparsity, rng,
+                                             precision_bits).reshape(-1, width)
+    tail = array_size % WORD_BITS
+    if tail:
+        packed[:, -1] &= np.uint64((1 << tail) - 1)
+    return packed.reshape(batch, array_size, width)
+
+
+def unpack_zero_masks(packed: np.ndarray, array_size: int) -> np.ndarray:
+    """Boolean (..., N, N) zero masks of packed words"""
+    bits = np.unpackbits(packed.astype("<u8", copy=False).view(np.uint8), axis=-1, bitorder="little")
+    return bits[..., :array_size].astype(bool)
+
+
+def zero_mask_chunks(batch: int, array_size: int, sparsity: float, rng=np.random,
+                     max_chunk_bytes: int = MAX_CHUNK_BYTES) -> Iterator[np.ndarray]:
+    """
+    Boolean zero masks of a batch, yielded in chunks of whole tiles
+
+    Each chunk's boolean masks stay below max_chunk_bytes (at least one tile per chunk).
+    """
+    tiles_per_chunk = max(1, max_chunk_bytes // (array_size * array_size))
+    for start in range(0, batch, tiles_per_chunk):
+        count = min(tiles_per_chunk, batch - start)
+        yield unpack_zero_masks(packed_zero_masks(count, array_size, sparsity, rng, max_chunk_bytes),
+                                array_size)
+
+
+def zero_weight_positions(packed_tile: np.ndarray, array_size: int,
+                          max_chunk_bytes: int = MAX_CHUNK_BYTES) -> List[List[int]]:
+    """Zero weight column indices per row of one packed tile, same format as get_zero_weight_positions"""
+    rows_per_chunk = max(1, max_chunk_bytes // array_size)
+    positions = []
+    for start in range(0, array_size, rows_per_chunk):
+        mask = unpack_zero_masks(packed_tile[start:start + rows_per_chunk], array_size)
+        row, col = np.nonzero(mask)
+        bounds = np.searchsorted(row, np.arange(len(mask) + 1)).tolist()
+        cols = col.tolist()
+        positions.extend(cols[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:]))
+    return positions
+
+
+def generate_zero_weight_positions(array_size: int, sparsity: float, rng=np.random) -> List[List[int]]:
+    """Zero weight positions of one random tile without materializing weights"""
+    return zero_weight_positions(packed_zero_masks(1, array_size, sparsity, rng)[0], array_size)
+
+
+# ==================== MAIN EXECUTION ====================
+
+if __name__ == "__main__":
+    from figure_plot import StraitRecovery
+
+    print("STRAIT Packed Zero Masks")
+    print("=" * 60)
+    rng = np.random.default_rng(42)
+
+    sparsity = 0.3
+    packed = packed_zero_masks(64, 256, sparsity, rng)
+    density = unpack_zero_masks(packed, 256).mean()
+    print(f"Sparsity {sparsity}: measured zero density {density:.4f} over 64 tiles of 256x256")
+
+    for n in [256, 1024, 4096]:
+        strait = StraitRecovery(array_size=n)
+        repeats = max(1, 2 ** 20 // (n * n) * 4)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            strait.get_zero_weight_positions(strait.generate_weight_matrix(sparsity))
+        float_time = (time.perf_counter() - start) / repeats
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            packed_zero_masks(1, n, sparsity, rng)
+        packed_time = (time.perf_counter() - start) / repeats
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            generate_zero_weight_positions(n, sparsity, rng)
+        positions_time = (time.perf_counter() - start) / repeats
+        print(f"{n:4d}x{n:<4d} float weights + positions {float_time * 1e3:8.2f} ms | "
+              f"packed mask {packed_time * 1e3:7.2f} ms ({float_time / packed_time:5.1f}x) | "
+              f"packed + positions {positions_time * 1e3:8.2f} ms ({float_time / positions_time:4.1f}x)")
+
+    print("Peak temporary memory of one packed tile (beyond the tile itself):")
+    for n in [1024, 4096, 16384]:
+        tracemalloc.start()
+        tile = packed_zero_masks(1, n, sparsity, rng)
+        peak = tracemalloc.get_traced_memory()[1] - tile.nbytes
+        tracemalloc.stop()
+        print(f"  {n:5d}x{n:<5d} tile {tile.nbytes / 2**20:6.1f} MiB, temporaries {peak / 2**20:5.2f} MiB")
@@ -97,8 +97,8 @@ module mapping_table #(
                 allocation_checker[faulty_addr] <= 1'b1;                   // 錯誤row被標記為已配置
                 allocation_failed_reg <= 1'b0;                             // 清除失敗標記
             end
-            else if (all_faulty_matched) begin
-                // 所有錯誤已處理完，直接分配到健康row
+            else if (all_faulty_matched && match_failed) begin
+                // 所有錯誤已處理完，直接分配到健康row (match_failed 表示有上一個 row 的結果待寫入)
                 if (found_healthy_row) begin
                     mapping_table_reg[selected_healthy_row] <= current_row_addr;
                     allocation_checker[selected_healthy_row] <= 1'b1;
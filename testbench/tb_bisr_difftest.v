@@ -0,0 +1,165 @@
+module tb_bisr_difftest;
+
+// ===============================================
+// 批次差分測試：一次模擬跑完整個 stimulus image 中的所有 case
+// 由 Python/bisr_difftest.py 產生 stimulus 並比對 dump 結果
+// ===============================================
+
+parameter SYSTOLIC_SIZE = 8;
+parameter WEIGHT_WIDTH = 8;
+parameter ACTIVATION_WIDTH = 8;
+parameter ADDR_WIDTH = $clog2(SYSTOLIC_SIZE);
+parameter MAX_CASES = 4096;
+
+// Stimulus image 格式 ($readmemh，一個 word 一行):
+//   word 0                      : case 數量
+//   word 1 + c*(SYSTOLIC_SIZE+1): case c 的錯誤 pattern (row i 在 [i*SYSTOLIC_SIZE +: SYSTOLIC_SIZE])
+//   接下來 SYSTOLIC_SIZE 個 word : case c 的權重 row 0..SYSTOLIC_SIZE-1 (PE j 在 [j*WEIGHT_WIDTH +: WEIGHT_WIDTH])
+localparam FAULT_BITS = SYSTOLIC_SIZE*SYSTOLIC_SIZE;
+localparam WEIGHT_BITS = SYSTOLIC_SIZE*WEIGHT_WIDTH;
+localparam STIM_WIDTH = (FAULT_BITS > WEIGHT_BITS) ? FAULT_BITS : WEIGHT_BITS;
+localparam STIM_DEPTH = 1 + MAX_CASES*(SYSTOLIC_SIZE+1);
+
+// Dump 格式 (每個 case 一行):
+//   <case> <recovery_done> <recovery_success> <mapped_addr[0..N-1]> <pe_disable_out[0..N-1]>
+//   mapped_addr 為 physical row p 對應的 weight row (%0d，未寫入時為 x)，pe_disable_out 為 row p 的 %h
+
+reg [STIM_WIDTH-1:0] stim [0:STIM_DEPTH-1];
+reg [8*256-1:0] stim_file;
+reg [8*256-1:0] dump_file;
+integer dump_fd;
+integer num_cases;
+integer c, r, p, base;
+
+// Clock and Reset
+reg clk;
+reg rst_n;
+
+// DUT 介面
+reg wr_en;
+reg [FAULT_BITS-1:0] envm_faulty_patterns_flat;
+reg allocation_start;
+reg [WEIGHT_BITS-1:0] input_weights;
+reg weight_valid;
+reg [ADDR_WIDTH-1:0] read_addr;
+
+wire [WEIGHT_BITS-1:0] output_weights_flat;
+wire [SYSTOLIC_SIZE-1:0] pe_disable_out;
+wire [ADDR_WIDTH-1:0] output_mapped_addr;
+wire recovery_success;
+wire recovery_done;
+
+// Clock generation
+initial begin
+    clk = 0;
+    forever #5 clk = ~clk;
+end
+
+// DUT instantiation
+bisr_weight_allocation #(
+    .SYSTOLIC_SIZE(SYSTOLIC_SIZE),
+    .WEIGHT_WIDTH(WEIGHT_WIDTH),
+    .ACTIVATION_WIDTH(ACTIVATION_WIDTH)
+) dut (
+    .clk(clk),
+    .rst_n(rst_n),
+    .wr_en(wr_en),
+    .envm_faulty_patterns_flat(envm_faulty_patterns_flat),
+    .allocation_start(allocation_start),
+    .input_weights(input_weights),
+    .weight_valid(weight_valid),
+    .read_addr(read_addr),
+    .output_weights_flat(output_weights_flat),
+    .pe_disable_out(pe_disable_out),
+    .output_mapped_addr(output_mapped_addr),
+    .recovery_success(recovery_success),
+    .recovery_done(recovery_done)
+);
+
+// Main test sequence
+initial begin
+    if (!$value$plusargs("STIM=%s", stim_file)) stim_file = "bisr_difftest_stim.hex";
+    if (!$value$plusargs("DUMP=%s", dump_file)) dump_file = "bisr_difftest_dump.txt";
+
+    $readmemh(stim_file, stim);
+    num_cases = stim[0];
+    if (num_cases > MAX_CASES) begin
+        $display("ERROR: %0d cases exceed MAX_CASES = %0d", num_cases, MAX_CASES);
+        $finish;
+    end
+    dump_fd = $fopen(dump_file, "w");
+
+    rst_n = 1;
+    wr_en = 0;
+    envm_faulty_patterns_flat = 0;
+    allocation_start = 0;
+    input_weights = 0;
+    weight_valid = 0;
+    read_addr = 0;
+
+    $display("=====================================");
+    $display("BISR Weight Allocation Differential Test");
+    $display("SYSTOLIC_SIZE = %0d, cases = %0d", SYSTOLIC_SIZE, num_cases);
+    $display("=====================================");
+
+    @(negedge clk);
+    for (c = 0; c < num_cases; c = c + 1) begin
+        run_case(c);
+    end
+
+    $fclose(dump_fd);
+    $display("Dumped %0d cases", num_cases);
+    $finish;
+end
+
+// 執行單一 case
+task run_case;
+    input integer case_idx;
+begin
+    base = 1 + case_idx*(SYSTOLIC_SIZE+1);
+
+    // Reset: mapping_table 只在 reset 後初始化一次 faulty_checker，因此每個 case 都要 reset
+    rst_n = 0;
+    @(negedge clk);
+    rst_n = 1;
+    // mapping_table_reg 沒有 reset，清成 x 以免殘留上一個 case 的映射
+    for (p = 0; p < SYSTOLIC_SIZE; p = p + 1) begin
+        dut.mapping_inst.mapping_table_reg[p] = {ADDR_WIDTH{1'bx}};
+    end
+
+    // Phase 1: eNVM 寫入錯誤 pattern (與 tb_bisr_weight_allocation 相同的時序)
+    envm_faulty_patterns_flat = stim[base][FAULT_BITS-1:0];
+    wr_en = 1;
+    @(negedge clk);
+    wr_en = 0;
+
+    // Phase 2: 權重配置，每個 cycle 一個 row
+    allocation_start = 1;
+    @(negedge clk);
+    allocation_start = 0;
+    weight_valid = 1;
+    for (r = 0; r < SYSTOLIC_SIZE; r = r + 1) begin
+        input_weights = stim[base + 1 + r][WEIGHT_BITS-1:0];
+        @(negedge clk);
+    end
+    weight_valid = 0;
+
+    // 等待最後一個 row 的 mapping table 更新
+    @(negedge clk);
+    @(negedge clk);
+
+    // Phase 3: 讀出 mapping 與 PE disable
+    // 直接讀取 read_addr 多工器後面的暫存器，整個 case 在同一個時間點 dump，不受 clock 影響
+    $fwrite(dump_fd, "%0d %b %b", case_idx, recovery_done, recovery_success);
+    for (p = 0; p < SYSTOLIC_SIZE; p = p + 1) begin
+        $fwrite(dump_fd, " %0d", dut.mapping_inst.mapping_table_reg[p]);
+    end
+    for (p = 0; p < SYSTOLIC_SIZE; p = p + 1) begin
+        $fwrite(dump_fd, " %h", dut.faulty_pe_inst.faulty_storage[p]);
+    end
+    $fwrite(dump_fd, "\n");
+    @(negedge clk);
+end
+endtask
+
+endmodule